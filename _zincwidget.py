@@ -0,0 +1,1731 @@
+# The Qt and Zinc dependent part of the zincwidget module, it is imported by
+# zincwidget the first time one of its names is used.  Import everything from
+# zincwidget rather than from here.
+
+from zincqt import QtCore, QtGui, QtOpenGL, Signal, PYOBJECT_TYPE
+
+import collections
+import contextlib
+import functools
+
+import numpy
+
+# from opencmiss.zinc.glyph import Glyph
+from opencmiss.zinc.sceneviewer import Sceneviewer, Sceneviewerevent
+from opencmiss.zinc.sceneviewerinput import Sceneviewerinput
+from opencmiss.zinc.scenecoordinatesystem import \
+        SCENECOORDINATESYSTEM_LOCAL, \
+        SCENECOORDINATESYSTEM_WINDOW_PIXEL_TOP_LEFT,\
+        SCENECOORDINATESYSTEM_WORLD
+from opencmiss.zinc.element import Mesh
+from opencmiss.zinc.field import Field
+from opencmiss.zinc.glyph import Glyph
+from opencmiss.zinc.graphics import Graphics
+from opencmiss.zinc.status import OK
+
+from zincwidget import clock, transform_points, read_selection_arrays, write_selection_arrays, PerformanceMonitor, \
+        ProjectionMode, SelectionChanges, SelectionMode, SELECTION_RUBBERBAND_NAME, _NULL_SECTION
+
+# mapping from qt to zinc start
+# Create a button map of Qt mouse buttons to Zinc input buttons
+button_map = {QtCore.Qt.LeftButton: Sceneviewerinput.BUTTON_TYPE_LEFT,
+              QtCore.Qt.MidButton: Sceneviewerinput.BUTTON_TYPE_MIDDLE,
+              QtCore.Qt.RightButton: Sceneviewerinput.BUTTON_TYPE_RIGHT}
+
+# Create a modifier map of Qt modifier keys to Zinc modifier keys
+def modifier_map(qt_modifiers):
+    '''
+    Return a Zinc SceneViewerInput modifiers object that is created from
+    the Qt modifier flags passed in.
+    '''
+    modifiers = Sceneviewerinput.MODIFIER_FLAG_NONE
+    if qt_modifiers & QtCore.Qt.SHIFT:
+        modifiers = modifiers | Sceneviewerinput.MODIFIER_FLAG_SHIFT
+
+    return modifiers
+# mapping from qt to zinc end
+
+
+def create_sceneviewer(context, buffering_mode=Sceneviewer.BUFFERING_MODE_DOUBLE, stereo_mode=Sceneviewer.STEREO_MODE_DEFAULT, scenefilter=None):
+    '''
+    Create a scene viewer showing the scene of the default region of the given
+    context.  The scene viewer has a perspective projection and the given scene
+    filter, or a new visibility flags scene filter, which is returned with it as
+    (sceneviewer, scenefilter).  An OpenGL context should be current when the
+    scene is rendered or viewAll() is called on the scene viewer.
+    '''
+    # Get the scene viewer module.
+    scene_viewer_module = context.getSceneviewermodule()
+
+    # From the scene viewer module we can create a scene viewer, we set up the
+    # scene viewer to have the same OpenGL properties as the QGLWidget.
+    sceneviewer = scene_viewer_module.createSceneviewer(buffering_mode, stereo_mode)
+    sceneviewer.setProjectionMode(Sceneviewer.PROJECTION_MODE_PERSPECTIVE)
+
+    if scenefilter is None:
+        # Create a filter for visibility flags which will allow us to see our graphic.
+        filter_module = context.getScenefiltermodule()
+        # By default graphics are created with their visibility flags set to on (or true).
+        graphics_filter = filter_module.createScenefilterVisibilityFlags()
+    else:
+        graphics_filter = scenefilter
+
+    # Set the graphics filter for the scene viewer otherwise nothing will be visible.
+    sceneviewer.setScenefilter(graphics_filter)
+    sceneviewer.setScene(context.getDefaultRegion().getScene())
+
+    return sceneviewer, graphics_filter
+
+
+class _IdentifiedItems(object):
+    '''
+    Sequence of the nodes or elements with the given identifiers, looked up
+    with find as they are iterated.
+    '''
+
+    def __init__(self, find, identifiers):
+        self._find = find
+        self._identifiers = identifiers
+
+    def __len__(self):
+        return len(self._identifiers)
+
+    def __iter__(self):
+        find = self._find
+        for identifier in self._identifiers:
+            yield find(int(identifier))
+
+
+class _GroupItems(object):
+    '''
+    Sequence of the nodes of a nodeset group or the elements of a mesh group.
+    '''
+
+    def __init__(self, group, is_mesh):
+        self._group = group
+        self._is_mesh = is_mesh
+
+    def __len__(self):
+        return self._group.getSize()
+
+    def __iter__(self):
+        iterator = self._group.createElementiterator() if self._is_mesh else self._group.createNodeiterator()
+        item = iterator.next()
+        while item.isValid():
+            yield item
+            item = iterator.next()
+
+
+def _getRegionPath(region):
+    '''
+    Return the list of the names of the regions from below the root region
+    down to the region, empty for the root region.
+    '''
+    path = []
+    parent = region.getParent()
+    while parent.isValid():
+        path.insert(0, region.getName())
+        region = parent
+        parent = region.getParent()
+
+    return path
+
+
+def _getDomainKey(domain):
+    '''
+    Return the name of the nodeset or mesh prefixed with the path of its region
+    below the root region, for example 'nodes' or 'heart/left/mesh3d', which
+    identifies it in SelectionChanges and selection arrays.
+    '''
+    return '/'.join(_getRegionPath(domain.getFieldmodule().getRegion()) + [domain.getName()])
+
+
+def _findDomain(root_region, key):
+    '''
+    Return the nodeset or mesh identified by a key from _getDomainKey(), or
+    raise ValueError if there is none.
+    '''
+    names = key.split('/')
+    region = root_region
+    for name in names[:-1]:
+        region = region.findChild(name)
+        if not region.isValid():
+            raise ValueError("There is no region '" + '/'.join(names[:-1]) + "'.")
+    fieldmodule = region.getFieldmodule()
+    domain = fieldmodule.findNodesetByName(names[-1])
+    if not domain.isValid():
+        domain = fieldmodule.findMeshByName(names[-1])
+        if not domain.isValid():
+            raise ValueError("There is no nodeset or mesh named '" + key + "'.")
+
+    return domain
+
+
+def _getGroupContents(group):
+    '''
+    Return a list of (key, domain, items) for the nodes and elements in the
+    field group and its subregion groups, where domain is the nodeset or mesh
+    the items belong to and key identifies it as _getDomainKey() does.
+    '''
+    contents = []
+    _addGroupContents(contents, group, group.getFieldmodule().getRegion(), [])
+    return contents
+
+
+def _addGroupContents(contents, group, region, path):
+    fieldmodule = region.getFieldmodule()
+    for domain_type in (Field.DOMAIN_TYPE_NODES, Field.DOMAIN_TYPE_DATAPOINTS):
+        nodeset = fieldmodule.findNodesetByFieldDomainType(domain_type)
+        nodegroup = group.getFieldNodeGroup(nodeset)
+        if nodegroup.isValid() and nodegroup.getNodesetGroup().getSize() > 0:
+            contents.append(('/'.join(path + [nodeset.getName()]), nodeset, _GroupItems(nodegroup.getNodesetGroup(), False)))
+    for dimension in (3, 2, 1):
+        mesh = fieldmodule.findMeshByDimension(dimension)
+        elementgroup = group.getFieldElementGroup(mesh)
+        if elementgroup.isValid() and elementgroup.getMeshGroup().getSize() > 0:
+            contents.append(('/'.join(path + [mesh.getName()]), mesh, _GroupItems(elementgroup.getMeshGroup(), True)))
+    child = region.getFirstChild()
+    while child.isValid():
+        subgroup = group.getSubregionFieldGroup(child)
+        if subgroup.isValid():
+            _addGroupContents(contents, subgroup, child, path + [child.getName()])
+        child = child.getNextSibling()
+
+
+class SceneResources(object):
+    '''
+    The scene filter, scene picker, selection group and rubber band selection
+    box used by a ZincWidget.  Widgets given the same SceneResources with
+    setSceneResources() share them, they are created by the first of the
+    widgets to be initialised.  A scene filter set before then is used by
+    that widget in place of a new visibility flags scene filter.
+    '''
+
+    def __init__(self):
+        self.scenefilter = None
+        self.scenepicker = None
+        self.selection_group = None
+        self.selection_box = None
+        # Incremented whenever the scene filter of the scene picker is set.
+        self.scenepicker_revision = 0
+        # The widget and rectangle the scene picker was last set to pick in.
+        self.picking_rectangle = None
+
+    def isInitialised(self):
+        return self.scenepicker is not None
+
+    def initialise(self, context, scenefilter):
+        region = context.getDefaultRegion()
+        scene = region.getScene()
+        fieldmodule = region.getFieldmodule()
+
+        self.scenefilter = scenefilter
+        self.selection_group = fieldmodule.createFieldGroup()
+#         scene.setSelectionField(self.selection_group)
+
+        self.scenepicker = scene.createScenepicker()
+        self.scenepicker.setScenefilter(scenefilter)
+
+        # If the standard glyphs haven't been defined then the
+        # selection box will not be visible
+        self.selection_box = scene.createGraphicsPoints()
+        self.selection_box.setName(SELECTION_RUBBERBAND_NAME)
+        self.selection_box.setScenecoordinatesystem(SCENECOORDINATESYSTEM_WINDOW_PIXEL_TOP_LEFT)
+        attributes = self.selection_box.getGraphicspointattributes()
+        attributes.setGlyphShapeType(Glyph.SHAPE_TYPE_CUBE_WIREFRAME)
+        attributes.setBaseSize([10, 10, 0.9999])
+        attributes.setGlyphOffset([1, -1, 0])
+
+        self.selection_box.setVisibilityFlag(False)
+
+
+class _Batch(object):
+    '''
+    Context manager and decorator returned by ZincWidget.batch().
+    '''
+
+    __slots__ = ('_zinc_widget',)
+
+    def __init__(self, zinc_widget):
+        self._zinc_widget = zinc_widget
+
+    def __enter__(self):
+        self._zinc_widget.beginBatch()
+        return self._zinc_widget
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._zinc_widget.endBatch()
+        return False
+
+    def __call__(self, function):
+        zinc_widget = self._zinc_widget
+
+        @functools.wraps(function)
+        def batched(*args, **kwargs):
+            with _Batch(zinc_widget):
+                return function(*args, **kwargs)
+
+        return batched
+
+
+class ZincWidget(QtOpenGL.QGLWidget):
+
+    # Create a signal to notify when the sceneviewer is ready.
+    graphicsInitialized = Signal()
+    # Signals reporting the progress of asynchronous selections, the number
+    # of items applied to the selection group so far and the total.
+    selectionProgress = Signal(int, int)
+    selectionFinished = Signal()
+    selectionCancelled = Signal()
+    # Signal carrying the SelectionChanges made by each selection.  The changes
+    # are only worked out while something is connected to it.
+    selectionChanged = Signal(object)
+    # Signal emitted after each frame is rendered.
+    frameRendered = Signal()
+
+    # init start
+    def __init__(self, parent=None, shared=None):
+        '''
+        Call the super class init functions, set the  Zinc context and the scene viewer handle to None.
+        Initialise other attributes that deal with selection and the rotation of the plane.
+        '''
+        QtOpenGL.QGLWidget.__init__(self, parent, shared)
+        # Create a Zinc context from which all other objects can be derived either directly or indirectly.
+        self._context = None
+        self._sceneviewer = None
+        self._scene_resources = None
+
+        # Selection attributes
+        self._nodeSelectMode = True
+        self._dataSelectMode = True
+        self._elemSelectMode = True
+        self._selection_mode = SelectionMode.NONE
+        self._selectionGroup = None
+        self._selection_box = None
+        self._ignore_mouse_events = False
+        self._handle_mouse_events = False
+        self._spatial_index = None
+
+        # Mouse motion coalescing attributes
+        self._motion_coalescing = True
+        self._pending_motion = None
+        self._motion_dispatch_scheduled = False
+        self._last_motion_dispatch_time = None
+        self._motion_input = None
+        self._motion_events_received = 0
+        self._motion_events_dispatched = 0
+
+        # Asynchronous selection attributes
+        self._asynchronous_selection = False
+        self._selection_batch_size = 2000
+        self._selection_time_slice = 0.02
+        self._selection_job = None
+        self._selection_job_changes = None
+        self._selection_job_scheduled = False
+
+        # Camera state cached between sceneviewer transform changes
+        self._camera_cache = {}
+        self._camera_revision = 0
+
+        # Pick results cached by camera, scene and scene picker state
+        self._pick_cache = collections.OrderedDict()
+        self._pick_cache_size = 256
+        self._pick_cache_hits = 0
+        self._pick_cache_misses = 0
+        self._scene_revision = 0
+
+        # Repaint scheduling attributes
+        self._repaint_pending = False
+        self._repaint_dirty = False
+        self._rendering_suspended = 0
+        self._minimum_frame_interval = 0.0
+        self._last_repaint_time = None
+        self._repaints_requested = 0
+        self._repaints_performed = 0
+
+        # Image drawn instead of the scene, None to draw the scene
+        self._frame_override = None
+
+        # Change batching attributes
+        self._batch_depth = 0
+        self._batch_changes = None
+
+        # Performance monitoring, None when disabled
+        self._performance_monitor = None
+        self._performance_callback = None
+
+        # Interactive level of detail attributes
+        self._lod_enabled = False
+        self._lod_hidden_graphics_types = ()
+        self._lod_hidden_graphics_names = ()
+        self._lod_standin_graphics_names = ()
+        self._lod_antialias = None
+        self._lod_saved_antialias = None
+        self._lod_base_filter = None
+        self._lod_full_filter = None
+        self._lod_interactive_filter = None
+        self._lod_interactive = False
+        self._lod_timer = QtCore.QTimer(self)
+        self._lod_timer.setSingleShot(True)
+        self._lod_timer.timeout.connect(self._endInteraction)
+        # init end
+
+    def setContext(self, context):
+        '''
+        Sets the context for this ZincWidget.  This should be set before the initializeGL()
+        method is called otherwise the scene viewer cannot be created.
+        '''
+        self._context = context
+
+    def getContext(self):
+        if not self._context is None:
+            return self._context
+        else:
+            raise RuntimeError("Zinc context has not been set.")
+
+    def getSceneviewer(self):
+        '''
+        Get the scene viewer for this ZincWidget.
+        '''
+        return self._sceneviewer
+
+    def setSceneResources(self, scene_resources):
+        '''
+        Set the SceneResources to use, sharing the scene filter, scene picker,
+        selection group and selection box with other widgets given the same
+        SceneResources.  This must be set before the initializeGL() method is
+        called.
+        '''
+        self._scene_resources = scene_resources
+
+    def getSceneResources(self):
+        return self._scene_resources
+
+    def getSelectionGroup(self):
+        return self._selectionGroup
+    
+    def setSelectionModeAdditive(self):
+        self._selectionAlwaysAdditive = True
+
+    def setSelectModeNode(self):
+        self._nodeSelectMode = True
+        self._dataSelectMode = False
+        self._elemSelectMode = False
+
+    def setSelectModeData(self):
+        '''
+        Set the selection mode to select *only* datapoints.
+        '''
+        self._nodeSelectMode = False
+        self._dataSelectMode = True
+        self._elemSelectMode = False
+
+    def setSelectModeElement(self):
+        self._nodeSelectMode = False
+        self._dataSelectMode = False
+        self._elemSelectMode = True
+
+    def setSelectModeAll(self):
+        self._nodeSelectMode = True
+        self._dataSelectMode = True
+        self._elemSelectMode = True
+
+    # initializeGL start
+    def initializeGL(self):
+        '''
+        Initialise the Zinc scene for drawing the axis glyph at a point.  
+        '''
+        if self._sceneviewer is None:
+            if self._scene_resources is None:
+                self._scene_resources = SceneResources()
+            resources = self._scene_resources
+            self._sceneviewer, graphics_filter = create_sceneviewer(self._context, scenefilter=resources.scenefilter)
+            if not resources.isInitialised():
+                resources.initialise(self._context, graphics_filter)
+            fieldmodule = self._context.getDefaultRegion().getFieldmodule()
+
+            self._selectionGroup = resources.selection_group
+            self._scenepicker = resources.scenepicker
+            self._selection_box = resources.selection_box
+            attributes = self._selection_box.getGraphicspointattributes()
+            self._selectionBox_setBaseSize = attributes.setBaseSize
+            self._selectionBox_setGlyphOffset = attributes.setGlyphOffset
+
+            # Set up the project and unproject matrices, these are evaluated once per
+            # camera change and applied to points directly.
+            self._window_to_world_matrix = fieldmodule.createFieldSceneviewerProjection(self._sceneviewer, SCENECOORDINATESYSTEM_WINDOW_PIXEL_TOP_LEFT, SCENECOORDINATESYSTEM_WORLD)
+            self._world_to_window_matrix = fieldmodule.createFieldSceneviewerProjection(self._sceneviewer, SCENECOORDINATESYSTEM_WORLD, SCENECOORDINATESYSTEM_WINDOW_PIXEL_TOP_LEFT)
+            self._fieldcache = fieldmodule.createFieldcache()
+
+
+            self._sceneviewer.viewAll()
+
+    #  Not really applicable to us yet.
+    #         self._selection_notifier = scene.createSelectionnotifier()
+    #         self._selection_notifier.setCallback(self._zincSelectionEvent)
+
+            self._sceneviewernotifier = self._sceneviewer.createSceneviewernotifier()
+            self._sceneviewernotifier.setCallback(self._zincSceneviewerEvent)
+
+            self.graphicsInitialized.emit()
+            # initializeGL end
+
+    def _invalidateCameraCache(self):
+        '''
+        Forget the cached camera state, it is re-read from the scene viewer
+        the next time it is asked for.
+        '''
+        self._camera_cache.clear()
+        self._camera_revision += 1
+        self._pick_cache.clear()
+
+    def _getCameraValue(self, key, evaluate):
+        '''
+        Return the cached camera value for key, calling evaluate to get the
+        value from the scene viewer if it is not cached.  Values of None are
+        not cached.
+        '''
+        try:
+            return self._camera_cache[key]
+        except KeyError:
+            value = evaluate()
+            if value is not None:
+                self._camera_cache[key] = value
+
+            return value
+
+    def getCameraRevision(self):
+        '''
+        Get a number that changes every time the camera state changes.
+        '''
+        return self._camera_revision
+
+    def setProjectionMode(self, mode):
+        if mode == ProjectionMode.PARALLEL:
+            self._sceneviewer.setProjectionMode(Sceneviewer.PROJECTION_MODE_PARALLEL)
+        elif mode == ProjectionMode.PERSPECTIVE:
+            self._sceneviewer.setProjectionMode(Sceneviewer.PROJECTION_MODE_PERSPECTIVE)
+        self._invalidateCameraCache()
+
+    def _evaluateProjectionMode(self):
+        projection_mode = self._sceneviewer.getProjectionMode()
+        if projection_mode == Sceneviewer.PROJECTION_MODE_PARALLEL:
+            return ProjectionMode.PARALLEL
+        elif projection_mode == Sceneviewer.PROJECTION_MODE_PERSPECTIVE:
+            return ProjectionMode.PERSPECTIVE
+
+        return None
+
+    def getProjectionMode(self):
+        return self._getCameraValue('projection_mode', self._evaluateProjectionMode)
+
+    def _evaluateViewParameters(self):
+        result, eye, lookat, up = self._sceneviewer.getLookatParameters()
+        if result == OK:
+            angle = self._sceneviewer.getViewAngle()
+            return (eye, lookat, up, angle)
+
+        return None
+
+    def getViewParameters(self):
+        view_parameters = self._getCameraValue('view_parameters', self._evaluateViewParameters)
+        if view_parameters is not None:
+            eye, lookat, up, angle = view_parameters
+            return (list(eye), list(lookat), list(up), angle)
+
+        return None
+
+    def setViewParameters(self, eye, lookat, up, angle):
+        self._sceneviewer.beginChange()
+        self._sceneviewer.setLookatParametersNonSkew(eye, lookat, up)
+        self._sceneviewer.setViewAngle(angle)
+        self._sceneviewer.endChange()
+        self._invalidateCameraCache()
+
+    def setScenefilter(self, scenefilter):
+        if self._lod_enabled:
+            self._lod_base_filter = scenefilter
+            self._buildLevelOfDetailFilters()
+            self._applyLevelOfDetailFilter()
+        else:
+            self._sceneviewer.setScenefilter(scenefilter)
+
+    def getScenefilter(self):
+        '''
+        Get the scene filter of the scene viewer.  When the interactive level of
+        detail is enabled this is the filter set by the user, not the filter
+        derived from it that is actually in use.
+        '''
+        if self._lod_enabled:
+            return self._lod_base_filter
+
+        result, scenefilter = self._sceneviewer.getScenefilter()
+        if result == OK:
+            return scenefilter
+
+        return None
+
+    def getScenepicker(self):
+        return self._scenepicker
+
+    def setPickingRectangle(self, coordinate_system, left, bottom, right, top):
+        self._setPickerRectangle(coordinate_system, left, bottom, right, top)
+
+    def _setPickerRectangle(self, coordinate_system, left, bottom, right, top):
+        self._scenepicker.setSceneviewerRectangle(self._sceneviewer, coordinate_system, left, bottom, right, top)
+        self._scene_resources.picking_rectangle = (self, coordinate_system, left, bottom, right, top)
+
+    def setSelectionfilter(self, scenefilter):
+        self._scenepicker.setScenefilter(scenefilter)
+        self._scene_resources.scenepicker_revision += 1
+
+    def getSelectionfilter(self):
+        result, scenefilter = self._scenepicker.getScenefilter()
+        if result == OK:
+            return scenefilter
+
+        return None
+
+    def _evaluateMatrix(self, matrix_field):
+        result, values = matrix_field.evaluateReal(self._fieldcache, 16)
+        if result == OK:
+            # The matrix is cached and shared, so it is made read only.
+            matrix = numpy.array(values, dtype=numpy.float64).reshape(4, 4)
+            matrix.flags.writeable = False
+            return matrix
+
+        return None
+
+    def getWorldToWindowMatrix(self):
+        '''
+        Get the 4x4 matrix transforming world coordinates to window pixel
+        coordinates (top left origin), in which y is negative down the window.
+        The matrix is read only, copy it to modify it.
+        '''
+        return self._getCameraValue('world_to_window', lambda: self._evaluateMatrix(self._world_to_window_matrix))
+
+    def getWindowToWorldMatrix(self):
+        '''
+        Get the 4x4 matrix transforming window pixel coordinates (top left
+        origin) to world coordinates.  The matrix is read only, copy it to
+        modify it.
+        '''
+        return self._getCameraValue('window_to_world', lambda: self._evaluateMatrix(self._window_to_world_matrix))
+
+    def project(self, x, y, z):
+        matrix = self.getWorldToWindowMatrix()
+        if matrix is not None:
+            return transform_points(matrix, [x, y, z])[0].tolist()
+
+        return None
+
+    def unproject(self, x, y, z):
+        matrix = self.getWindowToWorldMatrix()
+        if matrix is not None:
+            return transform_points(matrix, [x, y, z])[0].tolist()
+
+        return None
+
+    def projectPoints(self, points):
+        '''
+        Project an (N, 3) array of world coordinates into window pixel coordinates
+        (top left origin), in which y is negative down the window, see
+        zincwidget.window_to_widget_coordinates().  The projection matrix is read once and applied to all
+        the points together, the result is an (N, 3) array.
+        '''
+        matrix = self.getWorldToWindowMatrix()
+        if matrix is None:
+            return None
+
+        return transform_points(matrix, points)
+
+    def unprojectPoints(self, points):
+        '''
+        Unproject an (N, 3) array of window pixel coordinates (top left origin) into
+        world coordinates, the result is an (N, 3) array.
+        '''
+        matrix = self.getWindowToWorldMatrix()
+        if matrix is None:
+            return None
+
+        return transform_points(matrix, points)
+
+    def _evaluateViewportSize(self):
+        result, width, height = self._sceneviewer.getViewportSize()
+        if result == OK:
+            return (width, height)
+
+        return None
+
+    def getViewportSize(self):
+        return self._getCameraValue('viewport_size', self._evaluateViewportSize)
+
+    def setTumbleRate(self, rate):
+        self._sceneviewer.setTumbleRate(rate)
+
+    def setPickCacheSize(self, size):
+        '''
+        Set the maximum number of pick results kept, the least recently used
+        results are discarded first.  Results are only reused while the camera,
+        the scene and the scene filter of the scene picker are unchanged.  A
+        size of zero disables the cache.
+        '''
+        self._pick_cache_size = size
+        while len(self._pick_cache) > max(size, 0):
+            self._pick_cache.popitem(last=False)
+
+    def getPickCacheSize(self):
+        return self._pick_cache_size
+
+    def getPickCacheStatistics(self):
+        '''
+        Get a dict with the number of pick cache 'hits' and 'misses' and the
+        number of results currently cached, its 'size'.
+        '''
+        return {'hits': self._pick_cache_hits,
+                'misses': self._pick_cache_misses,
+                'size': len(self._pick_cache)}
+
+    def resetPickCacheStatistics(self):
+        self._pick_cache_hits = 0
+        self._pick_cache_misses = 0
+
+    def clearPickCache(self):
+        self._pick_cache.clear()
+
+    def _cachedPick(self, key, pick):
+        '''
+        Return the result of calling pick, reusing the result cached for the
+        key while the camera, scene and scene picker are unchanged.
+        '''
+        if self._pick_cache_size <= 0:
+            with self._profile('pick'):
+                return pick()
+
+        key = (self._camera_revision, self._scene_revision, self._scene_resources.scenepicker_revision) + key
+        cache = self._pick_cache
+        if key in cache:
+            self._pick_cache_hits += 1
+            result = cache.pop(key)
+        else:
+            self._pick_cache_misses += 1
+            with self._profile('pick'):
+                result = pick()
+            if len(cache) >= self._pick_cache_size:
+                cache.popitem(last=False)
+        cache[key] = result
+
+        return result
+
+    def _setPickerPoint(self, x, y):
+        '''
+        Set the scene picker rectangle to the pixel at x, y.  It is set even
+        when the pick result is cached, so callers following a pick with their
+        own queries of the scene picker get results for this position.
+        '''
+        self._setPickerRectangle(SCENECOORDINATESYSTEM_LOCAL, x - 0.5, y - 0.5, x + 0.5, y + 0.5)
+
+    def _getNearestGraphic(self, x, y, domain_type):
+        self._setPickerPoint(x, y)
+        nearest_graphics = self._cachedPick(('graphics', int(round(x)), int(round(y))), self._scenepicker.getNearestGraphics)
+        if nearest_graphics.isValid() and nearest_graphics.getFieldDomainType() == domain_type:
+            return nearest_graphics
+
+        return None
+
+    def getNeareshGraphics(self):
+        '''
+        Get the nearest graphics in the rectangle last set with
+        setPickingRectangle().
+        '''
+        rectangle = self._scene_resources.picking_rectangle
+        if rectangle is None or rectangle[0] is not self:
+            with self._profile('pick'):
+                return self._scenepicker.getNearestGraphics()
+
+        coordinate_system, left, bottom, right, top = rectangle[1:]
+        key = ('graphics_rectangle', coordinate_system, int(round(left)), int(round(bottom)), int(round(right)), int(round(top)))
+        return self._cachedPick(key, self._scenepicker.getNearestGraphics)
+
+    def getNearestGraphicsNode(self, x, y):
+        return self._getNearestGraphic(x, y, Field.DOMAIN_TYPE_NODES)
+
+    def getNearestGraphicsPoint(self, x, y):
+        '''
+        Assuming given x and y is in the sending widgets coordinates 
+        which is a parent of this widget.  For example the values given 
+        directly from the event in the parent widget.
+        '''
+        return self._getNearestGraphic(x, y, Field.DOMAIN_TYPE_POINT)
+
+    def getNearestNode(self, x, y, exact=False):
+        '''
+        Get the node nearest the viewer at the window position x, y.  If a
+        spatial index is set it is used to find the node, unless exact is
+        True in which case the scene picker is always used.
+        '''
+        spatial_index = None if exact else self._getSpatialIndex()
+        if spatial_index is not None:
+            with self._profile('pick'):
+                return spatial_index.findNearestNode(x, y)
+
+        self._setPickerPoint(x, y)
+        return self._cachedPick(('node', int(round(x)), int(round(y))), self._scenepicker.getNearestNode)
+
+    def setSpatialIndex(self, spatial_index):
+        '''
+        Set a zincspatialindex.SpatialIndex to pick nodes, and rubber band
+        select nodes and elements, on the CPU instead of with the scene picker.
+        Graphics are still picked with the scene picker.  Set None to always
+        use the scene picker.
+        '''
+        self._spatial_index = spatial_index
+
+    def getSpatialIndex(self):
+        return self._spatial_index
+
+    def _getSpatialIndex(self):
+        '''
+        Return the spatial index with its camera updated for this scene viewer,
+        or None if no spatial index is set.
+        '''
+        if self._spatial_index is not None:
+            # The index may be shared with other scene viewers, which number
+            # their camera revisions independently.
+            self._spatial_index.setCamera(self.getWorldToWindowMatrix(), self.getViewportSize(),
+                                          (id(self), self._camera_revision))
+
+        return self._spatial_index
+
+    def _getSelectionRegionGroup(self, region):
+        '''
+        Get the group of the selection group for the region, creating it and
+        the groups of the regions above it if needed.
+        '''
+        group = self._selectionGroup
+        parent = self._context.getDefaultRegion()
+        for name in _getRegionPath(region):
+            parent = parent.findChild(name)
+            subgroup = group.getSubregionFieldGroup(parent)
+            if not subgroup.isValid():
+                subgroup = group.createSubregionFieldGroup(parent)
+            group = subgroup
+
+        return group
+
+    def _getSelectionNodesetGroup(self, nodeset):
+        group = self._getSelectionRegionGroup(nodeset.getFieldmodule().getRegion())
+        nodegroup = group.getFieldNodeGroup(nodeset)
+        if not nodegroup.isValid():
+            nodegroup = group.createFieldNodeGroup(nodeset)
+
+        return nodegroup.getNodesetGroup()
+
+    def _getSelectionMeshGroup(self, mesh):
+        group = self._getSelectionRegionGroup(mesh.getFieldmodule().getRegion())
+        elementgroup = group.getFieldElementGroup(mesh)
+        if not elementgroup.isValid():
+            elementgroup = group.createFieldElementGroup(mesh)
+
+        return elementgroup.getMeshGroup()
+
+    def _findIndexedInRectangle(self, spatial_index, left, bottom, right, top):
+        '''
+        Find the nodes and elements in the window rectangle with the spatial
+        index, respecting the selection modes.  Returns a list of (key, domain,
+        items) where domain is the nodeset or mesh of the items found, key
+        identifies it as _getDomainKey() does and items is a sequence of the
+        nodes or elements found.
+        '''
+        found = []
+        if self._nodeSelectMode or self._dataSelectMode:
+            for name, identifiers in spatial_index.findNodesInRectangle(left, bottom, right, top).items():
+                if self._dataSelectMode if name == 'datapoints' else self._nodeSelectMode:
+                    nodeset = spatial_index.getNodeset(name)
+                    found.append((_getDomainKey(nodeset), nodeset, _IdentifiedItems(nodeset.findNodeByIdentifier, identifiers)))
+        if self._elemSelectMode:
+            for name, identifiers in spatial_index.findElementsInRectangle(left, bottom, right, top).items():
+                mesh = spatial_index.getMesh(name)
+                found.append((_getDomainKey(mesh), mesh, _IdentifiedItems(mesh.findElementByIdentifier, identifiers)))
+
+        return found
+
+    def addPickedNodesToFieldGroup(self, selection_group):
+        self._scenepicker.addPickedNodesToFieldGroup(selection_group)
+
+    def setIgnoreMouseEvents(self, value):
+        self._ignore_mouse_events = value
+
+    def viewAll(self):
+        '''
+        Helper method to set the current scene viewer to view everything
+        visible in the current scene.
+        '''
+        self._sceneviewer.viewAll()
+
+    def setPerformanceMonitoringEnabled(self, enabled, window_size=1000):
+        '''
+        Enable or disable timing of the render, resize, pick, selection update
+        and input dispatch paths.  Percentiles are reported over the last
+        window_size samples of each path.
+        '''
+        if enabled:
+            if self._performance_monitor is None:
+                self._performance_monitor = PerformanceMonitor(window_size, self._performance_callback)
+        else:
+            self._performance_monitor = None
+
+    def isPerformanceMonitoringEnabled(self):
+        return self._performance_monitor is not None
+
+    def setPerformanceCallback(self, callback):
+        '''
+        Set a callable that is called with the path name and duration, in
+        seconds, of every timed path while performance monitoring is enabled.
+        '''
+        self._performance_callback = callback
+        if self._performance_monitor is not None:
+            self._performance_monitor.setCallback(callback)
+
+    def getPerformanceStats(self):
+        '''
+        Get the timing statistics for each of the monitored paths, see
+        PerformanceMonitor.getStatistics().  An empty dict is returned when
+        performance monitoring is disabled.
+        '''
+        if self._performance_monitor is None:
+            return {}
+
+        return self._performance_monitor.getStatistics()
+
+    def resetPerformanceStats(self):
+        if self._performance_monitor is not None:
+            self._performance_monitor.reset()
+
+    def _profile(self, name):
+        if self._performance_monitor is None:
+            return _NULL_SECTION
+
+        return self._performance_monitor.section(name)
+
+    def setMaximumFrameRate(self, rate):
+        '''
+        Limit the rate at which repaints requested by the scene viewer are
+        performed, in frames per second.  A rate of zero or None removes the limit.
+        '''
+        if rate:
+            self._minimum_frame_interval = 1.0 / rate
+        else:
+            self._minimum_frame_interval = 0.0
+
+    def getMaximumFrameRate(self):
+        if self._minimum_frame_interval > 0.0:
+            return 1.0 / self._minimum_frame_interval
+
+        return None
+
+    def suspendRendering(self):
+        '''
+        Stop repainting the scene until a matching call to resumeRendering().
+        Calls may be nested, repaints requested while rendering is suspended
+        are combined into a single repaint when rendering resumes.
+        '''
+        self._rendering_suspended += 1
+
+    def resumeRendering(self):
+        '''
+        Resume repainting the scene after a call to suspendRendering().
+        '''
+        if self._rendering_suspended > 0:
+            self._rendering_suspended -= 1
+            if self._rendering_suspended == 0 and self._repaint_dirty:
+                self._repaint_dirty = False
+                self._scheduleRepaint(False)
+
+    def isRenderingSuspended(self):
+        return self._rendering_suspended > 0
+
+    @contextlib.contextmanager
+    def renderingSuspended(self):
+        '''
+        Context manager suspending rendering for the duration of a bulk edit,
+        for example:
+
+            with zinc_widget.renderingSuspended():
+                ...
+        '''
+        self.suspendRendering()
+        try:
+            yield self
+        finally:
+            self.resumeRendering()
+
+    def beginBatch(self):
+        '''
+        Start a batch of changes.  Change notification is suspended for the
+        default region and its subregions, its scene and the scene viewer, and
+        rendering is suspended, until the matching call to endBatch().  Calls
+        may be nested, only the outermost batch has any effect.
+        '''
+        if self._batch_depth == 0:
+            self._batch_changes = SelectionChanges()
+            region = self._context.getDefaultRegion()
+            region.beginHierarchicalChange()
+            region.getScene().beginChange()
+            if self._sceneviewer is not None:
+                self._sceneviewer.beginChange()
+            self.suspendRendering()
+        self._batch_depth += 1
+
+    def endBatch(self):
+        '''
+        End a batch of changes.  When the outermost batch ends the changes are
+        notified together, followed by at most one repaint and one
+        selectionChanged signal holding all the selection changes made by the
+        widget during the batch.
+        '''
+        if self._batch_depth == 0:
+            return
+
+        self._batch_depth -= 1
+        if self._batch_depth == 0:
+            changes = self._batch_changes
+            try:
+                if self._sceneviewer is not None:
+                    self._sceneviewer.endChange()
+                region = self._context.getDefaultRegion()
+                region.getScene().endChange()
+                region.endHierarchicalChange()
+            finally:
+                self._batch_changes = None
+                self.resumeRendering()
+            self._emitSelectionChanged(changes)
+
+    def isBatching(self):
+        return self._batch_depth > 0
+
+    def batch(self):
+        '''
+        Return a context manager, also usable as a decorator, that makes all
+        the changes within it one batch, see beginBatch().  For example:
+
+            with zinc_widget.batch():
+                ...
+
+            @zinc_widget.batch()
+            def update():
+                ...
+        '''
+        return _Batch(self)
+
+    def setFrameOverride(self, image):
+        '''
+        Draw the QImage instead of rendering the scene, scaled to the widget,
+        until clearFrameOverride() is called.  Used to show frames rendered
+        ahead of time, for example by zinctimeplayback.TimePlayback.
+        '''
+        self._frame_override = image
+        self._scheduleRepaint(False)
+
+    def clearFrameOverride(self):
+        if self._frame_override is not None:
+            self._frame_override = None
+            self._scheduleRepaint(False)
+
+    def getFrameOverride(self):
+        return self._frame_override
+
+    def getRepaintStatistics(self):
+        '''
+        Get a dict with the number of repaints 'requested' by the scene viewer
+        and the number of repaints 'performed'.
+        '''
+        return {'requested': self._repaints_requested,
+                'performed': self._repaints_performed}
+
+    def resetRepaintStatistics(self):
+        self._repaints_requested = 0
+        self._repaints_performed = 0
+
+    def setInteractiveLevelOfDetail(self, hidden_graphics_types=(Graphics.TYPE_SURFACES,), hidden_graphics_names=(),
+                                    standin_graphics_names=(), antialias=0, idle_timeout=0.3):
+        '''
+        Enable an interactive quality used while the camera is moved with the
+        mouse.  Graphics of the hidden types or with the hidden names are not
+        drawn while a mouse button is held, and graphics with the stand in
+        names, for example copies of the heavy graphics with a coarse
+        tessellation or sparse glyphs, are only drawn then.  If antialias is
+        not None the antialias sampling is set to it while interacting.  Full
+        quality is restored idle_timeout seconds after the button is released.
+        This should be called after the initializeGL() method is called.
+        '''
+        if not self._lod_enabled:
+            self._lod_base_filter = self.getScenefilter()
+        self._lod_enabled = True
+        self._lod_hidden_graphics_types = tuple(hidden_graphics_types)
+        self._lod_hidden_graphics_names = tuple(hidden_graphics_names)
+        self._lod_standin_graphics_names = tuple(standin_graphics_names)
+        self._lod_antialias = antialias
+        self._lod_timer.setInterval(int(idle_timeout * 1000.0))
+        self._buildLevelOfDetailFilters()
+        self._applyLevelOfDetailFilter()
+
+    def disableInteractiveLevelOfDetail(self):
+        '''
+        Stop using the interactive quality, restoring the scene filter set by
+        the user.
+        '''
+        if self._lod_enabled:
+            self._lod_timer.stop()
+            if self._lod_interactive:
+                self._endInteraction()
+            self._lod_enabled = False
+            self._sceneviewer.setScenefilter(self._lod_base_filter)
+            self._lod_base_filter = None
+            self._lod_full_filter = None
+            self._lod_interactive_filter = None
+
+    def isInteractiveLevelOfDetailEnabled(self):
+        return self._lod_enabled
+
+    def isInteracting(self):
+        '''
+        Return True if the scene is currently drawn at the interactive quality.
+        '''
+        return self._lod_interactive
+
+    def _createGraphicsFilter(self, filtermodule, graphics_types, graphics_names):
+        '''
+        Create a scene filter matching graphics of any of the types or names,
+        or return None if there are none.
+        '''
+        operands = [filtermodule.createScenefilterGraphicsType(graphics_type) for graphics_type in graphics_types] + \
+            [filtermodule.createScenefilterGraphicsName(name) for name in graphics_names]
+        if not operands:
+            return None
+
+        scenefilter = filtermodule.createScenefilterOperatorOr()
+        for operand in operands:
+            scenefilter.appendOperand(operand)
+
+        return scenefilter
+
+    def _buildLevelOfDetailFilters(self):
+        '''
+        Build the full quality filter, the user's filter without the stand ins,
+        and the interactive filter, the user's filter without the heavy graphics.
+        '''
+        filtermodule = self._context.getScenefiltermodule()
+        filters = []
+        for excluded in (self._createGraphicsFilter(filtermodule, (), self._lod_standin_graphics_names),
+                         self._createGraphicsFilter(filtermodule, self._lod_hidden_graphics_types, self._lod_hidden_graphics_names)):
+            scenefilter = filtermodule.createScenefilterOperatorAnd()
+            if self._lod_base_filter is not None:
+                scenefilter.appendOperand(self._lod_base_filter)
+            if excluded is not None:
+                excluded.setInverse(True)
+                scenefilter.appendOperand(excluded)
+            filters.append(scenefilter)
+        self._lod_full_filter, self._lod_interactive_filter = filters
+
+    def _applyLevelOfDetailFilter(self):
+        if self._lod_interactive:
+            self._sceneviewer.setScenefilter(self._lod_interactive_filter)
+        else:
+            self._sceneviewer.setScenefilter(self._lod_full_filter)
+
+    def _beginInteraction(self):
+        '''
+        Switch to the interactive quality when the camera starts to be moved.
+        '''
+        if not self._lod_enabled:
+            return
+
+        self._lod_timer.stop()
+        if not self._lod_interactive:
+            self._lod_interactive = True
+            self._sceneviewer.beginChange()
+            self._applyLevelOfDetailFilter()
+            if self._lod_antialias is not None:
+                self._lod_saved_antialias = self._sceneviewer.getAntialiasSampling()
+                self._sceneviewer.setAntialiasSampling(self._lod_antialias)
+            self._sceneviewer.endChange()
+
+    def _scheduleEndInteraction(self):
+        if self._lod_interactive:
+            self._lod_timer.start()
+
+    def _endInteraction(self):
+        '''
+        Restore the full quality after the camera has stopped moving.
+        '''
+        if not self._lod_interactive:
+            return
+
+        self._lod_interactive = False
+        self._sceneviewer.beginChange()
+        self._applyLevelOfDetailFilter()
+        if self._lod_saved_antialias is not None:
+            self._sceneviewer.setAntialiasSampling(self._lod_saved_antialias)
+            self._lod_saved_antialias = None
+        self._sceneviewer.endChange()
+
+    def _scheduleRepaint(self, count=True):
+        '''
+        Schedule a repaint of the scene.  At most one repaint is pending at any
+        time and repaints are spaced to keep within the maximum frame rate.
+        '''
+        if count:
+            self._repaints_requested += 1
+        if self._rendering_suspended:
+            self._repaint_dirty = True
+        elif not self._repaint_pending:
+            self._repaint_pending = True
+            QtCore.QTimer.singleShot(self._getFrameDelay(self._last_repaint_time), self._performRepaint)
+
+    def _getFrameDelay(self, last_time):
+        '''
+        Get the delay in milliseconds until a frame interval has passed since
+        last_time, zero if there is no maximum frame rate.
+        '''
+        if self._minimum_frame_interval > 0.0 and last_time is not None:
+            remaining = self._minimum_frame_interval - (clock() - last_time)
+            if remaining > 0.0:
+                return int(remaining * 1000.0 + 0.5)
+
+        return 0
+
+    def _performRepaint(self):
+        self._repaint_pending = False
+        if self._rendering_suspended:
+            self._repaint_dirty = True
+        else:
+            self.updateGL()
+
+    # paintGL start
+    def paintGL(self):
+        '''
+        Render the scene for this scene viewer.  The QGLWidget has already set up the
+        correct OpenGL buffer for us so all we need do is render into it.  The scene viewer
+        will clear the background so any OpenGL drawing of your own needs to go after this
+        API call.
+        '''
+        with self._profile('render'):
+            if self._frame_override is None:
+                self._sceneviewer.renderScene()
+            else:
+                painter = QtGui.QPainter(self)
+                painter.drawImage(self.rect(), self._frame_override)
+                painter.end()
+        self._last_repaint_time = clock()
+        self._repaints_performed += 1
+        self.frameRendered.emit()
+        # paintGL end
+
+    def _zincSceneviewerEvent(self, event):
+        '''
+        Process a scene viewer event.  The cached camera state is invalidated
+        for a transform event.  For a repaint required event the cached pick
+        results are discarded and a repaint is scheduled.  All other events are
+        ignored.
+        '''
+        if event.getChangeFlags() & Sceneviewerevent.CHANGE_FLAG_TRANSFORM:
+            self._invalidateCameraCache()
+        if event.getChangeFlags() & Sceneviewerevent.CHANGE_FLAG_REPAINT_REQUIRED:
+            # The scene, or how it is drawn, has changed.
+            self._scene_revision += 1
+            self._pick_cache.clear()
+            self._scheduleRepaint()
+
+#  Not applicable at the current point in time.
+#     def _zincSelectionEvent(self, event):
+#         print(event.getChangeFlags())
+#         print('go the selection change')
+
+    # resizeGL start
+    def resizeGL(self, width, height):
+        '''
+        Respond to widget resize events.
+        '''
+        with self._profile('resize'):
+            self._sceneviewer.setViewportSize(width, height)
+        self._invalidateCameraCache()
+        # resizeGL end
+
+    def mousePressEvent(self, event):
+        '''
+        Inform the scene viewer of a mouse press event.
+        '''
+        event.accept()
+        self._flushMotion()
+        self._handle_mouse_events = False  # Track when the zinc should be handling mouse events
+        if not self._ignore_mouse_events and (event.modifiers() & QtCore.Qt.SHIFT) and (self._nodeSelectMode or self._elemSelectMode) and button_map[event.button()] == Sceneviewerinput.BUTTON_TYPE_LEFT:
+            self.cancelSelection()
+            self._selection_position_start = (event.x(), event.y())
+            self._selection_mode = SelectionMode.EXCLUSIVE
+            if event.modifiers() & QtCore.Qt.ALT:
+                self._selection_mode = SelectionMode.ADDITIVE
+        elif not self._ignore_mouse_events and not event.modifiers() or (event.modifiers() & QtCore.Qt.SHIFT and button_map[event.button()] == Sceneviewerinput.BUTTON_TYPE_RIGHT):
+            scene_input = self._sceneviewer.createSceneviewerinput()
+            scene_input.setPosition(event.x(), event.y())
+            scene_input.setEventType(Sceneviewerinput.EVENT_TYPE_BUTTON_PRESS)
+            scene_input.setButtonType(button_map[event.button()])
+            scene_input.setModifierFlags(modifier_map(event.modifiers()))
+
+            with self._profile('input_dispatch'):
+                self._sceneviewer.processSceneviewerinput(scene_input)
+
+            self._handle_mouse_events = True
+            self._beginInteraction()
+        else:
+            event.ignore()
+
+    def setAsynchronousSelectionEnabled(self, enabled, batch_size=2000, time_slice=0.02):
+        '''
+        When enabled rubber band selections are applied to the selection group
+        in batches of at most batch_size nodes or elements, for time slices of
+        time_slice seconds driven by the Qt event loop, so the user interface
+        stays responsive.  Progress is reported with the selectionProgress
+        signal and starting a new selection cancels an unfinished one.
+        '''
+        self._asynchronous_selection = enabled
+        self._selection_batch_size = batch_size
+        self._selection_time_slice = time_slice
+
+    def isAsynchronousSelectionEnabled(self):
+        return self._asynchronous_selection
+
+    def isSelectionInProgress(self):
+        return self._selection_job is not None
+
+    def cancelSelection(self):
+        '''
+        Stop applying an unfinished asynchronous selection.  The batches already
+        applied are left in the selection group.
+        '''
+        if self._selection_job is not None:
+            self._selection_job = None
+            self.selectionCancelled.emit()
+
+    def _selectionSteps(self, left, bottom, right, top, exclusive, changes):
+        '''
+        Generator applying a rubber band selection to the selection group in
+        batches, yielding the number of items applied and the total after each
+        batch.  The nodes and elements added to or removed from the selection
+        are recorded in changes.
+        '''
+        spatial_index = self._getSpatialIndex()
+        if spatial_index is not None:
+            found = self._findIndexedInRectangle(spatial_index, left, bottom, right, top)
+        else:
+            # Pick into a scratch group which is then copied in batches.
+            scratch_group = self._selectionGroup.getFieldmodule().createFieldGroup()
+            self._setPickerRectangle(SCENECOORDINATESYSTEM_LOCAL, left, bottom, right, top)
+            if self._nodeSelectMode or self._dataSelectMode:
+                self._scenepicker.addPickedNodesToFieldGroup(scratch_group)
+            if self._elemSelectMode:
+                self._scenepicker.addPickedElementsToFieldGroup(scratch_group)
+            found = _getGroupContents(scratch_group)
+
+        total = sum(len(items) for name, domain, items in found)
+        done = 0
+        if exclusive:
+            self._clearSelection(changes)
+        yield done, total
+        for name, domain, items in found:
+            if isinstance(domain, Mesh):
+                group = self._getSelectionMeshGroup(domain)
+                contains, add = group.containsElement, group.addElement
+            else:
+                group = self._getSelectionNodesetGroup(domain)
+                contains, add = group.containsNode, group.addNode
+            added = []
+            batch = 0
+            for item in items:
+                if not contains(item):
+                    add(item)
+                    added.append(item.getIdentifier())
+                batch += 1
+                if batch == self._selection_batch_size:
+                    changes.add(name, added)
+                    added = []
+                    done += batch
+                    batch = 0
+                    yield done, total
+            changes.add(name, added)
+            done += batch
+        yield done, total
+
+    def _startSelectionJob(self, left, bottom, right, top, exclusive):
+        self.cancelSelection()
+        self._selection_job_changes = SelectionChanges()
+        self._selection_job = self._selectionSteps(left, bottom, right, top, exclusive, self._selection_job_changes)
+        self._scheduleSelectionJob()
+
+    def _scheduleSelectionJob(self):
+        if not self._selection_job_scheduled:
+            self._selection_job_scheduled = True
+            QtCore.QTimer.singleShot(0, self._runSelectionJob)
+
+    def _runSelectionJob(self):
+        '''
+        Apply batches of the current selection job for one time slice.
+        '''
+        self._selection_job_scheduled = False
+        job = self._selection_job
+        if job is None:
+            return
+
+        finished = False
+        progress = None
+        deadline = clock() + self._selection_time_slice
+        root_region = self._context.getDefaultRegion()
+        with self._profile('selection_update'):
+            root_region.beginHierarchicalChange()
+            try:
+                while clock() < deadline:
+                    progress = next(job)
+            except StopIteration:
+                finished = True
+            finally:
+                root_region.endHierarchicalChange()
+
+        if job is not self._selection_job:
+            # Cancelled from a handler of the change notifications.
+            return
+        self._emitSelectionChanged(self._selection_job_changes.take())
+        if progress is not None:
+            self.selectionProgress.emit(*progress)
+        if finished:
+            self._selection_job = None
+            self.selectionFinished.emit()
+        else:
+            self._scheduleSelectionJob()
+
+    def _emitSelectionChanged(self, changes):
+        if self._batch_changes is not None:
+            self._batch_changes.extend(changes)
+        elif not changes.isEmpty():
+            self.selectionChanged.emit(changes)
+
+    def getSelectionArrays(self):
+        '''
+        Get the selection as a dict of sorted int32 arrays of the identifiers of
+        the selected nodes and elements, keyed by nodeset or mesh name.  Those
+        in subregions are keyed by the name prefixed with the path of their
+        region, for example 'heart/left/nodes'.
+        '''
+        arrays = {}
+        for name, domain, items in _getGroupContents(self._selectionGroup):
+            identifiers = numpy.fromiter((item.getIdentifier() for item in items), dtype=numpy.int32, count=len(items))
+            identifiers.sort()
+            arrays[name] = identifiers
+
+        return arrays
+
+    def setSelectionArrays(self, arrays, additive=False):
+        '''
+        Set the selection from a dict of arrays of identifiers keyed by nodeset
+        or mesh name, as returned by getSelectionArrays().  Unless additive is
+        True the selection is replaced.  Only the differences from the current
+        selection are applied, all within one hierarchical change, and they are
+        notified with a single selectionChanged signal.  Identifiers that are
+        not in the nodeset or mesh are ignored.
+        '''
+        current = self.getSelectionArrays()
+        changes = SelectionChanges()
+        empty = numpy.zeros(0, dtype=numpy.int32)
+        names = set(arrays) if additive else set(arrays) | set(current)
+        root_region = self._context.getDefaultRegion()
+        root_region.beginHierarchicalChange()
+        try:
+            for name in sorted(names):
+                domain = _findDomain(root_region, name)
+                fieldmodule = domain.getFieldmodule()
+                if isinstance(domain, Mesh):
+                    group = self._getSelectionMeshGroup(domain)
+                    find, add, remove = domain.findElementByIdentifier, group.addElement, group.removeElement
+                    add_all, remove_all = group.addElementsConditional, group.removeAllElements
+                else:
+                    group = self._getSelectionNodesetGroup(domain)
+                    find, add, remove = domain.findNodeByIdentifier, group.addNode, group.removeNode
+                    add_all, remove_all = group.addNodesConditional, group.removeAllNodes
+
+                selected = current.get(name, empty)
+                identifiers = numpy.unique(numpy.asarray(arrays.get(name, empty), dtype=numpy.int32))
+                added = numpy.setdiff1d(identifiers, selected, assume_unique=True)
+                if not additive:
+                    removed = numpy.setdiff1d(selected, identifiers, assume_unique=True)
+                    if removed.size == selected.size and removed.size:
+                        remove_all()
+                    else:
+                        for identifier in removed.tolist():
+                            remove(find(identifier))
+                    changes.remove(name, removed.tolist())
+
+                if added.size:
+                    found = []
+                    items = []
+                    for identifier in added.tolist():
+                        item = find(identifier)
+                        if item.isValid():
+                            items.append(item)
+                            found.append(identifier)
+                    if len(found) == added.size and identifiers.size == domain.getSize():
+                        # Every identifier is in the domain and there are as many as
+                        # in the domain, so everything is selected: add it all at once.
+                        add_all(fieldmodule.createFieldConstant([1.0]))
+                    else:
+                        for item in items:
+                            add(item)
+                    changes.add(name, found)
+        finally:
+            root_region.endHierarchicalChange()
+        self._emitSelectionChanged(changes)
+
+    def saveSelection(self, file_name, compressed=False):
+        '''
+        Save the selection to a NumPy .npz file, see write_selection_arrays().
+        '''
+        write_selection_arrays(file_name, self.getSelectionArrays(), compressed)
+
+    def loadSelection(self, file_name, additive=False):
+        '''
+        Set the selection from a file written by saveSelection().
+        '''
+        self.setSelectionArrays(read_selection_arrays(file_name), additive)
+
+    def _isSelectionChangedConnected(self):
+        '''
+        Return True if anything is connected to the selectionChanged signal, if
+        not the changes to the selection need not be worked out.
+        '''
+        return self.receivers(QtCore.SIGNAL('selectionChanged(' + PYOBJECT_TYPE + ')')) > 0
+
+    def _clearSelection(self, changes):
+        '''
+        Clear the selection group, recording everything in it as removed if
+        anything is connected to the selectionChanged signal.
+        '''
+        if self._isSelectionChangedConnected():
+            for name, domain, items in _getGroupContents(self._selectionGroup):
+                changes.remove(name, [item.getIdentifier() for item in items])
+        self._selectionGroup.clear()
+
+    def _getSelectionRectangle(self, x, y):
+        '''
+        Return (left, bottom, right, top) of the rubber band from the position
+        the selection started at to x, y, or None for a single point selection.
+        '''
+        if (x != self._selection_position_start[0] and y != self._selection_position_start[1]):
+            left = min(x, self._selection_position_start[0])
+            right = max(x, self._selection_position_start[0])
+            bottom = min(y, self._selection_position_start[1])
+            top = max(y, self._selection_position_start[1])
+            return (left, bottom, right, top)
+
+        return None
+
+    def _updateSelection(self, x, y):
+        '''
+        Update the selection group from the selection made between the position
+        the selection started at and the given position.
+        '''
+        # Construct a small frustum to look for nodes in.
+        root_region = self._context.getDefaultRegion()
+        root_region.beginHierarchicalChange()
+        self._selection_box.setVisibilityFlag(False)
+        changes = SelectionChanges()
+
+        rectangle = self._getSelectionRectangle(x, y)
+        if rectangle is not None:
+            left, bottom, right, top = rectangle
+            exclusive = self._selection_mode == SelectionMode.EXCLUSIVE
+            if self._getSpatialIndex() is None and not self._isSelectionChangedConnected():
+                # Nobody is told what changed, so pick straight into the selection group.
+                if exclusive:
+                    self._selectionGroup.clear()
+                self._setPickerRectangle(SCENECOORDINATESYSTEM_LOCAL, left, bottom, right, top)
+                if self._nodeSelectMode or self._dataSelectMode:
+                    self._scenepicker.addPickedNodesToFieldGroup(self._selectionGroup)
+                if self._elemSelectMode:
+                    self._scenepicker.addPickedElementsToFieldGroup(self._selectionGroup)
+            else:
+                for progress in self._selectionSteps(left, bottom, right, top, exclusive, changes):
+                    pass
+        else:
+
+            self._setPickerRectangle(SCENECOORDINATESYSTEM_LOCAL, x - 0.5, y - 0.5, x + 0.5, y + 0.5)
+            if self._nodeSelectMode and self._elemSelectMode and self._selection_mode == SelectionMode.EXCLUSIVE and not self._scenepicker.getNearestGraphics().isValid():
+                self._clearSelection(changes)
+
+            if self._nodeSelectMode and (self._scenepicker.getNearestGraphics().getFieldDomainType() == Field.DOMAIN_TYPE_NODES):
+                node = self._scenepicker.getNearestNode()
+                nodeset = node.getNodeset()
+                group = self._getSelectionNodesetGroup(nodeset)
+                name = _getDomainKey(nodeset)
+                if self._selection_mode == SelectionMode.EXCLUSIVE:
+                    remove_current = group.getSize() == 1 and group.containsNode(node)
+                    self._clearSelection(changes)
+                    if not remove_current:
+                        group.addNode(node)
+                        changes.add(name, [node.getIdentifier()])
+                elif self._selection_mode == SelectionMode.ADDITIVE:
+                    if group.containsNode(node):
+                        group.removeNode(node)
+                        changes.remove(name, [node.getIdentifier()])
+                    else:
+                        group.addNode(node)
+                        changes.add(name, [node.getIdentifier()])
+
+            if self._elemSelectMode and (self._scenepicker.getNearestGraphics().getFieldDomainType() in [Field.DOMAIN_TYPE_MESH1D, Field.DOMAIN_TYPE_MESH2D, Field.DOMAIN_TYPE_MESH3D, Field.DOMAIN_TYPE_MESH_HIGHEST_DIMENSION]):
+                elem = self._scenepicker.getNearestElement()
+                mesh = elem.getMesh()
+                group = self._getSelectionMeshGroup(mesh)
+                name = _getDomainKey(mesh)
+                if self._selection_mode == SelectionMode.EXCLUSIVE:
+                    remove_current = group.getSize() == 1 and group.containsElement(elem)
+                    self._clearSelection(changes)
+                    if not remove_current:
+                        group.addElement(elem)
+                        changes.add(name, [elem.getIdentifier()])
+                elif self._selection_mode == SelectionMode.ADDITIVE:
+                    if group.containsElement(elem):
+                        group.removeElement(elem)
+                        changes.remove(name, [elem.getIdentifier()])
+                    else:
+                        group.addElement(elem)
+                        changes.add(name, [elem.getIdentifier()])
+
+
+        root_region.endHierarchicalChange()
+        self._emitSelectionChanged(changes)
+
+    def mouseReleaseEvent(self, event):
+        '''
+        Inform the scene viewer of a mouse release event.
+        '''
+        event.accept()
+        self._flushMotion()
+        if not self._ignore_mouse_events and self._selection_mode != SelectionMode.NONE:
+            rectangle = self._getSelectionRectangle(event.x(), event.y())
+            if self._asynchronous_selection and rectangle is not None:
+                left, bottom, right, top = rectangle
+                self._selection_box.setVisibilityFlag(False)
+                self._startSelectionJob(left, bottom, right, top, self._selection_mode == SelectionMode.EXCLUSIVE)
+            else:
+                with self._profile('selection_update'):
+                    self._updateSelection(event.x(), event.y())
+            self._selection_mode = SelectionMode.NONE
+        elif not self._ignore_mouse_events and self._handle_mouse_events:
+            scene_input = self._sceneviewer.createSceneviewerinput()
+            scene_input.setPosition(event.x(), event.y())
+            scene_input.setEventType(Sceneviewerinput.EVENT_TYPE_BUTTON_RELEASE)
+            scene_input.setButtonType(button_map[event.button()])
+
+            with self._profile('input_dispatch'):
+                self._sceneviewer.processSceneviewerinput(scene_input)
+            self._scheduleEndInteraction()
+        else:
+            event.ignore()
+
+    def setMotionCoalescingEnabled(self, enabled):
+        '''
+        When enabled, the default, mouse motion events are coalesced: only the
+        latest position is kept and it is dispatched at most once per frame, as
+        set by the maximum frame rate, or once per pass of the event loop if
+        there is no maximum frame rate.
+        '''
+        self._motion_coalescing = enabled
+        if not enabled:
+            self._flushMotion()
+
+    def isMotionCoalescingEnabled(self):
+        return self._motion_coalescing
+
+    def getMotionStatistics(self):
+        '''
+        Get a dict with the number of mouse motion events 'received' and the
+        number 'dispatched' to the scene viewer or selection box.
+        '''
+        return {'received': self._motion_events_received,
+                'dispatched': self._motion_events_dispatched}
+
+    def resetMotionStatistics(self):
+        self._motion_events_received = 0
+        self._motion_events_dispatched = 0
+
+    def _scheduleMotionDispatch(self):
+        if not self._motion_dispatch_scheduled:
+            self._motion_dispatch_scheduled = True
+            QtCore.QTimer.singleShot(self._getFrameDelay(self._last_motion_dispatch_time), self._dispatchMotion)
+
+    def _flushMotion(self):
+        '''
+        Dispatch any pending mouse motion immediately, so it is processed before
+        a following button event.
+        '''
+        if self._pending_motion is not None:
+            self._dispatchMotion()
+
+    def _dispatchMotion(self):
+        self._motion_dispatch_scheduled = False
+        if self._pending_motion is None:
+            return
+
+        x, y, leave = self._pending_motion
+        self._pending_motion = None
+        self._last_motion_dispatch_time = clock()
+        self._motion_events_dispatched += 1
+        if self._selection_mode != SelectionMode.NONE:
+            self._updateSelectionBox(x, y)
+        elif self._handle_mouse_events:
+            if self._motion_input is None:
+                self._motion_input = self._sceneviewer.createSceneviewerinput()
+                self._motion_input.setEventType(Sceneviewerinput.EVENT_TYPE_MOTION_NOTIFY)
+            scene_input = self._motion_input
+            if leave:
+                scene_input.setPosition(-1, -1)
+            else:
+                scene_input.setPosition(x, y)
+
+            with self._profile('input_dispatch'):
+                self._sceneviewer.processSceneviewerinput(scene_input)
+
+    def _updateSelectionBox(self, x, y):
+        '''
+        Resize the selection box to span from the position the selection started
+        at to the given position.
+        '''
+        xdiff = float(x - self._selection_position_start[0])
+        ydiff = float(y - self._selection_position_start[1])
+        if abs(xdiff) < 0.0001:
+            xdiff = 1
+        if abs(ydiff) < 0.0001:
+            ydiff = 1
+        xoff = float(self._selection_position_start[0]) / xdiff + 0.5
+        yoff = float(self._selection_position_start[1]) / ydiff + 0.5
+        scene = self._selection_box.getScene()
+        scene.beginChange()
+        self._selectionBox_setBaseSize([xdiff, ydiff, 0.999])
+        self._selectionBox_setGlyphOffset([xoff, -yoff, 0])
+        self._selection_box.setVisibilityFlag(True)
+        scene.endChange()
+
+    def mouseMoveEvent(self, event):
+        '''
+        Inform the scene viewer of a mouse move event and update the OpenGL scene to reflect this
+        change to the viewport.
+        '''
+
+        event.accept()
+        if not self._ignore_mouse_events and (self._selection_mode != SelectionMode.NONE or self._handle_mouse_events):
+            self._motion_events_received += 1
+            self._pending_motion = (event.x(), event.y(), event.type() == QtCore.QEvent.Leave)
+            if self._motion_coalescing:
+                self._scheduleMotionDispatch()
+            else:
+                self._dispatchMotion()
+        else:
+            event.ignore()
+
@@ -0,0 +1,93 @@
+'''
+Measure the time taken to import zincwidget in a fresh interpreter and check
+that it does not load the Qt or Zinc bindings, which are only needed once a
+widget is built.
+
+The cold time is the first import after the byte code of zincwidget has been
+removed, the warm time is the median of the following imports.  The time to
+resolve ZincWidget, importing Qt and Zinc, is reported when they are installed.
+Exits with a non zero status if Qt or Zinc were imported, or if the warm import
+time is over --max-seconds, so it can be run to catch regressions:
+
+    python benchmarks/import_benchmark.py --max-seconds 0.05
+'''
+
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+
+HEAVY_MODULES = ('PySide', 'PyQt4', 'opencmiss', 'numpy')
+
+MEASURE = '''
+import json, sys, time
+start = time.time()
+import zincwidget
+import_seconds = time.time() - start
+zincwidget.ProjectionMode.PERSPECTIVE
+zincwidget.SelectionMode.EXCLUSIVE
+loaded = sorted(set(name.split('.')[0] for name in sys.modules) & set(%r))
+widget_seconds = None
+if %r:
+    start = time.time()
+    try:
+        zincwidget.ZincWidget
+        widget_seconds = time.time() - start
+    except ImportError:
+        pass
+print(json.dumps({'import_seconds': import_seconds, 'loaded': loaded, 'widget_seconds': widget_seconds}))
+'''
+
+
+def measure(resolve_widget):
+    output = subprocess.check_output([sys.executable, '-c', MEASURE % (HEAVY_MODULES, resolve_widget)], cwd=ROOT)
+    return json.loads(output.decode('utf-8').strip().splitlines()[-1])
+
+
+def remove_byte_code():
+    for pattern in ('zincwidget.py[co]', os.path.join('__pycache__', 'zincwidget.*.pyc')):
+        for file_name in glob.glob(os.path.join(ROOT, pattern)):
+            os.remove(file_name)
+
+
+def median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    return values[middle] if len(values) % 2 else 0.5 * (values[middle - 1] + values[middle])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--repeat', type=int, default=10, help='number of warm imports')
+    parser.add_argument('--max-seconds', type=float, help='fail if the warm import takes longer than this')
+    args = parser.parse_args()
+
+    remove_byte_code()
+    cold = measure(False)
+    warm = [measure(False) for _ in range(args.repeat)]
+    widget = measure(True)
+    result = {
+        'cold_import_seconds': cold['import_seconds'],
+        'warm_import_seconds': median([run['import_seconds'] for run in warm]),
+        'modules_loaded_on_import': cold['loaded'],
+        'widget_resolve_seconds': widget['widget_seconds'],
+    }
+    json.dump(result, sys.stdout, indent=2)
+    sys.stdout.write('\n')
+
+    failed = False
+    if cold['loaded']:
+        sys.stderr.write('Importing zincwidget loaded ' + ', '.join(cold['loaded']) + '\n')
+        failed = True
+    if args.max_seconds is not None and result['warm_import_seconds'] > args.max_seconds:
+        sys.stderr.write('Warm import took longer than %g seconds\n' % args.max_seconds)
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,231 @@
+'''
+Replay mouse input streams through ZincWidget.mousePressEvent, mouseMoveEvent
+and mouseReleaseEvent and report the latency and throughput of the motion
+event handling, with and without motion coalescing.
+
+A stream is a file with one JSON object per line:
+
+    {"type": "press", "x": 200, "y": 150, "button": "left", "modifiers": [], "time": 0.0}
+
+where type is one of press, move or release, button one of left, middle or
+right, modifiers a list of shift and alt, and time the time in seconds since
+the start of the stream.  Streams can be recorded from a running application
+by installing an InputRecorder as an event filter on the widget.  Without a
+stream a synthetic tumble from a 1000 Hz mouse is replayed.
+
+Run it under a virtual framebuffer when there is no display, for example:
+
+    xvfb-run python benchmarks/mouse_input_benchmark.py --model heart.exf
+'''
+
+import argparse
+import json
+import math
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from zincqt import QtCore, QtGui
+
+import numpy
+
+from opencmiss.zinc.context import Context
+from opencmiss.zinc.field import Field
+from opencmiss.zinc.glyph import Glyph
+
+from zincwidget import ZincWidget, clock
+
+BUTTONS = {'left': QtCore.Qt.LeftButton, 'middle': QtCore.Qt.MidButton, 'right': QtCore.Qt.RightButton}
+MODIFIERS = {'shift': QtCore.Qt.ShiftModifier, 'alt': QtCore.Qt.AltModifier}
+EVENT_TYPES = {'press': QtCore.QEvent.MouseButtonPress, 'move': QtCore.QEvent.MouseMove,
+               'release': QtCore.QEvent.MouseButtonRelease}
+
+
+class InputRecorder(QtCore.QObject):
+    '''
+    Event filter recording the mouse events of the widget it is installed on
+    as a stream that can be replayed by this benchmark.
+    '''
+
+    def __init__(self, file_name, parent=None):
+        QtCore.QObject.__init__(self, parent)
+        self._file = open(file_name, 'w')
+        self._start = None
+
+    def eventFilter(self, watched, event):
+        names = dict((value, key) for key, value in EVENT_TYPES.items())
+        if event.type() in names:
+            now = clock()
+            if self._start is None:
+                self._start = now
+            button = [name for name, value in BUTTONS.items() if value == event.button()]
+            modifiers = [name for name, value in MODIFIERS.items() if event.modifiers() & value]
+            record = {'type': names[event.type()], 'x': event.x(), 'y': event.y(),
+                      'button': button[0] if button else None, 'modifiers': modifiers,
+                      'time': now - self._start}
+            self._file.write(json.dumps(record) + '\n')
+            self._file.flush()
+
+        return False
+
+
+class BenchmarkZincWidget(ZincWidget):
+    '''
+    ZincWidget recording the time from receiving each motion event until a
+    position at least as recent is dispatched.
+    '''
+
+    def __init__(self, parent=None):
+        ZincWidget.__init__(self, parent)
+        self.received_times = []
+        self.latencies = []
+        self.handler_times = []
+
+    def mouseMoveEvent(self, event):
+        start = clock()
+        self.received_times.append(start)
+        ZincWidget.mouseMoveEvent(self, event)
+        self.handler_times.append(clock() - start)
+
+    def _dispatchMotion(self):
+        if self._pending_motion is not None:
+            now = clock()
+            self.latencies.extend(now - received for received in self.received_times)
+            self.received_times = []
+        ZincWidget._dispatchMotion(self)
+
+
+def create_graphics(region):
+    '''
+    Show the lines, surfaces and nodes of the model in the region, if it has a
+    field named coordinates.
+    '''
+    coordinates = region.getFieldmodule().findFieldByName('coordinates')
+    if coordinates.isValid():
+        scene = region.getScene()
+        scene.beginChange()
+        lines = scene.createGraphicsLines()
+        lines.setCoordinateField(coordinates)
+        surfaces = scene.createGraphicsSurfaces()
+        surfaces.setCoordinateField(coordinates)
+        points = scene.createGraphicsPoints()
+        points.setFieldDomainType(Field.DOMAIN_TYPE_NODES)
+        points.setCoordinateField(coordinates)
+        points.getGraphicspointattributes().setGlyphShapeType(Glyph.SHAPE_TYPE_SPHERE)
+        scene.endChange()
+
+
+def synthetic_stream(width, height, events=5000, rate=1000.0):
+    '''
+    Return a stream tumbling the scene with the left button in a circle around
+    the centre of the view, from a mouse polled at rate Hz.
+    '''
+    centre_x, centre_y = width // 2, height // 2
+    radius = min(width, height) // 4
+    stream = [{'type': 'press', 'x': centre_x + radius, 'y': centre_y, 'button': 'left', 'modifiers': [], 'time': 0.0}]
+    for index in range(1, events + 1):
+        angle = 2.0 * math.pi * index / 500.0
+        stream.append({'type': 'move', 'x': int(centre_x + radius * math.cos(angle)),
+                       'y': int(centre_y + radius * math.sin(angle)), 'button': None, 'modifiers': [],
+                       'time': index / rate})
+    last = stream[-1]
+    stream.append({'type': 'release', 'x': last['x'], 'y': last['y'], 'button': 'left', 'modifiers': [],
+                   'time': (events + 1) / rate})
+    return stream
+
+
+def read_stream(file_name):
+    with open(file_name) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def make_event(record):
+    modifiers = QtCore.Qt.NoModifier
+    for name in record.get('modifiers', []):
+        modifiers |= MODIFIERS[name]
+    button = BUTTONS.get(record.get('button'), QtCore.Qt.NoButton)
+    event_type = EVENT_TYPES[record['type']]
+    buttons = button if event_type != QtCore.QEvent.MouseButtonRelease else QtCore.Qt.NoButton
+    return QtGui.QMouseEvent(event_type, QtCore.QPoint(record['x'], record['y']), button, buttons, modifiers)
+
+
+def replay(application, widget, stream, realtime, events_per_pass):
+    '''
+    Send the stream to the widget.  In realtime the recorded times are kept,
+    otherwise the event loop runs once every events_per_pass events.
+    '''
+    handlers = {'press': widget.mousePressEvent, 'move': widget.mouseMoveEvent, 'release': widget.mouseReleaseEvent}
+    start = clock()
+    for index, record in enumerate(stream):
+        if realtime:
+            while clock() - start < record['time']:
+                application.processEvents()
+        elif index % events_per_pass == 0:
+            application.processEvents()
+        handlers[record['type']](make_event(record))
+    application.processEvents()
+    return clock() - start
+
+
+def percentiles(values):
+    if not values:
+        return None
+    p50, p95, p99 = numpy.percentile(values, [50, 95, 99])
+    return {'p50': float(p50), 'p95': float(p95), 'p99': float(p99)}
+
+
+def run(application, context, stream, coalescing, args):
+    widget = BenchmarkZincWidget()
+    widget.setContext(context)
+    widget.resize(args.width, args.height)
+    widget.show()
+    application.processEvents()
+    widget.setMotionCoalescingEnabled(coalescing)
+    widget.setMaximumFrameRate(args.frame_rate)
+
+    elapsed = replay(application, widget, stream, args.realtime, args.events_per_pass)
+    motion = widget.getMotionStatistics()
+    result = {
+        'coalescing': coalescing,
+        'events': len(stream),
+        'seconds': elapsed,
+        'events_per_second': len(stream) / elapsed if elapsed > 0.0 else None,
+        'motion_received': motion['received'],
+        'motion_dispatched': motion['dispatched'],
+        'handler_seconds': percentiles(widget.handler_times),
+        'dispatch_latency_seconds': percentiles(widget.latencies),
+        'repaints': widget.getRepaintStatistics(),
+    }
+    widget.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--stream', help='recorded input stream to replay')
+    parser.add_argument('--model', action='append', default=[], help='model file to read into the default region')
+    parser.add_argument('--width', type=int, default=800)
+    parser.add_argument('--height', type=int, default=600)
+    parser.add_argument('--frame-rate', type=float, default=60.0, help='maximum frame rate, 0 for none')
+    parser.add_argument('--events-per-pass', type=int, default=8,
+                        help='events sent between passes of the event loop when not in realtime')
+    parser.add_argument('--realtime', action='store_true', help='replay the stream at its recorded times')
+    args = parser.parse_args()
+
+    application = QtGui.QApplication(sys.argv)
+    context = Context('mouse_input_benchmark')
+    context.getGlyphmodule().defineStandardGlyphs()
+    context.getMaterialmodule().defineStandardMaterials()
+    for file_name in args.model:
+        context.getDefaultRegion().readFile(file_name)
+    create_graphics(context.getDefaultRegion())
+    stream = read_stream(args.stream) if args.stream else synthetic_stream(args.width, args.height)
+
+    results = [run(application, context, stream, coalescing, args) for coalescing in (False, True)]
+    json.dump(results, sys.stdout, indent=2)
+    sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
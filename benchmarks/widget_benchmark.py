@@ -0,0 +1,333 @@
+'''
+Benchmark the hot paths of ZincWidget on synthetic meshes: camera orbits
+rendered through setViewParameters, picking, single point and rubber band
+selection from synthetic Qt mouse events, and bulk project and unproject.
+
+Each mesh size is benchmarked in a fresh process so the peak resident set size
+reported is for that size alone.  The workloads are deterministic, the same
+camera path, pick positions and selections are used on every run.  Results are
+written as JSON, they can be saved as a baseline and later runs compared with
+it, failing if any metric is worse by more than the tolerance:
+
+    xvfb-run python benchmarks/widget_benchmark.py --save-baseline benchmarks/baseline.json
+    xvfb-run python benchmarks/widget_benchmark.py --compare benchmarks/baseline.json
+
+A baseline is only meaningful on the machine it was recorded on.
+'''
+
+import argparse
+import json
+import math
+import os
+import platform
+import resource
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+# Metrics compared with a baseline, and whether a higher value is better.
+METRICS = {
+    'build_seconds': False,
+    'frames_per_second': True,
+    'pick_seconds_p50': False,
+    'pick_seconds_p95': False,
+    'cached_pick_seconds_p50': False,
+    'click_selection_seconds': False,
+    'rubber_band_items_per_second': True,
+    'project_points_per_second': True,
+    'unproject_points_per_second': True,
+    'single_project_calls_per_second': True,
+    'peak_rss_bytes': False,
+}
+
+
+def create_mesh(region, target_nodes):
+    '''
+    Create a cube of trilinear hexahedral elements with about target_nodes
+    nodes, defining a field named coordinates over it.  Returns the number of
+    nodes created.
+    '''
+    from opencmiss.zinc.element import Element, Elementbasis
+    from opencmiss.zinc.field import Field
+
+    n = max(int(round(target_nodes ** (1.0 / 3.0))), 2)
+    spacing = 1.0 / (n - 1)
+    fieldmodule = region.getFieldmodule()
+    fieldmodule.beginChange()
+    coordinates = fieldmodule.createFieldFiniteElement(3)
+    coordinates.setName('coordinates')
+    coordinates.setManaged(True)
+    coordinates.setTypeCoordinate(True)
+
+    nodes = fieldmodule.findNodesetByFieldDomainType(Field.DOMAIN_TYPE_NODES)
+    nodetemplate = nodes.createNodetemplate()
+    nodetemplate.defineField(coordinates)
+    fieldcache = fieldmodule.createFieldcache()
+    identifier = 1
+    for k in range(n):
+        for j in range(n):
+            for i in range(n):
+                node = nodes.createNode(identifier, nodetemplate)
+                fieldcache.setNode(node)
+                coordinates.assignReal(fieldcache, [i * spacing, j * spacing, k * spacing])
+                identifier += 1
+
+    mesh = fieldmodule.findMeshByDimension(3)
+    elementtemplate = mesh.createElementtemplate()
+    elementtemplate.setElementShapeType(Element.SHAPE_TYPE_CUBE)
+    elementtemplate.setNumberOfNodes(8)
+    basis = fieldmodule.createElementbasis(3, Elementbasis.FUNCTION_TYPE_LINEAR_LAGRANGE)
+    elementtemplate.defineFieldSimpleNodal(coordinates, -1, basis, [1, 2, 3, 4, 5, 6, 7, 8])
+    offsets = [0, 1, n, n + 1, n * n, n * n + 1, n * n + n, n * n + n + 1]
+    for k in range(n - 1):
+        for j in range(n - 1):
+            for i in range(n - 1):
+                first = 1 + i + j * n + k * n * n
+                for local, offset in enumerate(offsets):
+                    elementtemplate.setNode(local + 1, nodes.findNodeByIdentifier(first + offset))
+                mesh.defineElement(-1, elementtemplate)
+    fieldmodule.defineAllFaces()
+    fieldmodule.endChange()
+
+    return n * n * n
+
+
+def percentile(values, q):
+    import numpy
+
+    return float(numpy.percentile(values, q)) if len(values) else None
+
+
+def orbit_view(view_parameters, frame, frames):
+    '''
+    Return the view parameters rotated about the up vector through the lookat
+    point by the fraction frame / frames of a full turn.
+    '''
+    import numpy
+
+    eye, lookat, up, angle = view_parameters
+    eye = numpy.asarray(eye, dtype=numpy.float64)
+    lookat = numpy.asarray(lookat, dtype=numpy.float64)
+    axis = numpy.asarray(up, dtype=numpy.float64)
+    axis = axis / numpy.linalg.norm(axis)
+    theta = 2.0 * math.pi * frame / frames
+    offset = eye - lookat
+    rotated = offset * math.cos(theta) + numpy.cross(axis, offset) * math.sin(theta) + \
+        axis * numpy.dot(axis, offset) * (1.0 - math.cos(theta))
+    return (lookat + rotated).tolist(), lookat.tolist(), up, angle
+
+
+def peak_rss_bytes():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, OS X bytes.
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def run_size(target_nodes, args):
+    '''
+    Run all the workloads on a mesh of about target_nodes nodes and return a
+    dict of the results.
+    '''
+    from zincqt import QtGui
+    import numpy
+
+    from opencmiss.zinc.context import Context
+    from opencmiss.zinc.field import Field
+
+    from mouse_input_benchmark import create_graphics, make_event
+    from zincwidget import ZincWidget, clock, window_to_widget_coordinates
+
+    application = QtGui.QApplication(sys.argv[:1])
+    context = Context('widget_benchmark')
+    context.getGlyphmodule().defineStandardGlyphs()
+    context.getMaterialmodule().defineStandardMaterials()
+    region = context.getDefaultRegion()
+
+    start = clock()
+    nodes = create_mesh(region, target_nodes)
+    create_graphics(region)
+    build_seconds = clock() - start
+
+    widget = ZincWidget()
+    widget.setContext(context)
+    widget.resize(args.width, args.height)
+    widget.show()
+    application.processEvents()
+    widget.setSelectModeAll()
+    result = {'target_nodes': target_nodes, 'nodes': nodes, 'build_seconds': build_seconds}
+
+    # Camera orbit, each frame is rendered directly rather than scheduled.
+    widget.suspendRendering()
+    widget.updateGL()
+    view_parameters = widget.getViewParameters()
+    start = clock()
+    for frame in range(args.frames):
+        widget.setViewParameters(*orbit_view(view_parameters, frame, args.frames))
+        widget.updateGL()
+    elapsed = clock() - start
+    widget.setViewParameters(*view_parameters)
+    widget.resumeRendering()
+    application.processEvents()
+    result['frames_per_second'] = args.frames / elapsed if elapsed > 0.0 else None
+
+    # Picking at the window positions of randomly chosen nodes.
+    fieldmodule = region.getFieldmodule()
+    random = numpy.random.RandomState(0)
+    n = int(round(nodes ** (1.0 / 3.0)))
+    indexes = random.randint(0, n, size=(args.picks, 3))
+    coordinates = indexes / float(n - 1)
+    window = window_to_widget_coordinates(widget.projectPoints(coordinates))
+    widget.setPickCacheSize(0)
+    pick_times = []
+    for x, y, _ in window:
+        start = clock()
+        widget.getNearestNode(x, y, exact=True)
+        pick_times.append(clock() - start)
+    result['pick_seconds_p50'] = percentile(pick_times, 50)
+    result['pick_seconds_p95'] = percentile(pick_times, 95)
+
+    widget.setPickCacheSize(256)
+    x, y = window[0][0], window[0][1]
+    widget.getNearestNode(x, y, exact=True)
+    cached_times = []
+    for _ in range(args.picks):
+        start = clock()
+        widget.getNearestNode(x, y, exact=True)
+        cached_times.append(clock() - start)
+    result['cached_pick_seconds_p50'] = percentile(cached_times, 50)
+
+    # Single point selection by a shift click on a node.
+    click = {'x': int(x), 'y': int(y), 'button': 'left', 'modifiers': ['shift']}
+    start = clock()
+    widget.mousePressEvent(make_event(dict(click, type='press')))
+    widget.mouseReleaseEvent(make_event(dict(click, type='release')))
+    result['click_selection_seconds'] = clock() - start
+
+    # Rubber band selection over the middle of the window.
+    left, top = args.width // 4, args.height // 4
+    right, bottom = 3 * args.width // 4, 3 * args.height // 4
+    band = {'button': 'left', 'modifiers': ['shift']}
+    start = clock()
+    widget.mousePressEvent(make_event(dict(band, type='press', x=left, y=top)))
+    widget.mouseMoveEvent(make_event(dict(band, type='move', x=right, y=bottom, button=None)))
+    widget.mouseReleaseEvent(make_event(dict(band, type='release', x=right, y=bottom)))
+    elapsed = clock() - start
+    selection_group = widget.getSelectionGroup()
+    selected = 0
+    for domain_type in (Field.DOMAIN_TYPE_NODES, Field.DOMAIN_TYPE_DATAPOINTS):
+        nodegroup = selection_group.getFieldNodeGroup(fieldmodule.findNodesetByFieldDomainType(domain_type))
+        if nodegroup.isValid():
+            selected += nodegroup.getNodesetGroup().getSize()
+    for dimension in (3, 2, 1):
+        elementgroup = selection_group.getFieldElementGroup(fieldmodule.findMeshByDimension(dimension))
+        if elementgroup.isValid():
+            selected += elementgroup.getMeshGroup().getSize()
+    result['rubber_band_items'] = selected
+    result['rubber_band_seconds'] = elapsed
+    result['rubber_band_items_per_second'] = selected / elapsed if elapsed > 0.0 else None
+
+    # Bulk and single point project and unproject of every node position.
+    axis = numpy.linspace(0.0, 1.0, n)
+    points = numpy.stack(numpy.meshgrid(axis, axis, axis, indexing='ij'), axis=-1).reshape(-1, 3)
+    start = clock()
+    window = widget.projectPoints(points)
+    elapsed = clock() - start
+    result['project_points_per_second'] = len(points) / elapsed if elapsed > 0.0 else None
+    start = clock()
+    widget.unprojectPoints(window)
+    elapsed = clock() - start
+    result['unproject_points_per_second'] = len(points) / elapsed if elapsed > 0.0 else None
+    calls = min(len(points), args.single_calls)
+    start = clock()
+    for point in points[:calls]:
+        widget.project(point[0], point[1], point[2])
+    elapsed = clock() - start
+    result['single_project_calls_per_second'] = calls / elapsed if elapsed > 0.0 else None
+
+    widget.close()
+    result['peak_rss_bytes'] = peak_rss_bytes()
+    return result
+
+
+def compare(baseline, current, tolerance):
+    '''
+    Return a list of descriptions of the metrics of current that are worse
+    than in baseline by more than the fraction tolerance.
+    '''
+    regressions = []
+    baseline_results = dict((result['target_nodes'], result) for result in baseline['results'])
+    for result in current['results']:
+        base = baseline_results.get(result['target_nodes'])
+        if base is None:
+            continue
+        for metric, higher_is_better in sorted(METRICS.items()):
+            old = base.get(metric)
+            new = result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / float(old)
+            if (-change if higher_is_better else change) > tolerance:
+                regressions.append('%d nodes %s: %g -> %g (%+.1f%%)' % (result['target_nodes'], metric, old, new, 100.0 * change))
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000, 5000000],
+                        help='approximate numbers of nodes of the meshes benchmarked')
+    parser.add_argument('--width', type=int, default=800)
+    parser.add_argument('--height', type=int, default=600)
+    parser.add_argument('--frames', type=int, default=120, help='frames rendered in the camera orbit')
+    parser.add_argument('--picks', type=int, default=200, help='number of pick positions')
+    parser.add_argument('--single-calls', type=int, default=10000, help='number of single point project calls')
+    parser.add_argument('--output', help='file to write the results to, standard output by default')
+    parser.add_argument('--save-baseline', help='also write the results to this baseline file')
+    parser.add_argument('--compare', help='baseline file to compare the results with')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='fractional change in a metric reported as a regression')
+    parser.add_argument('--child', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        sys.stdout.write(json.dumps(run_size(args.child, args)) + '\n')
+        return
+
+    results = []
+    for size in args.sizes:
+        command = [sys.executable, os.path.abspath(__file__), '--child', str(size),
+                   '--width', str(args.width), '--height', str(args.height), '--frames', str(args.frames),
+                   '--picks', str(args.picks), '--single-calls', str(args.single_calls)]
+        output = subprocess.check_output(command)
+        results.append(json.loads(output.decode('utf-8').strip().splitlines()[-1]))
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'width': args.width,
+        'height': args.height,
+        'frames': args.frames,
+        'picks': args.picks,
+        'results': results,
+    }
+
+    text = json.dumps(report, indent=2) + '\n'
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    else:
+        sys.stdout.write(text)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            f.write(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), report, args.tolerance)
+        for regression in regressions:
+            sys.stderr.write('Regression: ' + regression + '\n')
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
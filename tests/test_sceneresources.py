@@ -0,0 +1,41 @@
+import unittest
+
+try:
+    from opencmiss.zinc.context import Context
+
+    from _zincwidget import create_sceneviewer, SceneResources
+except ImportError:
+    Context = None
+
+
+@unittest.skipIf(Context is None, 'needs Qt and Zinc')
+class SceneResourcesTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self._context = Context('scene_resources')
+
+    def testInitialise(self):
+        resources = SceneResources()
+        self.assertFalse(resources.isInitialised())
+        sceneviewer, scenefilter = create_sceneviewer(self._context, scenefilter=resources.scenefilter)
+        resources.initialise(self._context, scenefilter)
+        self.assertTrue(resources.isInitialised())
+        self.assertEqual(resources.scenepicker.getScenefilter()[1], scenefilter)
+        self.assertTrue(resources.selection_group.isValid())
+
+    def testPendingScenefilter(self):
+        # A scene filter set before the first widget is initialised is used by it.
+        resources = SceneResources()
+        pending = self._context.getScenefiltermodule().createScenefilterVisibilityFlags()
+        resources.scenefilter = pending
+        self.assertFalse(resources.isInitialised())
+        sceneviewer, scenefilter = create_sceneviewer(self._context, scenefilter=resources.scenefilter)
+        self.assertEqual(scenefilter, pending)
+        resources.initialise(self._context, scenefilter)
+        self.assertTrue(resources.isInitialised())
+        self.assertEqual(sceneviewer.getScenefilter()[1], pending)
+        self.assertEqual(resources.scenepicker.getScenefilter()[1], pending)
+
+
+if __name__ == '__main__':
+    unittest.main()
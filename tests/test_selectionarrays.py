@@ -0,0 +1,162 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy
+
+try:
+    from opencmiss.zinc.context import Context
+    from opencmiss.zinc.element import Element
+    from opencmiss.zinc.field import Field
+
+    from zincqt import QtGui
+    from zincstreaming import show_offscreen
+    from zincwidget import ZincWidget
+except ImportError:
+    Context = None
+
+from zincwidget import read_selection_arrays, write_selection_arrays
+
+
+class SelectionArraysTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self._directory = tempfile.mkdtemp()
+        self._file_name = os.path.join(self._directory, 'selection.npz')
+        self._arrays = {'nodes': numpy.arange(1, 100001, 3, dtype=numpy.int32),
+                        'mesh3d': numpy.array([5, 9, 12], dtype=numpy.int64),
+                        'datapoints': numpy.zeros(0, dtype=numpy.int32)}
+
+    def tearDown(self):
+        shutil.rmtree(self._directory)
+
+    def assertArrays(self, arrays):
+        self.assertEqual(sorted(arrays), sorted(self._arrays))
+        for name, identifiers in self._arrays.items():
+            self.assertEqual(arrays[name].dtype, numpy.int32)
+            numpy.testing.assert_array_equal(arrays[name], identifiers)
+
+    def testMemoryMapped(self):
+        write_selection_arrays(self._file_name, self._arrays)
+        arrays = read_selection_arrays(self._file_name)
+        self.assertArrays(arrays)
+        self.assertIsInstance(arrays['nodes'], numpy.memmap)
+        self.assertFalse(arrays['nodes'].flags.writeable)
+        del arrays
+
+    def testRead(self):
+        write_selection_arrays(self._file_name, self._arrays)
+        arrays = read_selection_arrays(self._file_name, mmap=False)
+        self.assertArrays(arrays)
+        self.assertNotIsInstance(arrays['nodes'], numpy.memmap)
+
+    def testCompressed(self):
+        write_selection_arrays(self._file_name, self._arrays, compressed=True)
+        arrays = read_selection_arrays(self._file_name)
+        self.assertArrays(arrays)
+        self.assertNotIsInstance(arrays['nodes'], numpy.memmap)
+
+
+@unittest.skipIf(Context is None, 'needs Qt and Zinc')
+class SetSelectionArraysTestCase(unittest.TestCase):
+    '''
+    Set the selection of a widget shown offscreen.  Without a display run under
+    xvfb-run.
+    '''
+
+    def setUp(self):
+        self._application = QtGui.QApplication.instance() or QtGui.QApplication([])
+        self._context = Context('selection_arrays')
+        root = self._context.getDefaultRegion()
+        heart = root.createChild('heart')
+        nodes = root.getFieldmodule().findNodesetByFieldDomainType(Field.DOMAIN_TYPE_NODES)
+        template = nodes.createNodetemplate()
+        for identifier in range(1, 6):
+            nodes.createNode(identifier, template)
+        heart_nodes = heart.getFieldmodule().findNodesetByFieldDomainType(Field.DOMAIN_TYPE_NODES)
+        heart_template = heart_nodes.createNodetemplate()
+        for identifier in (7, 8):
+            heart_nodes.createNode(identifier, heart_template)
+        mesh = root.getFieldmodule().findMeshByDimension(1)
+        elementtemplate = mesh.createElementtemplate()
+        elementtemplate.setElementShapeType(Element.SHAPE_TYPE_LINE)
+        for identifier in (1, 2):
+            mesh.defineElement(identifier, elementtemplate)
+
+        self._widget = ZincWidget()
+        self._widget.setContext(self._context)
+        show_offscreen(self._widget, 32, 32)
+        while self._widget.getSelectionGroup() is None:
+            self._application.processEvents()
+        self._changes = []
+        self._widget.selectionChanged.connect(self._changes.append)
+
+    def tearDown(self):
+        self._widget.close()
+
+    def assertSelection(self, selection):
+        self.assertEqual(dict((name, identifiers.tolist())
+                              for name, identifiers in self._widget.getSelectionArrays().items()), selection)
+
+    def assertChanges(self, added, removed):
+        self.assertEqual(len(self._changes), 1)
+        changes = self._changes.pop()
+        self.assertEqual(dict((name, identifiers.tolist()) for name, identifiers in changes.getAdded().items()), added)
+        self.assertEqual(dict((name, identifiers.tolist()) for name, identifiers in changes.getRemoved().items()),
+                         removed)
+
+    def testReplace(self):
+        self._widget.setSelectionArrays({'nodes': [2, 1, 2], 'heart/nodes': [8], 'mesh1d': [2]})
+        self.assertSelection({'nodes': [1, 2], 'heart/nodes': [8], 'mesh1d': [2]})
+        self.assertChanges({'nodes': [1, 2], 'heart/nodes': [8], 'mesh1d': [2]}, {})
+
+        # Only the differences are applied and notified.
+        self._widget.setSelectionArrays({'nodes': [2, 3], 'mesh1d': [2]})
+        self.assertSelection({'nodes': [2, 3], 'mesh1d': [2]})
+        self.assertChanges({'nodes': [3]}, {'nodes': [1], 'heart/nodes': [8]})
+
+        self._widget.setSelectionArrays({'nodes': [2, 3], 'mesh1d': [2]})
+        self.assertEqual(self._changes, [])
+
+        self._widget.setSelectionArrays({})
+        self.assertSelection({})
+        self.assertChanges({}, {'nodes': [2, 3], 'mesh1d': [2]})
+
+    def testAdditive(self):
+        self._widget.setSelectionArrays({'nodes': [1, 2]})
+        self._changes.pop()
+        self._widget.setSelectionArrays({'nodes': [2, 4], 'heart/nodes': [7]}, additive=True)
+        self.assertSelection({'nodes': [1, 2, 4], 'heart/nodes': [7]})
+        self.assertChanges({'nodes': [4], 'heart/nodes': [7]}, {})
+
+    def testSelectAll(self):
+        self._widget.setSelectionArrays({'nodes': [1]})
+        self._changes.pop()
+        self._widget.setSelectionArrays({'nodes': [5, 4, 3, 2, 1], 'heart/nodes': [7, 8]})
+        self.assertSelection({'nodes': [1, 2, 3, 4, 5], 'heart/nodes': [7, 8]})
+        self.assertChanges({'nodes': [2, 3, 4, 5], 'heart/nodes': [7, 8]}, {})
+
+    def testIdentifiersNotInDomain(self):
+        # As many identifiers as nodes, but not all of them nodes, so not all
+        # of the nodes are selected.
+        self._widget.setSelectionArrays({'nodes': [1, 2, 3, 4, 99], 'heart/nodes': [6]})
+        self.assertSelection({'nodes': [1, 2, 3, 4]})
+        self.assertChanges({'nodes': [1, 2, 3, 4]}, {})
+
+        self._widget.setSelectionArrays({'nodes': [1, 2, 3, 4, 99]})
+        self.assertEqual(self._changes, [])
+
+        self._widget.setSelectionArrays({'nodes': [99], 'heart/nodes': [6]})
+        self.assertSelection({})
+        self.assertChanges({}, {'nodes': [1, 2, 3, 4]})
+
+    def testUnknownDomain(self):
+        self.assertRaises(ValueError, self._widget.setSelectionArrays, {'lung/nodes': [1]})
+        self.assertRaises(ValueError, self._widget.setSelectionArrays, {'faces': [1]})
+        self.assertSelection({})
+        self.assertEqual(self._changes, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
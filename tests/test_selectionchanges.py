@@ -0,0 +1,73 @@
+import unittest
+
+from zincwidget import SelectionChanges
+
+
+class SelectionChangesTestCase(unittest.TestCase):
+
+    def assertChanges(self, changes, added, removed):
+        self.assertEqual(dict((name, identifiers.tolist()) for name, identifiers in changes.getAdded().items()), added)
+        self.assertEqual(dict((name, identifiers.tolist()) for name, identifiers in changes.getRemoved().items()), removed)
+
+    def testEmpty(self):
+        changes = SelectionChanges()
+        changes.add('nodes', [])
+        self.assertTrue(changes.isEmpty())
+        self.assertChanges(changes, {}, {})
+
+    def testAddAndRemove(self):
+        changes = SelectionChanges()
+        changes.add('nodes', [3, 1, 2])
+        changes.remove('mesh3d', [7])
+        self.assertFalse(changes.isEmpty())
+        self.assertChanges(changes, {'nodes': [1, 2, 3]}, {'mesh3d': [7]})
+
+    def testAddRemoveAdd(self):
+        changes = SelectionChanges()
+        changes.add('nodes', [4])
+        changes.remove('nodes', [4])
+        changes.add('nodes', [4])
+        self.assertChanges(changes, {'nodes': [4]}, {})
+
+    def testRemoveAddRemove(self):
+        changes = SelectionChanges()
+        changes.remove('nodes', [4])
+        changes.add('nodes', [4])
+        changes.remove('nodes', [4])
+        self.assertChanges(changes, {}, {'nodes': [4]})
+
+    def testExclusiveReselect(self):
+        # An exclusive selection of 5 when 5 and 6 are selected clears both then adds 5.
+        changes = SelectionChanges()
+        changes.remove('nodes', [5, 6])
+        changes.add('nodes', [5])
+        self.assertChanges(changes, {}, {'nodes': [6]})
+        following = SelectionChanges()
+        following.remove('nodes', [5])
+        changes.extend(following)
+        self.assertChanges(changes, {}, {'nodes': [5, 6]})
+
+    def testExtendKeepsOrder(self):
+        changes = SelectionChanges()
+        changes.add('nodes', [1, 2])
+        following = SelectionChanges()
+        following.remove('nodes', [2])
+        following.add('nodes', [2, 3])
+        following.remove('nodes', [1])
+        changes.extend(following)
+        self.assertChanges(changes, {'nodes': [2, 3]}, {})
+
+    def testTake(self):
+        changes = SelectionChanges()
+        changes.add('nodes', [1])
+        self.assertFalse(changes.isEmpty())
+        taken = changes.take()
+        self.assertTrue(changes.isEmpty())
+        self.assertChanges(taken, {'nodes': [1]}, {})
+        changes.remove('nodes', [1])
+        self.assertChanges(changes, {}, {'nodes': [1]})
+        self.assertChanges(taken, {'nodes': [1]}, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
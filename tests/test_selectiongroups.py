@@ -0,0 +1,61 @@
+import unittest
+
+try:
+    from opencmiss.zinc.context import Context
+    from opencmiss.zinc.field import Field
+
+    from _zincwidget import _findDomain, _getDomainKey, _getGroupContents
+except ImportError:
+    Context = None
+
+
+def create_nodes(region, identifiers):
+    nodes = region.getFieldmodule().findNodesetByFieldDomainType(Field.DOMAIN_TYPE_NODES)
+    template = nodes.createNodetemplate()
+    for identifier in identifiers:
+        nodes.createNode(identifier, template)
+
+    return nodes
+
+
+def add_nodes(group, nodes, identifiers):
+    nodegroup = group.getFieldNodeGroup(nodes)
+    if not nodegroup.isValid():
+        nodegroup = group.createFieldNodeGroup(nodes)
+    nodesetgroup = nodegroup.getNodesetGroup()
+    for identifier in identifiers:
+        nodesetgroup.addNode(nodes.findNodeByIdentifier(identifier))
+
+
+@unittest.skipIf(Context is None, 'needs Qt and Zinc')
+class SelectionGroupsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self._context = Context('selection_groups')
+        self._root = self._context.getDefaultRegion()
+        self._heart = self._root.createChild('heart')
+        self._left = self._heart.createChild('left')
+        self._root_nodes = create_nodes(self._root, [1, 2, 3])
+        self._left_nodes = create_nodes(self._left, [4, 5])
+
+    def testDomainKeys(self):
+        self.assertEqual(_getDomainKey(self._root_nodes), 'nodes')
+        self.assertEqual(_getDomainKey(self._left_nodes), 'heart/left/nodes')
+        self.assertEqual(_findDomain(self._root, 'heart/left/nodes').getSize(), 2)
+        self.assertEqual(_findDomain(self._root, 'nodes').getSize(), 3)
+        self.assertRaises(ValueError, _findDomain, self._root, 'lung/nodes')
+        self.assertRaises(ValueError, _findDomain, self._root, 'heart/faces')
+
+    def testGroupContentsIncludeSubregions(self):
+        group = self._root.getFieldmodule().createFieldGroup()
+        add_nodes(group, self._root_nodes, [2])
+        heart_group = group.createSubregionFieldGroup(self._heart)
+        left_group = heart_group.createSubregionFieldGroup(self._left)
+        add_nodes(left_group, self._left_nodes, [4, 5])
+        contents = dict((key, sorted(item.getIdentifier() for item in items))
+                        for key, domain, items in _getGroupContents(group))
+        self.assertEqual(contents, {'nodes': [2], 'heart/left/nodes': [4, 5]})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import unittest
+
+import numpy
+
+from zincwidget import transform_points, window_to_widget_coordinates
+
+# A perspective projection looking down -z with near and far planes at 1 and 3.
+PROJECTION = [1.0, 0.0, 0.0, 0.0,
+              0.0, 1.0, 0.0, 0.0,
+              0.0, 0.0, -2.0, -3.0,
+              0.0, 0.0, -1.0, 0.0]
+
+
+class TransformPointsTestCase(unittest.TestCase):
+
+    def testTransform(self):
+        matrix = numpy.eye(4)
+        matrix[:3, 3] = [1.0, 2.0, 3.0]
+        numpy.testing.assert_allclose(transform_points(matrix, [[1.0, 1.0, 1.0]]), [[2.0, 3.0, 4.0]])
+        numpy.testing.assert_allclose(transform_points(PROJECTION, [[1.0, 1.0, -2.0]]), [[0.5, 0.5, 0.5]])
+
+    def testMirroredWithoutClip(self):
+        # A point behind the eye is mirrored into view by the perspective divide.
+        numpy.testing.assert_allclose(transform_points(PROJECTION, [[1.0, 1.0, 2.0]])[:, :2], [[-0.5, -0.5]])
+
+    def testClip(self):
+        points = [[1.0, 1.0, -2.0],   # in view
+                  [1.0, 1.0, 2.0],    # behind the eye
+                  [0.0, 0.0, 0.0],    # at the eye
+                  [0.1, 0.1, -0.5],   # nearer than the near plane
+                  [1.0, 1.0, -4.0]]   # beyond the far plane
+        transformed = transform_points(PROJECTION, points, clip=True)
+        numpy.testing.assert_allclose(transformed[0], [0.5, 0.5, 0.5])
+        self.assertTrue(numpy.isnan(transformed[1:]).all())
+
+    def testWindowToWidgetCoordinates(self):
+        window = numpy.array([[1.0, -5.0, 0.5]])
+        numpy.testing.assert_array_equal(window_to_widget_coordinates(window), [[1.0, 5.0, 0.5]])
+        numpy.testing.assert_array_equal(window, [[1.0, -5.0, 0.5]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import math
+import unittest
+
+import numpy
+
+from zinccamerapath import slerp, view_to_orientation, CameraPath, INTERPOLATION_LINEAR, INTERPOLATION_SPLINE
+
+
+class CameraPathTestCase(unittest.TestCase):
+
+    def assertView(self, view, eye, lookat, up, angle):
+        numpy.testing.assert_allclose(view[0], eye, atol=1.0e-9)
+        numpy.testing.assert_allclose(view[1], lookat, atol=1.0e-9)
+        numpy.testing.assert_allclose(view[2], up, atol=1.0e-9)
+        self.assertAlmostEqual(view[3], angle)
+
+    def testKeyframeEndpoints(self):
+        for interpolation in (INTERPOLATION_LINEAR, INTERPOLATION_SPLINE):
+            path = CameraPath(interpolation)
+            path.addKeyframe(1.0, [0.0, 0.0, 10.0], [0.0, 0.0, 0.0], [0.0, 1.0, 0.0], 0.5)
+            path.addKeyframe(2.0, [10.0, 0.0, 0.0], [1.0, 0.0, 0.0], [0.0, 0.0, 1.0], 0.7)
+            path.addKeyframe(4.0, [0.0, 5.0, 0.0], [0.0, 0.0, 0.0], [1.0, 0.0, 0.0], 0.6)
+            self.assertEqual(path.getNumberOfKeyframes(), 3)
+            self.assertEqual(path.getDuration(), 3.0)
+            self.assertView(path.evaluate(0.0), [0.0, 0.0, 10.0], [0.0, 0.0, 0.0], [0.0, 1.0, 0.0], 0.5)
+            self.assertView(path.evaluate(1.0), [0.0, 0.0, 10.0], [0.0, 0.0, 0.0], [0.0, 1.0, 0.0], 0.5)
+            self.assertView(path.evaluate(2.0), [10.0, 0.0, 0.0], [1.0, 0.0, 0.0], [0.0, 0.0, 1.0], 0.7)
+            self.assertView(path.evaluate(4.0), [0.0, 5.0, 0.0], [0.0, 0.0, 0.0], [1.0, 0.0, 0.0], 0.6)
+            self.assertView(path.evaluate(5.0), [0.0, 5.0, 0.0], [0.0, 0.0, 0.0], [1.0, 0.0, 0.0], 0.6)
+
+    def testReplaceKeyframe(self):
+        path = CameraPath()
+        path.addKeyframe(0.0, [0.0, 0.0, 10.0], [0.0, 0.0, 0.0], [0.0, 1.0, 0.0], 0.5)
+        path.addKeyframe(0.0, [0.0, 0.0, 5.0], [0.0, 0.0, 0.0], [0.0, 1.0, 0.0], 0.5)
+        self.assertEqual(path.getNumberOfKeyframes(), 1)
+        self.assertView(path.evaluate(0.0), [0.0, 0.0, 5.0], [0.0, 0.0, 0.0], [0.0, 1.0, 0.0], 0.5)
+
+    def testSlerpMidpoint(self):
+        q0, _ = view_to_orientation([0.0, 0.0, 1.0], [0.0, 0.0, 0.0], [0.0, 1.0, 0.0])
+        q1, _ = view_to_orientation([1.0, 0.0, 0.0], [0.0, 0.0, 0.0], [0.0, 1.0, 0.0])
+        q = slerp(q0, q1, 0.5)
+        self.assertAlmostEqual(numpy.linalg.norm(q), 1.0)
+        # Half of the 90 degree turn about y.
+        numpy.testing.assert_allclose(numpy.abs(q), [math.cos(math.pi / 8.0), 0.0, math.sin(math.pi / 8.0), 0.0],
+                                      atol=1.0e-9)
+        numpy.testing.assert_allclose(slerp(q0, q1, 0.0), q0, atol=1.0e-9)
+        numpy.testing.assert_allclose(slerp(q0, q1, 1.0), q1, atol=1.0e-9)
+
+    def testCameraMidpoint(self):
+        path = CameraPath(INTERPOLATION_LINEAR)
+        path.addKeyframe(0.0, [0.0, 0.0, 2.0], [0.0, 0.0, 0.0], [0.0, 1.0, 0.0], 0.5)
+        path.addKeyframe(1.0, [2.0, 0.0, 0.0], [0.0, 0.0, 0.0], [0.0, 1.0, 0.0], 0.5)
+        # The eye swings around the lookat point rather than cutting across.
+        half = math.sqrt(2.0)
+        self.assertView(path.evaluate(0.5), [half, 0.0, half], [0.0, 0.0, 0.0], [0.0, 1.0, 0.0], 0.5)
+
+    def testUnevenSpacing(self):
+        # Keyframes on a straight line at constant speed but uneven times stay on
+        # it at that speed with the spline tangents scaled for the spacing.
+        path = CameraPath(INTERPOLATION_SPLINE)
+        for time in (0.0, 1.0, 3.0, 3.5):
+            path.addKeyframe(time, [time, 0.0, 10.0], [time, 0.0, 0.0], [0.0, 1.0, 0.0], 0.5)
+        for time in (0.25, 0.5, 1.5, 2.0, 2.75, 3.25):
+            self.assertView(path.evaluate(time), [time, 0.0, 10.0], [time, 0.0, 0.0], [0.0, 1.0, 0.0], 0.5)
+
+    def testEasing(self):
+        path = CameraPath(INTERPOLATION_LINEAR, lambda s: s * s)
+        path.addKeyframe(0.0, [0.0, 0.0, 10.0], [0.0, 0.0, 0.0], [0.0, 1.0, 0.0], 0.5)
+        path.addKeyframe(2.0, [4.0, 0.0, 10.0], [4.0, 0.0, 0.0], [0.0, 1.0, 0.0], 0.5)
+        self.assertView(path.evaluate(1.0), [1.0, 0.0, 10.0], [1.0, 0.0, 0.0], [0.0, 1.0, 0.0], 0.5)
+
+    def testSample(self):
+        path = CameraPath()
+        self.assertRaises(RuntimeError, path.evaluate, 0.0)
+        path.addKeyframe(0.5, [0.0, 0.0, 10.0], [0.0, 0.0, 0.0], [0.0, 1.0, 0.0], 0.5)
+        self.assertEqual(len(path.sample(30.0)), 1)
+        path.addKeyframe(1.5, [0.0, 10.0, 0.0], [0.0, 0.0, 0.0], [1.0, 0.0, 0.0], 0.5)
+        self.assertEqual(len(path.sample(30.0)), 31)
+        self.assertEqual(len(path.sample(25.0)), 26)
+        # Durations which are whole frames only up to rounding keep the last frame.
+        path.addKeyframe(0.1 + 0.2, [0.0, 0.0, 10.0], [0.0, 0.0, 0.0], [0.0, 1.0, 0.0], 0.5)
+        self.assertEqual(len(path.sample(10.0)), 13)
+        frames = path.sample(7.0)
+        self.assertEqual(len(frames), 9)
+        self.assertEqual(frames[0], path.evaluate(path.getStartTime()))
+        self.assertEqual(frames[-1], path.evaluate(path.getStartTime() + 8.0 / 7.0))
+
+    def testInvalidView(self):
+        path = CameraPath()
+        self.assertRaises(ValueError, path.addKeyframe, 0.0, [0.0, 0.0, 1.0], [0.0, 0.0, 1.0], [0.0, 1.0, 0.0], 0.5)
+        self.assertRaises(ValueError, path.addKeyframe, 0.0, [0.0, 0.0, 1.0], [0.0, 0.0, 0.0], [0.0, 0.0, 3.0], 0.5)
+        self.assertRaises(ValueError, path.addKeyframe, 0.0, [0.0, 0.0, 1.0], [0.0, 0.0, 0.0], [0.0, 0.0, 0.0], 0.5)
+        self.assertRaises(ValueError, path.addKeyframe, 0.0, [0.0, 0.0, float('nan')], [0.0, 0.0, 0.0],
+                          [0.0, 1.0, 0.0], 0.5)
+        self.assertEqual(path.getNumberOfKeyframes(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
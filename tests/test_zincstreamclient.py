@@ -0,0 +1,61 @@
+import unittest
+
+import numpy
+
+from zincstreamclient import decode_frame, encode_frame, pack_message, FRAME_HEADER, MESSAGE_FRAME, MESSAGE_HEADER
+
+
+def make_pixels(width, height, seed=0):
+    return numpy.random.RandomState(seed).randint(0, 256, size=(height, width, 4)).astype(numpy.uint8)
+
+
+class EncodeFrameTestCase(unittest.TestCase):
+
+    def testKeyframeRoundTrip(self):
+        pixels = make_pixels(100, 70)
+        payload, tiles = encode_frame(1, pixels, None, tile_size=32)
+        # 4 columns by 3 rows of tiles, the last of each partly outside the frame.
+        self.assertEqual(tiles, 12)
+        sequence, decoded, size = decode_frame(payload, None)
+        self.assertEqual(sequence, 1)
+        self.assertEqual(size, (100, 70))
+        self.assertEqual(decoded.shape, (96, 128, 4))
+        numpy.testing.assert_array_equal(decoded[:70, :100], pixels)
+
+    def testDeltaSendsChangedTiles(self):
+        previous = make_pixels(128, 128)
+        payload, _ = encode_frame(1, previous, None, tile_size=32)
+        _, decoded, _ = decode_frame(payload, None)
+        pixels = previous.copy()
+        pixels[40, 70] = [1, 2, 3, 4]
+        pixels[100, 5] = [5, 6, 7, 8]
+        payload, tiles = encode_frame(2, pixels, previous, tile_size=32)
+        self.assertEqual(tiles, 2)
+        self.assertEqual(FRAME_HEADER.unpack_from(payload)[4], 0)
+        sequence, decoded, size = decode_frame(payload, decoded)
+        self.assertEqual(sequence, 2)
+        numpy.testing.assert_array_equal(decoded[:128, :128], pixels)
+
+    def testUnchangedFrameHasNoTiles(self):
+        pixels = make_pixels(64, 64)
+        payload, tiles = encode_frame(3, pixels, pixels.copy())
+        self.assertEqual(tiles, 0)
+
+    def testResizeSendsKeyframe(self):
+        previous = make_pixels(64, 64)
+        pixels = make_pixels(80, 48, seed=1)
+        payload, tiles = encode_frame(4, pixels, previous, tile_size=16)
+        self.assertEqual(tiles, 15)
+        self.assertEqual(FRAME_HEADER.unpack_from(payload)[4], 1)
+        _, decoded, size = decode_frame(payload, numpy.zeros((64, 64, 4), dtype=numpy.uint8))
+        self.assertEqual(size, (80, 48))
+        numpy.testing.assert_array_equal(decoded[:48, :80], pixels)
+
+    def testPackMessage(self):
+        message = pack_message(MESSAGE_FRAME, b'abc')
+        self.assertEqual(MESSAGE_HEADER.unpack_from(message), (MESSAGE_FRAME, 3))
+        self.assertEqual(message[MESSAGE_HEADER.size:], b'abc')
+
+
+if __name__ == '__main__':
+    unittest.main()
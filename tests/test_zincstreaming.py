@@ -0,0 +1,124 @@
+import threading
+import time
+import unittest
+
+try:
+    from opencmiss.zinc.context import Context
+
+    from zincqt import QtGui
+    from zincstreaming import ZincStreamingServer, show_offscreen
+    from zincwidget import ZincWidget
+except ImportError:
+    ZincStreamingServer = None
+
+from zincstreamclient import pack_message, ZincStreamClient, MESSAGE_INPUT
+
+
+@unittest.skipIf(ZincStreamingServer is None, 'needs Qt and Zinc')
+class StreamingLoopbackTestCase(unittest.TestCase):
+    '''
+    Serve a widget shown offscreen to a client on another thread over the
+    loopback interface.  Without a display run under xvfb-run.
+    '''
+
+    def setUp(self):
+        self._application = QtGui.QApplication.instance() or QtGui.QApplication([])
+        self._context = Context('streaming')
+        self._widget = ZincWidget()
+        self._widget.setContext(self._context)
+        show_offscreen(self._widget, 64, 48)
+        self._server = ZincStreamingServer(self._widget)
+
+    def tearDown(self):
+        self._server.close()
+        self._widget.close()
+
+    def runClient(self, client_function, timeout=10.0):
+        '''
+        Run client_function(client) on a thread while processing Qt events,
+        returning its result.
+        '''
+        outcome = {}
+
+        def run():
+            client = ZincStreamClient('127.0.0.1', self._server.getPort(), timeout)
+            try:
+                outcome['result'] = client_function(client)
+            except Exception as e:
+                outcome['error'] = e
+            finally:
+                client.close()
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        deadline = time.time() + timeout
+        while thread.is_alive() and time.time() < deadline:
+            self._application.processEvents()
+            time.sleep(0.001)
+        thread.join(timeout)
+        if 'error' in outcome:
+            raise outcome['error']
+
+        return outcome['result']
+
+    def testFrames(self):
+        def client_function(client):
+            first = client.receiveFrame().copy()
+            client.sendResize(32, 24)
+            frame = client.receiveFrame()
+            while frame.shape[:2] != (24, 32):
+                frame = client.receiveFrame()
+            return first, frame.copy()
+
+        first, resized = self.runClient(client_function)
+        self.assertEqual(first.shape, (48, 64, 4))
+        self.assertEqual(resized.shape, (24, 32, 4))
+        self.assertGreaterEqual(self._server.getStatistics()['sent'], 2)
+
+    def testInvalidInput(self):
+        def client_function(client):
+            client.receiveFrame()
+            client._socket.sendall(pack_message(MESSAGE_INPUT, b'not json'))
+            client.sendInput(['not', 'a', 'message'])
+            client.sendInput({'type': 'resize', 'width': 100000, 'height': 10})
+            client.sendInput({'type': 'resize', 'width': 'wide'})
+            client.sendInput({'type': 'press', 'x': 1})
+            client.sendInput({'type': 'press', 'x': 1, 'y': 2, 'button': ['left']})
+            client.sendInput({'type': {}, 'x': 1, 'y': 2})
+            client.sendInput({'type': 'press', 'x': 1, 'y': 2})
+            client.sendInput({'type': 'release', 'x': 1, 'y': 2})
+            client.sendInput({'type': 'move', 'x': float('inf'), 'y': 2})
+            client.sendInput({'type': 'move', 'x': 1, 'y': float('nan')})
+            client.sendInput({'type': 'move', 'x': 1, 'y': 10 ** 400})
+            client.sendInput({'type': 'move', 'x': 1, 'y': 2, 'width': float('inf'), 'height': 48})
+            # A valid resize sent after the invalid messages shows they were handled.
+            client.sendResize(40, 30)
+            frame = client.receiveFrame()
+            while frame.shape[:2] != (30, 40):
+                frame = client.receiveFrame()
+
+        self.runClient(client_function)
+        self.assertEqual(self._server.getStatistics()['invalid'], 13)
+        self.assertEqual((self._widget.width(), self._widget.height()), (40, 30))
+
+    def testClampedInput(self):
+        positions = []
+        self._widget.mouseMoveEvent = lambda event: positions.append((event.x(), event.y()))
+
+        def client_function(client):
+            client.receiveFrame()
+            client.sendInput({'type': 'move', 'x': -5, 'y': 1.0e300})
+            client.sendInput({'type': 'move', 'x': 10, 'y': 10, 'width': 1.0e-300, 'height': 48})
+            client.sendInput({'type': 'move', 'x': 31.6, 'y': 12.2, 'width': 32, 'height': 24})
+            client.sendResize(40, 30)
+            frame = client.receiveFrame()
+            while frame.shape[:2] != (30, 40):
+                frame = client.receiveFrame()
+
+        self.runClient(client_function)
+        self.assertEqual(self._server.getStatistics()['invalid'], 0)
+        self.assertEqual(positions, [(0, 47), (63, 10), (63, 24)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+import zlib
+
+import numpy
+
+try:
+    from opencmiss.zinc.context import Context
+    from opencmiss.zinc.field import Field
+    from opencmiss.zinc.glyph import Glyph
+
+    from zincoffscreen import ZincOffscreenRenderer
+    from zinctiledrender import _initialiseWorker, _renderTile, _worker
+    from zincwidget import ProjectionMode
+except ImportError:
+    Context = None
+
+from zinctiledrender import PngWriter, TiledRenderer
+
+
+def read_png(file_name):
+    '''
+    Return the (height, width, 4) RGBA pixels of an 8 bit RGBA PNG written
+    without row filters, checking the chunk CRCs.
+    '''
+    with open(file_name, 'rb') as f:
+        data = f.read()
+    assert data[:8] == b'\x89PNG\r\n\x1a\n'
+    offset = 8
+    chunks = []
+    while offset < len(data):
+        length, = struct.unpack_from('>I', data, offset)
+        chunk_type = data[offset + 4:offset + 8]
+        chunk_data = data[offset + 8:offset + 8 + length]
+        crc, = struct.unpack_from('>I', data, offset + 8 + length)
+        assert crc == zlib.crc32(chunk_type + chunk_data) & 0xffffffff
+        chunks.append((chunk_type, chunk_data))
+        offset += 12 + length
+    assert chunks[0][0] == b'IHDR' and chunks[-1] == (b'IEND', b'')
+    width, height, depth, colour_type, _, _, _ = struct.unpack('>IIBBBBB', chunks[0][1])
+    assert (depth, colour_type) == (8, 6)
+    raw = zlib.decompress(b''.join(chunk_data for chunk_type, chunk_data in chunks if chunk_type == b'IDAT'))
+    scanlines = numpy.frombuffer(raw, dtype=numpy.uint8).reshape(height, 1 + 4 * width)
+    assert not scanlines[:, 0].any()
+    return scanlines[:, 1:].reshape(height, width, 4)
+
+
+class PngWriterTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self._directory = tempfile.mkdtemp()
+        self._file_name = os.path.join(self._directory, 'image.png')
+
+    def tearDown(self):
+        shutil.rmtree(self._directory)
+
+    def testWriteInBands(self):
+        pixels = numpy.random.RandomState(0).randint(0, 256, size=(37, 23, 4)).astype(numpy.uint8)
+        writer = PngWriter(self._file_name, 23, 37, compression_level=1)
+        for start in range(0, 37, 10):
+            writer.writeRows(pixels[start:start + 10])
+        writer.close()
+        numpy.testing.assert_array_equal(read_png(self._file_name), pixels)
+
+    def testRowsMustFit(self):
+        writer = PngWriter(self._file_name, 4, 2)
+        self.assertRaises(ValueError, writer.writeRows, numpy.zeros((1, 5, 4), dtype=numpy.uint8))
+        writer.writeRows(numpy.zeros((2, 4, 4), dtype=numpy.uint8))
+        self.assertRaises(ValueError, writer.writeRows, numpy.zeros((1, 4, 4), dtype=numpy.uint8))
+        writer.close()
+
+    def testCloseIncomplete(self):
+        writer = PngWriter(self._file_name, 4, 2)
+        writer.writeRows(numpy.zeros((1, 4, 4), dtype=numpy.uint8))
+        self.assertRaises(RuntimeError, writer.close)
+        # Closing again, or aborting, after the file is closed does nothing.
+        writer.close()
+        writer.abort()
+
+
+def create_spheres(context):
+    '''
+    Create spheres spread over a wider than high region of space.
+    '''
+    region = context.getDefaultRegion()
+    fieldmodule = region.getFieldmodule()
+    fieldmodule.beginChange()
+    coordinates = fieldmodule.createFieldFiniteElement(3)
+    coordinates.setName('coordinates')
+    coordinates.setTypeCoordinate(True)
+    coordinates.setManaged(True)
+    nodes = fieldmodule.findNodesetByFieldDomainType(Field.DOMAIN_TYPE_NODES)
+    template = nodes.createNodetemplate()
+    template.defineField(coordinates)
+    fieldcache = fieldmodule.createFieldcache()
+    for identifier, position in enumerate([[0.0, 0.0, 0.0], [3.0, 0.0, 0.0], [0.0, 1.0, 0.0], [3.0, 1.0, 0.0],
+                                           [1.4, 0.6, 0.0]], 1):
+        fieldcache.setNode(nodes.createNode(identifier, template))
+        coordinates.assignReal(fieldcache, position)
+    fieldmodule.endChange()
+
+    points = region.getScene().createGraphicsPoints()
+    points.setFieldDomainType(Field.DOMAIN_TYPE_NODES)
+    points.setCoordinateField(coordinates)
+    attributes = points.getGraphicspointattributes()
+    attributes.setGlyphShapeType(Glyph.SHAPE_TYPE_SPHERE)
+    attributes.setBaseSize([0.4])
+
+
+@unittest.skipIf(Context is None, 'needs Qt and Zinc')
+class TiledRenderTestCase(unittest.TestCase):
+    '''
+    Render tiles in this process, as the workers do.  Without a display run
+    under xvfb-run.
+    '''
+
+    def tearDown(self):
+        _worker.clear()
+
+    def assertTiledMatchesSingle(self, width, height, projection_mode):
+        grid, tile_width, tile_height = TiledRenderer([], max_tile_size=max(width, height) // 2).getTileLayout(width, height)
+        self.assertEqual(grid, 2)
+
+        context = Context('single_render')
+        context.getGlyphmodule().defineStandardGlyphs()
+        context.getMaterialmodule().defineStandardMaterials()
+        create_spheres(context)
+        renderer = ZincOffscreenRenderer(context, width, height)
+        renderer.setProjectionMode(projection_mode)
+        renderer.viewAll()
+        view_parameters = renderer.getViewParameters()
+        single = renderer.renderArray()
+
+        _initialiseWorker([], create_spheres, tile_width, tile_height)
+        rows = []
+        for row in range(grid):
+            rows.append(numpy.concatenate([_renderTile((width, height, tile_width, tile_height, row, column,
+                                                        view_parameters, projection_mode, None))
+                                           for column in range(grid)], axis=1))
+        tiled = numpy.concatenate(rows, axis=0)[:height, :width]
+
+        self.assertEqual(tiled.shape, single.shape)
+        # The spheres are drawn, and apart from rasterisation at the tile edges
+        # in the same places.
+        self.assertTrue((single != single[0, 0]).any())
+        different = (numpy.abs(tiled.astype(numpy.int16) - single.astype(numpy.int16)) > 8).any(axis=2)
+        self.assertLess(numpy.count_nonzero(different), 0.01 * width * height)
+
+    def testWideImage(self):
+        self.assertTiledMatchesSingle(96, 64, ProjectionMode.PERSPECTIVE)
+
+    def testTallImage(self):
+        self.assertTiledMatchesSingle(64, 96, ProjectionMode.PARALLEL)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+# This python module animates the camera of a ZincWidget along keyframed paths,
+# for scripted fly-throughs, smooth view transitions and recording frames.  The
+# paths are defined in zinccamerapath, whose names are also available from here.
+
+from zincqt import QtCore, Signal
+
+import math
+
+import numpy
+
+from opencmiss.zinc.status import OK
+
+from zinccamerapath import ease_in_out, orientation_to_axes, slerp, view_to_orientation, CameraPath, \
+        INTERPOLATION_LINEAR, INTERPOLATION_SPLINE
+from zincwidget import clock
+
+
+class CameraAnimator(QtCore.QObject):
+    '''
+    Play camera paths on a ZincWidget with a fixed time step.  The camera is
+    only ever placed at whole frames of the frame rate, the frame shown being
+    the latest one due by the wall clock, and a new frame is not applied until
+    the widget has rendered the previous one.  Frames are therefore dropped,
+    rather than delayed, when rendering cannot keep up.  The widget is not
+    waited for while it is hidden, or for longer than render_timeout seconds,
+    so paths still play to the end when the widget does not render them.
+    '''
+
+    finished = Signal()
+
+    def __init__(self, zinc_widget, frame_rate=60.0, render_timeout=0.5, parent=None):
+        QtCore.QObject.__init__(self, parent)
+        self._zinc_widget = zinc_widget
+        self._frame_rate = float(frame_rate)
+        self._render_timeout = render_timeout
+        self._path = None
+        self._loop = False
+        self._start_time = None
+        self._frame = None
+        self._view_parameters = None
+        # The time the widget has been waited for since, or None.
+        self._awaiting_render = None
+        self._timer = QtCore.QTimer(self)
+        self._timer.timeout.connect(self._tick)
+        zinc_widget.frameRendered.connect(self._frameRendered)
+
+    def getFrameRate(self):
+        return self._frame_rate
+
+    def setFrameRate(self, frame_rate):
+        self._frame_rate = float(frame_rate)
+
+    def getNumberOfFrames(self, path):
+        return int(math.floor(path.getDuration() * self._frame_rate + 1.0e-9)) + 1
+
+    def stepTo(self, path, frame):
+        '''
+        Place the camera at the given frame of the path.  This is deterministic
+        so it can be used to step through a path offline, for example to export
+        every frame.
+        '''
+        view_parameters = path.evaluate(path.getStartTime() + frame / self._frame_rate)
+        self._zinc_widget.setViewParameters(*view_parameters)
+        return view_parameters
+
+    def play(self, path, loop=False):
+        '''
+        Start playing the path from its first keyframe, looping if loop is True.
+        '''
+        self.stop()
+        self._path = path
+        self._loop = loop
+        self._start_time = clock()
+        self._frame = None
+        self._view_parameters = None
+        self._awaiting_render = None
+        self._timer.start(max(int(1000.0 / self._frame_rate), 1))
+        self._tick()
+
+    def stop(self):
+        self._timer.stop()
+        self._path = None
+
+    def isPlaying(self):
+        return self._path is not None
+
+    def viewAll(self, duration=0.5):
+        '''
+        Animate the camera to view the whole scene over duration seconds, keeping
+        the current view direction and angle.  The target is calculated from the
+        coordinate range of the scene visible through the widget's scene filter.
+        '''
+        zinc_widget = self._zinc_widget
+        scene = zinc_widget.getSceneviewer().getScene()
+        result, minimum, maximum = scene.getCoordinatesRange(zinc_widget.getScenefilter())
+        if result != OK:
+            zinc_widget.viewAll()
+            return
+
+        eye, lookat, up, angle = zinc_widget.getViewParameters()
+        minimum = numpy.asarray(minimum, dtype=numpy.float64)
+        maximum = numpy.asarray(maximum, dtype=numpy.float64)
+        centre = 0.5 * (minimum + maximum)
+        radius = max(0.5 * numpy.linalg.norm(maximum - minimum), 1.0e-6)
+        direction = numpy.asarray(eye, dtype=numpy.float64) - numpy.asarray(lookat, dtype=numpy.float64)
+        direction /= numpy.linalg.norm(direction)
+        distance = radius / math.sin(0.5 * angle)
+
+        path = CameraPath(INTERPOLATION_LINEAR, ease_in_out)
+        path.addKeyframe(0.0, eye, lookat, up, angle)
+        path.addKeyframe(duration, (centre + distance * direction).tolist(), centre.tolist(), up, angle)
+        self.play(path)
+
+    def _frameRendered(self):
+        self._awaiting_render = None
+
+    def _tick(self):
+        path = self._path
+        if path is None:
+            return
+        if self._awaiting_render is not None and self._zinc_widget.isVisible() and \
+                clock() - self._awaiting_render < self._render_timeout:
+            return
+
+        last_frame = self.getNumberOfFrames(path) - 1
+        frame = int((clock() - self._start_time) * self._frame_rate)
+        if self._loop and last_frame > 0:
+            frame %= last_frame + 1
+        frame = min(frame, last_frame)
+        if frame != self._frame:
+            self._frame = frame
+            view_parameters = self.stepTo(path, frame)
+            # An unchanged camera is not rendered again.
+            self._awaiting_render = clock() if view_parameters != self._view_parameters else None
+            self._view_parameters = view_parameters
+        if frame == last_frame and not self._loop:
+            self.stop()
+            self.finished.emit()
@@ -0,0 +1,192 @@
+# This python module interpolates keyframed camera paths for ZincWidget.  It only
+# needs NumPy, see zinccameraanimation for playing paths on a widget.
+
+import bisect
+import math
+
+import numpy
+
+INTERPOLATION_LINEAR = 'linear'
+INTERPOLATION_SPLINE = 'spline'
+
+
+def ease_in_out(s):
+    '''
+    Smooth step easing of s in [0, 1], starting and finishing with zero speed.
+    '''
+    return s * s * (3.0 - 2.0 * s)
+
+
+def _normalise(vector):
+    return vector / numpy.linalg.norm(vector)
+
+
+def view_to_orientation(eye, lookat, up):
+    '''
+    Return the camera orientation for the view as a unit quaternion (w, x, y, z)
+    rotating the camera axes, looking down -z with y up, into world axes, and
+    the distance from the eye to the lookat point.  Raises ValueError if the
+    eye is at the lookat point or up is parallel to the view direction.
+    '''
+    eye = numpy.asarray(eye, dtype=numpy.float64)
+    lookat = numpy.asarray(lookat, dtype=numpy.float64)
+    up = numpy.asarray(up, dtype=numpy.float64)
+    forward = lookat - eye
+    distance = numpy.linalg.norm(forward)
+    if not distance > 0.0 or not numpy.isfinite(distance):
+        raise ValueError("The eye and lookat points must be distinct and finite.")
+    forward = forward / distance
+    right = numpy.cross(forward, up)
+    right_length = numpy.linalg.norm(right)
+    if not right_length > 1.0e-9 * numpy.linalg.norm(up) or not numpy.isfinite(right_length):
+        raise ValueError("The up vector must not be zero or parallel to the view direction.")
+    right = right / right_length
+    true_up = numpy.cross(right, forward)
+    m = numpy.column_stack((right, true_up, -forward))
+    trace = m[0, 0] + m[1, 1] + m[2, 2]
+    if trace > 0.0:
+        s = 2.0 * math.sqrt(trace + 1.0)
+        q = numpy.array([0.25 * s, (m[2, 1] - m[1, 2]) / s, (m[0, 2] - m[2, 0]) / s, (m[1, 0] - m[0, 1]) / s])
+    elif m[0, 0] > m[1, 1] and m[0, 0] > m[2, 2]:
+        s = 2.0 * math.sqrt(1.0 + m[0, 0] - m[1, 1] - m[2, 2])
+        q = numpy.array([(m[2, 1] - m[1, 2]) / s, 0.25 * s, (m[0, 1] + m[1, 0]) / s, (m[0, 2] + m[2, 0]) / s])
+    elif m[1, 1] > m[2, 2]:
+        s = 2.0 * math.sqrt(1.0 + m[1, 1] - m[0, 0] - m[2, 2])
+        q = numpy.array([(m[0, 2] - m[2, 0]) / s, (m[0, 1] + m[1, 0]) / s, 0.25 * s, (m[1, 2] + m[2, 1]) / s])
+    else:
+        s = 2.0 * math.sqrt(1.0 + m[2, 2] - m[0, 0] - m[1, 1])
+        q = numpy.array([(m[1, 0] - m[0, 1]) / s, (m[0, 2] + m[2, 0]) / s, (m[1, 2] + m[2, 1]) / s, 0.25 * s])
+
+    return _normalise(q), distance
+
+
+def orientation_to_axes(q):
+    '''
+    Return the (forward, up) world directions of the camera with orientation q.
+    '''
+    w, x, y, z = q
+    up = numpy.array([2.0 * (x * y - w * z), 1.0 - 2.0 * (x * x + z * z), 2.0 * (y * z + w * x)])
+    backward = numpy.array([2.0 * (x * z + w * y), 2.0 * (y * z - w * x), 1.0 - 2.0 * (x * x + y * y)])
+    return -backward, up
+
+
+def slerp(q0, q1, s):
+    '''
+    Spherical linear interpolation between unit quaternions q0 and q1, taking
+    the shortest path.
+    '''
+    dot = numpy.dot(q0, q1)
+    if dot < 0.0:
+        q1 = -q1
+        dot = -dot
+    if dot > 0.9995:
+        return _normalise(q0 + s * (q1 - q0))
+    theta = math.acos(dot)
+    sin_theta = math.sin(theta)
+    return (math.sin((1.0 - s) * theta) * q0 + math.sin(s * theta) * q1) / sin_theta
+
+
+class CameraPath(object):
+    '''
+    Keyframed camera path.  Each keyframe is a time, in seconds, and the eye,
+    lookat, up and view angle of the camera as used by
+    ZincWidget.setViewParameters().  The camera orientation is interpolated by
+    slerp, and the lookat point, eye distance and view angle either linearly or
+    with a cubic Catmull-Rom spline through the keyframes.  An easing function
+    mapping [0, 1] to [0, 1] may be applied over the whole duration.
+    '''
+
+    def __init__(self, interpolation=INTERPOLATION_SPLINE, easing=None):
+        self._interpolation = interpolation
+        self._easing = easing
+        self._times = []
+        self._keyframes = []
+
+    def addKeyframe(self, time, eye, lookat, up, angle):
+        '''
+        Add a keyframe, replacing any keyframe at the same time.  Raises
+        ValueError if the view does not define a camera orientation, see
+        view_to_orientation().
+        '''
+        orientation, distance = view_to_orientation(eye, lookat, up)
+        keyframe = (numpy.asarray(lookat, dtype=numpy.float64), orientation, distance, float(angle))
+        index = bisect.bisect_left(self._times, time)
+        if index < len(self._times) and self._times[index] == time:
+            self._keyframes[index] = keyframe
+        else:
+            self._times.insert(index, time)
+            self._keyframes.insert(index, keyframe)
+
+    def getNumberOfKeyframes(self):
+        return len(self._times)
+
+    def getStartTime(self):
+        return self._times[0] if self._times else 0.0
+
+    def getEndTime(self):
+        return self._times[-1] if self._times else 0.0
+
+    def getDuration(self):
+        return self.getEndTime() - self.getStartTime()
+
+    def _interpolateValue(self, index, s, component):
+        '''
+        Interpolate a component of the keyframes between keyframe index and the
+        next at fraction s, using tangents scaled for uneven keyframe spacing.
+        '''
+        times = self._times
+        keyframes = self._keyframes
+        p0 = keyframes[index][component]
+        p1 = keyframes[index + 1][component]
+        if self._interpolation != INTERPOLATION_SPLINE:
+            return p0 + s * (p1 - p0)
+
+        interval = times[index + 1] - times[index]
+        if index > 0:
+            m0 = (p1 - keyframes[index - 1][component]) / (times[index + 1] - times[index - 1]) * interval
+        else:
+            m0 = p1 - p0
+        if index + 2 < len(times):
+            m1 = (keyframes[index + 2][component] - p0) / (times[index + 2] - times[index]) * interval
+        else:
+            m1 = p1 - p0
+        s2 = s * s
+        s3 = s2 * s
+        return (2.0 * s3 - 3.0 * s2 + 1.0) * p0 + (s3 - 2.0 * s2 + s) * m0 + \
+            (-2.0 * s3 + 3.0 * s2) * p1 + (s3 - s2) * m1
+
+    def evaluate(self, time):
+        '''
+        Get the camera (eye, lookat, up, angle) at time, which is clamped to the
+        times of the first and last keyframes.
+        '''
+        if not self._times:
+            raise RuntimeError("The camera path has no keyframes.")
+
+        start = self._times[0]
+        duration = self._times[-1] - start
+        time = min(max(time, start), start + duration)
+        if self._easing is not None and duration > 0.0:
+            time = start + duration * self._easing((time - start) / duration)
+        index = bisect.bisect_right(self._times, time) - 1
+        if index >= len(self._times) - 1:
+            lookat, orientation, distance, angle = self._keyframes[-1]
+        else:
+            s = (time - self._times[index]) / (self._times[index + 1] - self._times[index])
+            lookat = self._interpolateValue(index, s, 0)
+            orientation = slerp(self._keyframes[index][1], self._keyframes[index + 1][1], s)
+            distance = max(self._interpolateValue(index, s, 2), 0.0)
+            angle = min(max(self._interpolateValue(index, s, 3), 1.0e-6), math.pi - 1.0e-6)
+        forward, up = orientation_to_axes(orientation)
+        eye = lookat - distance * forward
+        return (eye.tolist(), lookat.tolist(), up.tolist(), angle)
+
+    def sample(self, frame_rate):
+        '''
+        Get the list of camera (eye, lookat, up, angle) for every frame at the
+        given frame rate from the first keyframe to the last, inclusive.  The
+        result can be passed to ZincOffscreenRenderer.renderViews().
+        '''
+        frames = int(math.floor(self.getDuration() * frame_rate + 1.0e-9)) + 1
+        start = self.getStartTime()
+        return [self.evaluate(start + frame / float(frame_rate)) for frame in range(frames)]
@@ -0,0 +1,121 @@
+# This python module manages several ZincWidget viewports onto one OpenCMISS-Zinc
+# context, for example the quad view of three orthographic views and one perspective
+# view.  The viewports share their OpenGL objects and Zinc scene resources so the
+# cost of a scene is paid once however many views show it.
+
+from zincwidget import ProjectionMode, SceneResources, ZincWidget
+
+# Standard views as (view direction, up vector), the view direction points from
+# the lookat point to the eye.
+VIEW_TOP = ([0.0, 0.0, 1.0], [0.0, 1.0, 0.0])
+VIEW_FRONT = ([0.0, -1.0, 0.0], [0.0, 0.0, 1.0])
+VIEW_SIDE = ([1.0, 0.0, 0.0], [0.0, 0.0, 1.0])
+VIEW_ISOMETRIC = ([1.0, -1.0, 1.0], [0.0, 0.0, 1.0])
+
+
+class ZincViewportManager(object):
+    '''
+    Create ZincWidget viewports sharing one Zinc context.  The first viewport
+    created is the OpenGL share widget of all the others, so display lists,
+    buffers and textures compiled for the scene are uploaded once and used by
+    every view.  The viewports also share a single scene filter, scene picker
+    and selection group, through a SceneResources, so the selection made in
+    one view is the selection in all of them.  Each viewport keeps its own
+    scene viewer, so cameras and repaint scheduling are per view.
+
+    The rubber band selection box is part of the shared scene, so it is drawn
+    at the same window position in every view while a selection is dragged.
+    '''
+
+    def __init__(self, context):
+        self._context = context
+        self._scene_resources = SceneResources()
+        self._viewports = []
+
+    def getContext(self):
+        return self._context
+
+    def getSceneResources(self):
+        return self._scene_resources
+
+    def getViewports(self):
+        return list(self._viewports)
+
+    def getScenefilter(self):
+        return self._scene_resources.scenefilter
+
+    def getScenepicker(self):
+        return self._scene_resources.scenepicker
+
+    def getSelectionGroup(self):
+        return self._scene_resources.selection_group
+
+    def createViewport(self, parent=None, projection_mode=None, view=None):
+        '''
+        Create a viewport showing the context.  The projection mode and the
+        standard view, one of the VIEW_ constants, are applied when the
+        viewport is initialised, after the scene has been viewed in full.
+        '''
+        shared = self._viewports[0] if self._viewports else None
+        viewport = ZincWidget(parent, shared)
+        viewport.setContext(self._context)
+        viewport.setSceneResources(self._scene_resources)
+        if projection_mode is not None or view is not None:
+            viewport.graphicsInitialized.connect(lambda: self._initialiseView(viewport, projection_mode, view))
+        self._viewports.append(viewport)
+        return viewport
+
+    def createQuadViewports(self, parent=None):
+        '''
+        Create the top, front and side parallel projection viewports and an
+        isometric perspective viewport, returned in that order.
+        '''
+        return [self.createViewport(parent, ProjectionMode.PARALLEL, VIEW_TOP),
+                self.createViewport(parent, ProjectionMode.PARALLEL, VIEW_FRONT),
+                self.createViewport(parent, ProjectionMode.PARALLEL, VIEW_SIDE),
+                self.createViewport(parent, ProjectionMode.PERSPECTIVE, VIEW_ISOMETRIC)]
+
+    def removeViewport(self, viewport):
+        '''
+        Stop managing the viewport.  The share widget, the first viewport, should
+        be removed last as the OpenGL objects of the other viewports belong to it.
+        '''
+        self._viewports.remove(viewport)
+
+    def _initialiseView(self, viewport, projection_mode, view):
+        if projection_mode is not None:
+            viewport.setProjectionMode(projection_mode)
+        if view is not None:
+            self.setStandardView(viewport, view)
+
+    def setStandardView(self, viewport, view):
+        '''
+        Look at the scene of the viewport from the direction of the standard
+        view, then view all of it.
+        '''
+        direction, up = view
+        eye, lookat, _, angle = viewport.getViewParameters()
+        distance = sum((e - l) ** 2 for e, l in zip(eye, lookat)) ** 0.5
+        length = sum(d * d for d in direction) ** 0.5
+        eye = [l + distance * d / length for l, d in zip(lookat, direction)]
+        viewport.setViewParameters(eye, lookat, up, angle)
+        viewport.viewAll()
+
+    def setScenefilter(self, scenefilter):
+        '''
+        Set the scene filter of all the viewports and the shared scene picker.
+        Viewports not yet initialised use it when they are.
+        '''
+        self._scene_resources.scenefilter = scenefilter
+        initialised = [viewport for viewport in self._viewports if viewport.getSceneviewer() is not None]
+        for viewport in initialised:
+            viewport.setScenefilter(scenefilter)
+        # The scene picker is shared so setting it through one viewport sets it
+        # for all, and invalidates the picks they have cached.
+        if initialised:
+            initialised[0].setSelectionfilter(scenefilter)
+
+    def viewAll(self):
+        for viewport in self._viewports:
+            if viewport.getSceneviewer() is not None:
+                viewport.viewAll()
@@ -0,0 +1,145 @@
+# This python module renders OpenCMISS-Zinc scenes without showing a window, for
+# batch generation of images such as thumbnails and report figures.
+# Without a display run it under a virtual framebuffer, for example:
+#
+#     xvfb-run -s '-screen 0 1024x768x24' python make_thumbnails.py
+#
+# or with a software OpenGL implementation such as Mesa (LIBGL_ALWAYS_SOFTWARE=1).
+
+from zincqt import QtGui, QtOpenGL
+
+import numpy
+
+from opencmiss.zinc.sceneviewer import Sceneviewer
+from opencmiss.zinc.status import OK
+
+from zincwidget import create_sceneviewer, ProjectionMode
+
+
+def image_to_array(image):
+    '''
+    Return the pixels of a QImage as a (height, width, 4) array of RGBA bytes.
+    '''
+    image = image.convertToFormat(QtGui.QImage.Format_ARGB32)
+    bits = image.constBits()
+    if hasattr(bits, 'setsize'):
+        # PyQt returns a sip.voidptr which must be sized before use.
+        bits.setsize(image.byteCount())
+    row_pixels = image.bytesPerLine() // 4
+    pixels = numpy.frombuffer(bits, dtype=numpy.uint8).reshape(image.height(), row_pixels, 4)
+    # Format_ARGB32 is stored as BGRA on little endian machines.
+    return pixels[:, :image.width(), [2, 1, 0, 3]].copy()
+
+
+class ZincOffscreenRenderer(object):
+    '''
+    Render the scene of a Zinc context into an offscreen OpenGL pixel buffer.
+    The scene viewer is set up the same way as the one in ZincWidget and is
+    kept for the lifetime of the renderer, so many images can be rendered from
+    different camera poses without re-creating the scene.
+
+    A QApplication must exist before the renderer is created.  If the scene is
+    also shown in a ZincWidget, or another QGLWidget, pass it as share_widget
+    so the pixel buffer shares its OpenGL objects, as the graphics Zinc
+    compiles for the scene are only valid in contexts that share them.
+    '''
+
+    def __init__(self, context, width, height, share_widget=None):
+        if QtGui.QApplication.instance() is None:
+            raise RuntimeError("A QApplication must be created before the offscreen renderer.")
+        if not QtOpenGL.QGLPixelBuffer.hasOpenGLPbuffers():
+            raise RuntimeError("OpenGL pixel buffers are not supported by this system.")
+
+        self._context = context
+        self._width = width
+        self._height = height
+        if share_widget is None:
+            self._pixel_buffer = QtOpenGL.QGLPixelBuffer(width, height)
+        else:
+            self._pixel_buffer = QtOpenGL.QGLPixelBuffer(width, height, share_widget.format(), share_widget)
+        self._pixel_buffer.makeCurrent()
+        self._sceneviewer, self._scenefilter = create_sceneviewer(context, Sceneviewer.BUFFERING_MODE_SINGLE)
+        self._sceneviewer.setViewportSize(width, height)
+        self._sceneviewer.viewAll()
+
+    def getContext(self):
+        return self._context
+
+    def getSceneviewer(self):
+        return self._sceneviewer
+
+    def getScenefilter(self):
+        return self._scenefilter
+
+    def getImageSize(self):
+        return (self._width, self._height)
+
+    def setProjectionMode(self, mode):
+        if mode == ProjectionMode.PARALLEL:
+            self._sceneviewer.setProjectionMode(Sceneviewer.PROJECTION_MODE_PARALLEL)
+        elif mode == ProjectionMode.PERSPECTIVE:
+            self._sceneviewer.setProjectionMode(Sceneviewer.PROJECTION_MODE_PERSPECTIVE)
+
+    def getViewParameters(self):
+        result, eye, lookat, up = self._sceneviewer.getLookatParameters()
+        if result == OK:
+            angle = self._sceneviewer.getViewAngle()
+            return (eye, lookat, up, angle)
+
+        return None
+
+    def setViewParameters(self, eye, lookat, up, angle):
+        self._sceneviewer.beginChange()
+        self._sceneviewer.setLookatParametersNonSkew(eye, lookat, up)
+        self._sceneviewer.setViewAngle(angle)
+        self._sceneviewer.endChange()
+
+    def viewAll(self):
+        self._pixel_buffer.makeCurrent()
+        self._sceneviewer.viewAll()
+
+    def renderImage(self):
+        '''
+        Render the scene and return it as a QImage.
+        '''
+        self._pixel_buffer.makeCurrent()
+        self._sceneviewer.renderScene()
+        return self._pixel_buffer.toImage()
+
+    def renderArray(self):
+        '''
+        Render the scene and return it as a (height, width, 4) array of RGBA bytes.
+        '''
+        return image_to_array(self.renderImage())
+
+    def writeImage(self, file_name, width=0, height=0, antialias=0, transparency_layers=0):
+        '''
+        Render the scene to an image file using Zinc's own image capture, which
+        renders into a framebuffer object of the requested size.  A width or
+        height of zero uses the size of the renderer.
+        '''
+        self._pixel_buffer.makeCurrent()
+        result = self._sceneviewer.writeImageToFile(file_name, False,
+            width or self._width, height or self._height, antialias, transparency_layers)
+        return result == OK
+
+    def renderViews(self, view_parameters_list, file_name_pattern=None, **kwargs):
+        '''
+        Render the scene from each of the camera poses given as (eye, lookat, up,
+        angle) tuples, as returned by getViewParameters().  When file_name_pattern
+        is given, for example 'frame_%04d.png', each image is written to file with
+        writeImage() and the list of file names is returned, otherwise a list of
+        QImages is returned.
+        '''
+        results = []
+        for index, view_parameters in enumerate(view_parameters_list):
+            self.setViewParameters(*view_parameters)
+            if file_name_pattern is None:
+                results.append(self.renderImage())
+            else:
+                file_name = file_name_pattern % index
+                if not self.writeImage(file_name, **kwargs):
+                    raise RuntimeError("Failed to write image '" + file_name + "'.")
+                results.append(file_name)
+
+        return results
@@ -0,0 +1,13 @@
+# This python module imports the Qt bindings used by the other modules, PySide if it
+# is available and PyQt4 otherwise, so the choice is made in one place.  Import Qt
+# from here rather than from either binding.
+
+try:
+    from PySide import QtCore, QtGui, QtNetwork, QtOpenGL
+    Signal = QtCore.Signal
+    # The C++ type of Python objects in the signatures of signals.
+    PYOBJECT_TYPE = 'PyObject'
+except ImportError:
+    from PyQt4 import QtCore, QtGui, QtNetwork, QtOpenGL
+    Signal = QtCore.pyqtSignal
+    PYOBJECT_TYPE = 'PyQt_PyObject'
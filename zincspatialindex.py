@@ -0,0 +1,292 @@
+# This python module provides a CPU side index of node and element positions for
+# fast picking in OpenCMISS-Zinc scenes that are too large to pick with OpenGL
+# interactively.  Use it with ZincWidget.setSpatialIndex().
+
+import numpy
+
+from opencmiss.zinc.element import Element
+from opencmiss.zinc.field import Field
+from opencmiss.zinc.node import Node
+from opencmiss.zinc.status import OK
+
+from zincwidget import transform_points, window_to_widget_coordinates
+
+# Changes to a nodeset or mesh that change which positions are indexed.
+_NODE_CHANGE_FLAGS = Node.CHANGE_FLAG_ADD | Node.CHANGE_FLAG_REMOVE | Node.CHANGE_FLAG_IDENTIFIER
+_ELEMENT_CHANGE_FLAGS = Element.CHANGE_FLAG_ADD | Element.CHANGE_FLAG_REMOVE | Element.CHANGE_FLAG_IDENTIFIER
+
+
+class _WindowGrid(object):
+    '''
+    Uniform grid of widget pixel cells over the points projected into the
+    viewport, answering nearest point queries by looking only at the cells
+    around the query position.
+    '''
+
+    def __init__(self, identifiers, window_coordinates, width, height, cell_size):
+        self._cell_size = float(cell_size)
+        self._columns = int(width // cell_size) + 1
+        x = window_coordinates[:, 0]
+        y = window_coordinates[:, 1]
+        # Points clipped by the camera are NaN so are never inside.
+        with numpy.errstate(invalid='ignore'):
+            inside = numpy.isfinite(window_coordinates).all(axis=1) & (x >= 0) & (x < width) & (y >= 0) & (y < height)
+        points = window_coordinates[inside]
+        keys = (points[:, 1] // self._cell_size).astype(numpy.int64) * self._columns + \
+            (points[:, 0] // self._cell_size).astype(numpy.int64)
+        order = numpy.argsort(keys, kind='mergesort')
+        self._keys = keys[order]
+        self._identifiers = identifiers[inside][order]
+        self._points = points[order]
+
+    def findNearest(self, x, y, radius):
+        '''
+        Return (identifier, depth) of the point nearest the viewer within radius
+        pixels of x, y, or None if there is no point within radius.
+        '''
+        cell_size = self._cell_size
+        first_column = max(int((x - radius) // cell_size), 0)
+        last_column = min(int((x + radius) // cell_size), self._columns - 1)
+        if last_column < first_column:
+            return None
+        slices = []
+        for row in range(max(int((y - radius) // cell_size), 0), int((y + radius) // cell_size) + 1):
+            begin = numpy.searchsorted(self._keys, row * self._columns + first_column, side='left')
+            end = numpy.searchsorted(self._keys, row * self._columns + last_column, side='right')
+            if end > begin:
+                slices.append(numpy.arange(begin, end))
+        if not slices:
+            return None
+        candidates = numpy.concatenate(slices)
+        points = self._points[candidates]
+        distance_squared = (points[:, 0] - x) ** 2 + (points[:, 1] - y) ** 2
+        within = distance_squared <= radius * radius
+        if not within.any():
+            return None
+        candidates = candidates[within]
+        # Nearest the viewer first, then nearest the cursor.
+        nearest = numpy.lexsort((distance_squared[within], self._points[candidates, 2]))[0]
+        index = candidates[nearest]
+        return int(self._identifiers[index]), float(self._points[index, 2])
+
+
+class _IndexedDomain(object):
+    '''
+    The identifiers and world coordinates of the nodes of a nodeset, or the
+    element centres of a mesh, with their widget coordinates for the current
+    camera.
+    '''
+
+    def __init__(self, domain, is_mesh):
+        self.domain = domain
+        self.is_mesh = is_mesh
+        self.name = domain.getName()
+        self.identifiers = None
+        self.coordinates = None
+        self.window_coordinates = None
+        self.window_grid = None
+
+    def invalidate(self):
+        self.identifiers = None
+        self.coordinates = None
+        self.invalidateWindow()
+
+    def invalidateWindow(self):
+        self.window_coordinates = None
+        self.window_grid = None
+
+
+class SpatialIndex(object):
+    '''
+    Index of the positions of the nodes of the given nodesets and the centres
+    of the elements of the given meshes, evaluated from the coordinate field.
+    Positions are evaluated lazily, the first time they are needed, and are
+    re-evaluated for any nodeset or mesh reported as changed by the field
+    module of the coordinate field.  Picking is done in widget coordinates,
+    those of Qt events, using the camera set by setCamera().
+
+    The index has no knowledge of graphics so it picks nodes and elements
+    whether or not they are visible.
+    '''
+
+    def __init__(self, coordinate_field, nodesets=None, meshes=None, cell_size=16):
+        '''
+        By default the nodes and datapoints nodesets and all the meshes of the
+        field module of the coordinate field are indexed.  The cell_size is the
+        size, in pixels, of the cells used to find the nearest node.
+        '''
+        self._coordinate_field = coordinate_field
+        self._fieldmodule = coordinate_field.getFieldmodule()
+        if nodesets is None:
+            nodesets = [self._fieldmodule.findNodesetByFieldDomainType(Field.DOMAIN_TYPE_NODES),
+                        self._fieldmodule.findNodesetByFieldDomainType(Field.DOMAIN_TYPE_DATAPOINTS)]
+        if meshes is None:
+            meshes = [self._fieldmodule.findMeshByDimension(dimension) for dimension in (3, 2, 1)]
+        self._nodesets = [_IndexedDomain(nodeset, False) for nodeset in nodesets if nodeset.isValid()]
+        self._meshes = [_IndexedDomain(mesh, True) for mesh in meshes if mesh.isValid()]
+        self._cell_size = cell_size
+        self._world_to_window = None
+        self._viewport_size = None
+        self._camera_key = None
+
+        self._fieldmodulenotifier = self._fieldmodule.createFieldmodulenotifier()
+        self._fieldmodulenotifier.setCallback(self._zincFieldmoduleEvent)
+
+    def getCoordinateField(self):
+        return self._coordinate_field
+
+    def invalidate(self):
+        '''
+        Discard all the indexed positions, they are re-evaluated when next needed.
+        '''
+        for indexed in self._nodesets + self._meshes:
+            indexed.invalidate()
+
+    def _zincFieldmoduleEvent(self, event):
+        if event.getFieldChangeFlags(self._coordinate_field) & Field.CHANGE_FLAG_RESULT:
+            self.invalidate()
+            return
+        # Changes to field values other than the coordinates do not move anything.
+        for indexed in self._nodesets:
+            if event.getNodesetChanges(indexed.domain).getSummaryNodeChangeFlags() & _NODE_CHANGE_FLAGS:
+                indexed.invalidate()
+        for indexed in self._meshes:
+            if event.getMeshChanges(indexed.domain).getSummaryElementChangeFlags() & _ELEMENT_CHANGE_FLAGS:
+                indexed.invalidate()
+
+    def setCamera(self, world_to_window_matrix, viewport_size, camera_key):
+        '''
+        Set the 4x4 world to window pixel matrix and viewport size used for
+        picking.  Window coordinates are only recalculated when the camera key
+        changes, it must identify both the scene viewer and the state of its
+        camera, as the index may be shared by several scene viewers.
+        '''
+        if camera_key != self._camera_key or self._camera_key is None:
+            self._world_to_window = world_to_window_matrix
+            self._viewport_size = viewport_size
+            self._camera_key = camera_key
+            for indexed in self._nodesets + self._meshes:
+                indexed.invalidateWindow()
+
+    def _evaluate(self, indexed):
+        fieldcache = self._fieldmodule.createFieldcache()
+        components = self._coordinate_field.getNumberOfComponents()
+        identifiers = []
+        coordinates = []
+        if indexed.is_mesh:
+            xi = [0.5] * indexed.domain.getDimension()
+            iterator = indexed.domain.createElementiterator()
+            item = iterator.next()
+            while item.isValid():
+                fieldcache.setMeshLocation(item, xi)
+                result, values = self._coordinate_field.evaluateReal(fieldcache, components)
+                if result == OK:
+                    identifiers.append(item.getIdentifier())
+                    coordinates.append(values)
+                item = iterator.next()
+        else:
+            iterator = indexed.domain.createNodeiterator()
+            item = iterator.next()
+            while item.isValid():
+                fieldcache.setNode(item)
+                result, values = self._coordinate_field.evaluateReal(fieldcache, components)
+                if result == OK:
+                    identifiers.append(item.getIdentifier())
+                    coordinates.append(values)
+                item = iterator.next()
+
+        indexed.identifiers = numpy.array(identifiers, dtype=numpy.int32)
+        indexed.coordinates = numpy.zeros((len(identifiers), 3), dtype=numpy.float64)
+        if identifiers:
+            indexed.coordinates[:, :min(components, 3)] = numpy.array(coordinates, dtype=numpy.float64).reshape(len(identifiers), -1)[:, :3]
+
+    def _getWindowCoordinates(self, indexed):
+        if self._world_to_window is None:
+            raise RuntimeError("The camera for the spatial index has not been set.")
+        if indexed.identifiers is None:
+            self._evaluate(indexed)
+        if indexed.window_coordinates is None:
+            # Compare with the positions of Qt events, which have y down the widget.
+            indexed.window_coordinates = window_to_widget_coordinates(
+                transform_points(self._world_to_window, indexed.coordinates, clip=True))
+
+        return indexed.window_coordinates
+
+    def _getWindowGrid(self, indexed):
+        if indexed.window_grid is None:
+            window_coordinates = self._getWindowCoordinates(indexed)
+            width, height = self._viewport_size
+            indexed.window_grid = _WindowGrid(indexed.identifiers, window_coordinates, width, height, self._cell_size)
+
+        return indexed.window_grid
+
+    def _select(self, domains, names):
+        if names is None:
+            return domains
+
+        return [indexed for indexed in domains if indexed.name in names]
+
+    def getNodeset(self, name):
+        for indexed in self._nodesets:
+            if indexed.name == name:
+                return indexed.domain
+
+        return None
+
+    def getMesh(self, name):
+        for indexed in self._meshes:
+            if indexed.name == name:
+                return indexed.domain
+
+        return None
+
+    def findNearestNode(self, x, y, radius=4.0, nodeset_names=None):
+        '''
+        Find the node nearest the viewer within radius pixels of the window
+        position x, y, searching the nodesets with the given names or all the
+        indexed nodesets.  An invalid node is returned if no node is found.
+        '''
+        nearest = None
+        nearest_indexed = None
+        nodesets = self._select(self._nodesets, nodeset_names)
+        for indexed in nodesets:
+            found = self._getWindowGrid(indexed).findNearest(x, y, radius)
+            if found is not None and (nearest is None or found[1] < nearest[1]):
+                nearest = found
+                nearest_indexed = indexed
+
+        if nearest is not None:
+            return nearest_indexed.domain.findNodeByIdentifier(nearest[0])
+        if nodesets:
+            return nodesets[0].domain.findNodeByIdentifier(-1)
+
+        return Node()
+
+    def _findInRectangle(self, domains, left, bottom, right, top):
+        found = {}
+        for indexed in domains:
+            window_coordinates = self._getWindowCoordinates(indexed)
+            x = window_coordinates[:, 0]
+            y = window_coordinates[:, 1]
+            # Points clipped by the camera are NaN so are never inside.
+            with numpy.errstate(invalid='ignore'):
+                inside = (x >= left) & (x <= right) & (y >= bottom) & (y <= top)
+            identifiers = indexed.identifiers[inside]
+            if identifiers.size:
+                found[indexed.name] = identifiers
+
+        return found
+
+    def findNodesInRectangle(self, left, bottom, right, top, nodeset_names=None):
+        '''
+        Find the nodes inside the window rectangle.  Returns a dict of the
+        identifiers found, as arrays, keyed by nodeset name.
+        '''
+        return self._findInRectangle(self._select(self._nodesets, nodeset_names), left, bottom, right, top)
+
+    def findElementsInRectangle(self, left, bottom, right, top, mesh_names=None):
+        '''
+        Find the elements with centres inside the window rectangle.  Returns a
+        dict of the identifiers found, as arrays, keyed by mesh name.
+        '''
+        return self._findInRectangle(self._select(self._meshes, mesh_names), left, bottom, right, top)
@@ -0,0 +1,173 @@
+# This python module is the client side of the zincstreaming protocol, for viewing a
+# ZincWidget served by zincstreaming.ZincStreamingServer.  It only needs NumPy so it
+# can be used on machines without Qt or Zinc.
+#
+# Messages are a 5 byte header, the message type and the payload length, followed by
+# the payload.  Frames are sent as the tiles that changed since the previous frame,
+# each compressed with zlib, and acknowledged by the client so the server can measure
+# the round trip time.  Input is sent as JSON.
+
+import json
+import socket
+import struct
+import zlib
+
+import numpy
+
+MESSAGE_FRAME = 1
+MESSAGE_ACKNOWLEDGE = 2
+MESSAGE_INPUT = 3
+
+MESSAGE_HEADER = struct.Struct('>BI')
+# sequence, width, height, tile size, keyframe, number of tiles
+FRAME_HEADER = struct.Struct('>IHHHBI')
+# column, row, compressed length
+TILE_HEADER = struct.Struct('>HHI')
+ACKNOWLEDGE = struct.Struct('>I')
+
+
+def pack_message(message_type, payload):
+    return MESSAGE_HEADER.pack(message_type, len(payload)) + payload
+
+
+def _padTiles(pixels, tile_size):
+    '''
+    Return the pixels padded to whole tiles and viewed as (rows, columns,
+    tile_size, tile_size, 4).
+    '''
+    height, width = pixels.shape[:2]
+    rows = -(-height // tile_size)
+    columns = -(-width // tile_size)
+    padded = numpy.zeros((rows * tile_size, columns * tile_size, 4), dtype=numpy.uint8)
+    padded[:height, :width] = pixels
+    return padded.reshape(rows, tile_size, columns, tile_size, 4).swapaxes(1, 2)
+
+
+def encode_frame(sequence, pixels, previous, tile_size=64, compression_level=1):
+    '''
+    Encode a (height, width, 4) array of RGBA bytes as a frame payload holding
+    the tiles that differ from the previous frame's pixels, or all the tiles if
+    previous is None or a different size.  Returns the payload and the number
+    of tiles sent.
+    '''
+    height, width = pixels.shape[:2]
+    tiles = _padTiles(pixels, tile_size)
+    keyframe = previous is None or previous.shape != pixels.shape
+    if keyframe:
+        changed = numpy.ones(tiles.shape[:2], dtype=bool)
+    else:
+        changed = (tiles != _padTiles(previous, tile_size)).any(axis=(2, 3, 4))
+    parts = []
+    rows, columns = numpy.nonzero(changed)
+    for row, column in zip(rows.tolist(), columns.tolist()):
+        data = zlib.compress(numpy.ascontiguousarray(tiles[row, column]).tobytes(), compression_level)
+        parts.append(TILE_HEADER.pack(column, row, len(data)))
+        parts.append(data)
+
+    header = FRAME_HEADER.pack(sequence, width, height, tile_size, 1 if keyframe else 0, len(rows))
+    return header + b''.join(parts), len(rows)
+
+
+def decode_frame(payload, pixels):
+    '''
+    Apply a frame payload to the pixels of the previous frame, which may be
+    None for a keyframe.  Returns the sequence number, the pixels of the frame
+    padded to whole tiles and the (width, height) of the frame.
+    '''
+    sequence, width, height, tile_size, keyframe, count = FRAME_HEADER.unpack_from(payload)
+    rows = -(-height // tile_size)
+    columns = -(-width // tile_size)
+    if keyframe or pixels is None or pixels.shape != (rows * tile_size, columns * tile_size, 4):
+        pixels = numpy.zeros((rows * tile_size, columns * tile_size, 4), dtype=numpy.uint8)
+    offset = FRAME_HEADER.size
+    for _ in range(count):
+        column, row, length = TILE_HEADER.unpack_from(payload, offset)
+        offset += TILE_HEADER.size
+        tile = numpy.frombuffer(zlib.decompress(payload[offset:offset + length]), dtype=numpy.uint8)
+        offset += length
+        pixels[row * tile_size:(row + 1) * tile_size, column * tile_size:(column + 1) * tile_size] = \
+            tile.reshape(tile_size, tile_size, 4)
+
+    return sequence, pixels, (width, height)
+
+
+class ZincStreamClient(object):
+    '''
+    Blocking client of a ZincStreamingServer.  Frames are acknowledged as they
+    are received, and mouse input is given in the pixel coordinates of the
+    frames received.
+    '''
+
+    def __init__(self, host, port, timeout=None):
+        self._socket = socket.create_connection((host, port), timeout)
+        self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._pixels = None
+        self._frame_size = None
+        self._sequence = None
+
+    def close(self):
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+    def _receiveExactly(self, size):
+        data = bytearray()
+        while len(data) < size:
+            chunk = self._socket.recv(size - len(data))
+            if not chunk:
+                raise EOFError("The server closed the connection.")
+            data.extend(chunk)
+
+        return bytes(data)
+
+    def _send(self, message_type, payload):
+        self._socket.sendall(pack_message(message_type, payload))
+
+    def receiveFrame(self):
+        '''
+        Wait for the next frame, acknowledge it and return it as a (height,
+        width, 4) array of RGBA bytes.
+        '''
+        while True:
+            message_type, length = MESSAGE_HEADER.unpack(self._receiveExactly(MESSAGE_HEADER.size))
+            payload = self._receiveExactly(length)
+            if message_type == MESSAGE_FRAME:
+                break
+        self._sequence, self._pixels, self._frame_size = decode_frame(payload, self._pixels)
+        self._send(MESSAGE_ACKNOWLEDGE, ACKNOWLEDGE.pack(self._sequence))
+        return self.getFrame()
+
+    def getFrame(self):
+        '''
+        Get the last frame received, or None if no frame has been received.
+        '''
+        if self._pixels is None:
+            return None
+
+        width, height = self._frame_size
+        return self._pixels[:height, :width]
+
+    def getSequence(self):
+        return self._sequence
+
+    def sendInput(self, message):
+        self._send(MESSAGE_INPUT, json.dumps(message).encode('utf-8'))
+
+    def sendMouse(self, event_type, x, y, button=None, modifiers=()):
+        '''
+        Send a mouse event, event_type is one of press, move or release, button
+        one of left, middle or right, required for press and release, and
+        modifiers a sequence of shift, alt and control.  The position is in the
+        pixels of the last frame received, and is clamped to the frame.
+        '''
+        message = {'type': event_type, 'x': x, 'y': y, 'button': button, 'modifiers': list(modifiers)}
+        if self._frame_size is not None:
+            message['width'], message['height'] = self._frame_size
+        self.sendInput(message)
+
+    def sendResize(self, width, height):
+        '''
+        Ask the server to resize the widget, and so the frames, to width by
+        height pixels.
+        '''
+        self.sendInput({'type': 'resize', 'width': width, 'height': height})
@@ -0,0 +1,310 @@
+# This python module serves a ZincWidget to remote clients over TCP, for viewing large
+# models from thin clients without forwarding X or OpenGL.  Frames rendered by the
+# widget are streamed as compressed changed tiles and mouse input from the clients is
+# passed to the widget's own mouse event handlers.  See zincstreamclient for the
+# protocol and a client.
+
+from zincqt import QtCore, QtGui, QtNetwork
+
+import json
+import math
+
+from zincoffscreen import image_to_array
+from zincstreamclient import encode_frame, pack_message, ACKNOWLEDGE, MESSAGE_ACKNOWLEDGE, MESSAGE_FRAME, \
+        MESSAGE_HEADER, MESSAGE_INPUT
+from zincwidget import clock
+
+BUTTONS = {'left': QtCore.Qt.LeftButton, 'middle': QtCore.Qt.MidButton, 'right': QtCore.Qt.RightButton}
+MODIFIERS = {'shift': QtCore.Qt.ShiftModifier, 'alt': QtCore.Qt.AltModifier, 'control': QtCore.Qt.ControlModifier}
+EVENT_TYPES = {'press': QtCore.QEvent.MouseButtonPress, 'move': QtCore.QEvent.MouseMove,
+               'release': QtCore.QEvent.MouseButtonRelease}
+
+# Largest message accepted from a client, clients sending larger are disconnected.
+MAXIMUM_MESSAGE_SIZE = 65536
+
+
+def _isNumber(value):
+    '''
+    Return True if value is a finite number.  JSON may also give infinities,
+    NaN and integers too large for a float.
+    '''
+    if not isinstance(value, (int, float)) or isinstance(value, bool):
+        return False
+    try:
+        value = float(value)
+    except OverflowError:
+        return False
+    return not (math.isinf(value) or math.isnan(value))
+
+
+def _lookup(table, key):
+    '''
+    Return the value for key in table, or None if it is not there or is not
+    hashable, as any JSON value may be given.
+    '''
+    try:
+        return table.get(key)
+    except TypeError:
+        return None
+
+
+def show_offscreen(zinc_widget, width, height):
+    '''
+    Show the widget without putting it on screen, so it has an OpenGL context
+    and renders, for serving from a machine without a visible window.  Without
+    a display run under a virtual framebuffer such as xvfb-run.
+    '''
+    zinc_widget.setAttribute(QtCore.Qt.WA_DontShowOnScreen)
+    zinc_widget.resize(width, height)
+    zinc_widget.show()
+
+
+class _StreamClient(object):
+    '''
+    Connection state of a client: the frame it last received, the frames sent
+    but not yet acknowledged and the measured round trip time.
+    '''
+
+    def __init__(self, socket):
+        self.socket = socket
+        self.buffer = b''
+        self.previous = None
+        self.sent_times = {}
+        self.round_trip_time = None
+        self.scale = 1.0
+        self.pending = False
+        self.buttons = QtCore.Qt.NoButton
+
+
+class ZincStreamingServer(QtCore.QObject):
+    '''
+    Serve the frames rendered by a ZincWidget.  A frame is sent to each client
+    whenever the widget renders, which it does when the scene viewer asks for a
+    repaint, and only the tiles that changed since the client's previous frame
+    are sent.  Clients acknowledge each frame and the round trip time of the
+    acknowledgement sets the quality: while it is above target_latency frames
+    are downscaled, down to min_scale, and only one frame is in flight, later
+    frames being skipped in favour of the latest once it is acknowledged.
+
+    Mouse input from clients is turned into Qt mouse events for the widget's
+    mousePressEvent(), mouseMoveEvent() and mouseReleaseEvent(), so it behaves
+    exactly as local input.  Clients may resize the widget up to maximum_size
+    pixels in each direction.  Malformed input is ignored and counted.
+    '''
+
+    def __init__(self, zinc_widget, host='127.0.0.1', port=0, tile_size=64, compression_level=1,
+                 target_latency=0.1, min_scale=0.25, maximum_size=4096, parent=None):
+        QtCore.QObject.__init__(self, parent)
+        self._zinc_widget = zinc_widget
+        self._maximum_size = maximum_size
+        self._tile_size = tile_size
+        self._compression_level = compression_level
+        self._target_latency = target_latency
+        self._min_scale = min_scale
+        self._clients = []
+        self._latest_image = None
+        self._sequence = 0
+        self.resetStatistics()
+        self._server = QtNetwork.QTcpServer(self)
+        self._server.newConnection.connect(self._newConnection)
+        if not self._server.listen(QtNetwork.QHostAddress(host), port):
+            raise RuntimeError("Failed to listen on " + host + ":" + str(port) + ".")
+        zinc_widget.frameRendered.connect(self._frameRendered)
+
+    def getPort(self):
+        return self._server.serverPort()
+
+    def getNumberOfClients(self):
+        return len(self._clients)
+
+    def close(self):
+        self._zinc_widget.frameRendered.disconnect(self._frameRendered)
+        self._server.close()
+        for client in list(self._clients):
+            client.socket.close()
+        self._clients = []
+
+    def getStatistics(self):
+        '''
+        Get a dict with the numbers of frames 'sent' and 'skipped', of 'tiles'
+        and 'bytes' sent, of 'invalid' messages received, and the round trip
+        time of each client in seconds.
+        '''
+        statistics = dict(self._statistics)
+        statistics['round_trip_times'] = [client.round_trip_time for client in self._clients]
+        return statistics
+
+    def resetStatistics(self):
+        self._statistics = {'sent': 0, 'skipped': 0, 'tiles': 0, 'bytes': 0, 'invalid': 0}
+
+    def _newConnection(self):
+        while self._server.hasPendingConnections():
+            socket = self._server.nextPendingConnection()
+            socket.setSocketOption(QtNetwork.QAbstractSocket.LowDelayOption, 1)
+            client = _StreamClient(socket)
+            socket.readyRead.connect(lambda client=client: self._readClient(client))
+            socket.disconnected.connect(lambda client=client: self._removeClient(client))
+            self._clients.append(client)
+            if self._latest_image is not None:
+                self._sendFrame(client)
+            else:
+                self._zinc_widget.updateGL()
+
+    def _removeClient(self, client):
+        if client in self._clients:
+            self._clients.remove(client)
+        client.socket.deleteLater()
+
+    def _frameRendered(self):
+        if not self._clients:
+            # Not read back with no one to send it to, a new client asks for a frame.
+            self._latest_image = None
+            return
+
+        # Called from paintGL so the frame is still in the buffer it was rendered to.
+        self._latest_image = self._zinc_widget.grabFrameBuffer()
+        for client in self._clients:
+            self._sendFrame(client)
+
+    def _getFramesInFlight(self, client):
+        if client.round_trip_time is not None and client.round_trip_time > self._target_latency:
+            return 1
+
+        return 2
+
+    def _sendFrame(self, client):
+        '''
+        Send the latest frame to the client, or skip it if the client has too
+        many frames in flight, in which case it is sent when one is acknowledged.
+        '''
+        if len(client.sent_times) >= self._getFramesInFlight(client):
+            if not client.pending:
+                client.pending = True
+            else:
+                self._statistics['skipped'] += 1
+            return
+
+        client.pending = False
+        image = self._latest_image
+        if client.scale < 1.0:
+            image = image.scaled(max(int(image.width() * client.scale), 1), max(int(image.height() * client.scale), 1),
+                                 QtCore.Qt.IgnoreAspectRatio, QtCore.Qt.SmoothTransformation)
+        pixels = image_to_array(image)
+        self._sequence += 1
+        payload, tiles = encode_frame(self._sequence, pixels, client.previous, self._tile_size, self._compression_level)
+        if tiles == 0:
+            return
+
+        client.previous = pixels
+        client.sent_times[self._sequence] = clock()
+        message = pack_message(MESSAGE_FRAME, payload)
+        client.socket.write(message)
+        self._statistics['sent'] += 1
+        self._statistics['tiles'] += tiles
+        self._statistics['bytes'] += len(message)
+
+    def _acknowledge(self, client, sequence):
+        sent_time = client.sent_times.pop(sequence, None)
+        if sent_time is None:
+            return
+
+        # Frames sent before the one acknowledged were received before it.
+        for earlier in [earlier for earlier in client.sent_times if earlier < sequence]:
+            del client.sent_times[earlier]
+        round_trip_time = clock() - sent_time
+        if client.round_trip_time is None:
+            client.round_trip_time = round_trip_time
+        else:
+            client.round_trip_time = 0.8 * client.round_trip_time + 0.2 * round_trip_time
+        if client.round_trip_time > self._target_latency:
+            client.scale = max(client.scale * 0.75, self._min_scale)
+        elif client.round_trip_time < 0.5 * self._target_latency:
+            client.scale = min(client.scale / 0.75, 1.0)
+        if client.pending:
+            self._sendFrame(client)
+
+    def _readClient(self, client):
+        client.buffer += client.socket.readAll().data()
+        while len(client.buffer) >= MESSAGE_HEADER.size:
+            message_type, length = MESSAGE_HEADER.unpack_from(client.buffer)
+            if length > MAXIMUM_MESSAGE_SIZE:
+                self._statistics['invalid'] += 1
+                client.buffer = b''
+                client.socket.abort()
+                return
+            end = MESSAGE_HEADER.size + length
+            if len(client.buffer) < end:
+                break
+            payload = client.buffer[MESSAGE_HEADER.size:end]
+            client.buffer = client.buffer[end:]
+            if message_type == MESSAGE_ACKNOWLEDGE and len(payload) == ACKNOWLEDGE.size:
+                self._acknowledge(client, ACKNOWLEDGE.unpack(payload)[0])
+            elif message_type == MESSAGE_INPUT:
+                try:
+                    message = json.loads(payload.decode('utf-8'))
+                except ValueError:
+                    message = None
+                if not self._handleInput(client, message):
+                    self._statistics['invalid'] += 1
+            else:
+                self._statistics['invalid'] += 1
+
+    def _isValidSize(self, width, height):
+        return isinstance(width, int) and isinstance(height, int) and not isinstance(width, bool) and \
+            not isinstance(height, bool) and 0 < width <= self._maximum_size and 0 < height <= self._maximum_size
+
+    def _handleInput(self, client, message):
+        '''
+        Apply an input message from the client, returning False if it is not
+        valid.
+        '''
+        if not isinstance(message, dict):
+            return False
+
+        widget = self._zinc_widget
+        message_type = message.get('type')
+        if message_type == 'resize':
+            if not self._isValidSize(message.get('width'), message.get('height')):
+                return False
+            widget.resize(message['width'], message['height'])
+            return True
+
+        event_type = _lookup(EVENT_TYPES, message_type)
+        x = message.get('x')
+        y = message.get('y')
+        button_name = message.get('button')
+        modifier_names = message.get('modifiers', [])
+        if event_type is None or not _isNumber(x) or not _isNumber(y) or \
+                (button_name is None and event_type != QtCore.QEvent.MouseMove) or \
+                (button_name is not None and _lookup(BUTTONS, button_name) is None) or \
+                not isinstance(modifier_names, list) or \
+                any(_lookup(MODIFIERS, name) is None for name in modifier_names):
+            return False
+
+        # Positions are in the pixels of the client's frame, which may be downscaled.
+        frame_width = message.get('width')
+        frame_height = message.get('height')
+        if frame_width is not None or frame_height is not None:
+            if not _isNumber(frame_width) or not _isNumber(frame_height) or frame_width <= 0 or frame_height <= 0:
+                return False
+            x = x * widget.width() / float(frame_width)
+            y = y * widget.height() / float(frame_height)
+        # Positions outside the widget are clamped to its edges.
+        x = int(round(min(max(x, 0), max(widget.width() - 1, 0))))
+        y = int(round(min(max(y, 0), max(widget.height() - 1, 0))))
+        button = QtCore.Qt.NoButton if button_name is None else BUTTONS[button_name]
+        modifiers = QtCore.Qt.NoModifier
+        for name in modifier_names:
+            modifiers |= MODIFIERS[name]
+        if event_type == QtCore.QEvent.MouseButtonPress:
+            client.buttons |= button
+        elif event_type == QtCore.QEvent.MouseButtonRelease:
+            client.buttons &= ~button
+        event = QtGui.QMouseEvent(event_type, QtCore.QPoint(x, y), button, client.buttons, modifiers)
+        if event_type == QtCore.QEvent.MouseButtonPress:
+            widget.mousePressEvent(event)
+        elif event_type == QtCore.QEvent.MouseMove:
+            widget.mouseMoveEvent(event)
+        else:
+            widget.mouseReleaseEvent(event)
+        return True
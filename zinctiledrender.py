@@ -0,0 +1,270 @@
+# This python module renders OpenCMISS-Zinc scenes as images larger than OpenGL
+# can render in one pass, for publication figures and high resolution animations.
+# The image is split into tiles rendered in parallel by worker processes, each with
+# its own offscreen renderer and copy of the model, and written to disk as it is
+# stitched so the whole image is never held in memory.  The workers need a display,
+# without one run under a virtual framebuffer, for example:
+#
+#     xvfb-run -s '-screen 0 1024x768x24' python make_figure.py
+
+import collections
+import math
+import multiprocessing
+import struct
+import zlib
+
+import numpy
+
+from zincwidget import ProjectionMode
+
+# State of a worker process, set up by _initialiseWorker().
+_worker = {}
+
+
+class PngWriter(object):
+    '''
+    Write an 8 bit RGBA PNG image a band of rows at a time.  Rows are compressed
+    as they are written so only the band being written is held in memory.
+    '''
+
+    def __init__(self, file_name, width, height, compression_level=6):
+        self._width = width
+        self._height = height
+        self._rows_written = 0
+        self._file = open(file_name, 'wb')
+        self._file.write(b'\x89PNG\r\n\x1a\n')
+        self._writeChunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0))
+        self._compressor = zlib.compressobj(compression_level)
+
+    def _writeChunk(self, chunk_type, data):
+        self._file.write(struct.pack('>I', len(data)))
+        self._file.write(chunk_type)
+        self._file.write(data)
+        self._file.write(struct.pack('>I', zlib.crc32(data, zlib.crc32(chunk_type)) & 0xffffffff))
+
+    def writeRows(self, rows):
+        '''
+        Write a (rows, width, 4) array of RGBA bytes, the rows following those
+        already written.
+        '''
+        rows = numpy.asarray(rows, dtype=numpy.uint8)
+        if rows.shape[1:] != (self._width, 4) or self._rows_written + rows.shape[0] > self._height:
+            raise ValueError("Rows do not fit the image.")
+
+        # Each row starts with the filter type, 0 for none.
+        scanlines = numpy.zeros((rows.shape[0], 1 + 4 * self._width), dtype=numpy.uint8)
+        scanlines[:, 1:] = rows.reshape(rows.shape[0], -1)
+        data = self._compressor.compress(scanlines.tobytes())
+        if data:
+            self._writeChunk(b'IDAT', data)
+        self._rows_written += rows.shape[0]
+
+    def close(self):
+        if self._file is None:
+            return
+
+        if self._rows_written != self._height:
+            self._file.close()
+            self._file = None
+            raise RuntimeError("Only " + str(self._rows_written) + " of " + str(self._height) + " rows were written.")
+
+        self._writeChunk(b'IDAT', self._compressor.flush())
+        self._writeChunk(b'IEND', b'')
+        self._file.close()
+        self._file = None
+
+    def abort(self):
+        '''
+        Close the file without completing the image.
+        '''
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def _initialiseWorker(model_files, setup, tile_width, tile_height):
+    from opencmiss.zinc.context import Context
+
+    from zincoffscreen import ZincOffscreenRenderer
+    from zincqt import QtGui
+
+    application = QtGui.QApplication.instance()
+    if application is None:
+        application = QtGui.QApplication([])
+    context = Context('tiled_render')
+    context.getGlyphmodule().defineStandardGlyphs()
+    context.getMaterialmodule().defineStandardMaterials()
+    region = context.getDefaultRegion()
+    for file_name in model_files:
+        region.readFile(file_name)
+    if setup is not None:
+        setup(context)
+    _worker['application'] = application
+    _worker['context'] = context
+    _worker['renderer'] = ZincOffscreenRenderer(context, tile_width, tile_height)
+
+
+def _renderTile(task):
+    '''
+    Render the tile at row, column of a width by height image divided into
+    tiles of tile_width by tile_height pixels, returning it as an array of
+    RGBA bytes.
+    '''
+    from opencmiss.zinc.sceneviewer import Sceneviewer
+    from opencmiss.zinc.status import OK
+
+    width, height, tile_width, tile_height, row, column, view_parameters, projection_mode, time = task
+    renderer = _worker['renderer']
+    sceneviewer = renderer.getSceneviewer()
+    if time is not None:
+        _worker['context'].getTimekeepermodule().getDefaultTimekeeper().setTime(time)
+
+    # In the default relative viewport mode the viewing volume is widened or
+    # heightened when rendering to fit the aspect ratio of the viewport.  Do the
+    # same for the whole image here, then render each tile with exactly its
+    # part of the viewing volume.
+    sceneviewer.setViewportMode(Sceneviewer.VIEWPORT_MODE_RELATIVE)
+    renderer.setProjectionMode(projection_mode)
+    renderer.setViewParameters(*view_parameters)
+    result, left, right, bottom, top, near_plane, far_plane = sceneviewer.getViewingVolume()
+    if result != OK:
+        raise RuntimeError("Failed to get the viewing volume.")
+    if (right - left) * height > (top - bottom) * width:
+        half_height = 0.5 * (right - left) * height / width
+        middle = 0.5 * (bottom + top)
+        bottom, top = middle - half_height, middle + half_height
+    else:
+        half_width = 0.5 * (top - bottom) * width / height
+        middle = 0.5 * (left + right)
+        left, right = middle - half_width, middle + half_width
+    x_scale = (right - left) / width
+    y_scale = (top - bottom) / height
+    sceneviewer.setViewportMode(Sceneviewer.VIEWPORT_MODE_EXACT)
+    sceneviewer.setViewingVolume(left + x_scale * column * tile_width, left + x_scale * (column + 1) * tile_width,
+                                 top - y_scale * (row + 1) * tile_height, top - y_scale * row * tile_height,
+                                 near_plane, far_plane)
+    return renderer.renderArray()
+
+
+class TiledRenderer(object):
+    '''
+    Render images of any size from a pool of worker processes.  Each worker
+    reads the model files into the default region of its own context and calls
+    setup(context), if given, to create the graphics, so setup must be a module
+    level function that can be pickled.  Cameras are given as the view
+    parameters and projection mode of ZincWidget, for example:
+
+        with TiledRenderer(['heart.exf'], create_graphics) as tiled_renderer:
+            tiled_renderer.renderImage('figure.png', 16384, 16384,
+                zinc_widget.getViewParameters(), zinc_widget.getProjectionMode())
+
+    The image is divided into a square grid of equal tiles no larger than
+    max_tile_size, each rendered with its own part of the viewing volume.
+    Only the tiles being rendered and one row of tiles are held in memory.
+    '''
+
+    def __init__(self, model_files, setup=None, processes=None, max_tile_size=2048):
+        self._model_files = list(model_files)
+        self._setup = setup
+        self._processes = processes or multiprocessing.cpu_count()
+        self._max_tile_size = max_tile_size
+        self._pool = None
+        self._tile_size = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+            self._tile_size = None
+
+    def getTileLayout(self, width, height):
+        '''
+        Get the (grid, tile_width, tile_height) used for a width by height image.
+        '''
+        grid = max(int(math.ceil(float(width) / self._max_tile_size)),
+                   int(math.ceil(float(height) / self._max_tile_size)), 1)
+        return grid, int(math.ceil(float(width) / grid)), int(math.ceil(float(height) / grid))
+
+    def _getPool(self, tile_width, tile_height):
+        if self._tile_size != (tile_width, tile_height):
+            self.close()
+            # Workers are started fresh rather than forked, so they do not
+            # inherit any Qt or OpenGL state of this process.
+            if hasattr(multiprocessing, 'get_context'):
+                start = multiprocessing.get_context('spawn')
+            else:
+                start = multiprocessing
+            self._pool = start.Pool(self._processes, _initialiseWorker,
+                                    (self._model_files, self._setup, tile_width, tile_height))
+            self._tile_size = (tile_width, tile_height)
+
+        return self._pool
+
+    def renderImage(self, file_name, width, height, view_parameters, projection_mode=ProjectionMode.PERSPECTIVE, time=None):
+        '''
+        Render a width by height PNG image of the scene seen with the view
+        parameters (eye, lookat, up, angle), at the time if given.
+        '''
+        self.renderAnimation([file_name], width, height, [view_parameters], projection_mode,
+                             None if time is None else [time])
+
+    def renderAnimation(self, file_names, width, height, view_parameters_list, projection_mode=ProjectionMode.PERSPECTIVE, times=None):
+        '''
+        Render a PNG image for each of the view parameters, and the times if
+        given, to the corresponding file name.  Tiles of following frames are
+        rendered while earlier frames are written.
+        '''
+        frames = len(file_names)
+        if len(view_parameters_list) != frames or (times is not None and len(times) != frames):
+            raise ValueError("A view, and a time if times are given, is needed for each file.")
+
+        grid, tile_width, tile_height = self.getTileLayout(width, height)
+        pool = self._getPool(tile_width, tile_height)
+        tasks = ((width, height, tile_width, tile_height, row, column, view_parameters_list[frame], projection_mode,
+                  None if times is None else times[frame])
+                 for frame in range(frames) for row in range(grid) for column in range(grid))
+
+        # Keep a bounded number of tiles in flight, results are taken in order.
+        pending = collections.deque()
+        for task in tasks:
+            pending.append(pool.apply_async(_renderTile, (task,)))
+            if len(pending) >= 2 * self._processes:
+                break
+
+        writer = None
+        row_tiles = []
+        tile_index = 0
+        try:
+            while pending:
+                tile = pending.popleft().get()
+                for task in tasks:
+                    pending.append(pool.apply_async(_renderTile, (task,)))
+                    break
+                frame, position = divmod(tile_index, grid * grid)
+                row = position // grid
+                if writer is None:
+                    writer = PngWriter(file_names[frame], width, height)
+                row_tiles.append(tile)
+                if len(row_tiles) == grid:
+                    # The last row and column of tiles may extend past the image.
+                    rows = min(tile_height, height - row * tile_height)
+                    if rows > 0:
+                        writer.writeRows(numpy.concatenate(row_tiles, axis=1)[:rows, :width])
+                    row_tiles = []
+                    if row == grid - 1:
+                        writer.close()
+                        writer = None
+                tile_index += 1
+        finally:
+            if writer is not None:
+                writer.abort()
+
+        return list(file_names)
@@ -0,0 +1,279 @@
+# This python module plays time varying OpenCMISS-Zinc scenes in a ZincWidget,
+# driving the default timekeeper of the context at a target frame rate.
+
+from zincqt import QtCore, Signal
+
+import collections
+import math
+
+from zincoffscreen import ZincOffscreenRenderer
+from zincwidget import clock
+
+
+class TimePlayback(QtCore.QObject):
+    '''
+    Play the time range of a ZincWidget's context at a fixed frame rate.  Each
+    frame is rendered offscreen at its time and shown by the widget as a frame
+    override, so the widget only draws an image.  Rendered frames are kept in a
+    bounded cache keyed by time, camera and size, so scrubbing back over them
+    with seek() while playing is instant.  Between frames the next frames are
+    rendered ahead while there is time before the next one is due.  The frame
+    shown is always the one due by the wall clock, frames that could not be
+    rendered in time are dropped rather than shown late.
+
+    Zinc is not thread safe, so rendering ahead is done on the GUI thread in the
+    idle time between frames.  While playing, the timekeeper is at the time of
+    the last frame rendered, which may be ahead of the frame shown.  It is set
+    back to the time shown when playback stops.
+    '''
+
+    timeChanged = Signal(float)
+    finished = Signal()
+
+    def __init__(self, zinc_widget, frame_rate=25.0, cache_size=64, prefetch=8, parent=None):
+        QtCore.QObject.__init__(self, parent)
+        self._zinc_widget = zinc_widget
+        self._frame_rate = float(frame_rate)
+        self._cache_size = cache_size
+        self._prefetch = prefetch
+        self._cache = collections.OrderedDict()
+        self._renderer = None
+        timekeeper = self.getTimekeeper()
+        self._start_time = timekeeper.getMinimumTime()
+        self._end_time = timekeeper.getMaximumTime()
+        self._time_step = 1.0
+        self._loop = False
+        self._playing = False
+        self._frame = None
+        self._play_start_clock = None
+        self._play_start_frame = 0
+        self._render_seconds = 0.0
+        self._prefetch_scheduled = False
+        self.resetStatistics()
+        self._timer = QtCore.QTimer(self)
+        self._timer.timeout.connect(self._tick)
+
+    def getTimekeeper(self):
+        return self._zinc_widget.getContext().getTimekeepermodule().getDefaultTimekeeper()
+
+    def setTimeRange(self, start_time, end_time, time_step):
+        '''
+        Set the range of times played and the time advanced by each frame.
+        '''
+        self._start_time = start_time
+        self._end_time = end_time
+        self._time_step = time_step
+        self.clearCache()
+
+    def getTimeRange(self):
+        return (self._start_time, self._end_time, self._time_step)
+
+    def setFrameRate(self, frame_rate):
+        self._frame_rate = float(frame_rate)
+        if self._playing:
+            self.play(self._loop)
+
+    def getFrameRate(self):
+        return self._frame_rate
+
+    def setCacheSize(self, cache_size):
+        '''
+        Set the number of rendered frames kept, the least recently used frames
+        are discarded first.
+        '''
+        self._cache_size = cache_size
+        while len(self._cache) > max(cache_size, 0):
+            self._cache.popitem(last=False)
+
+    def getCacheSize(self):
+        return self._cache_size
+
+    def clearCache(self):
+        self._cache.clear()
+
+    def getNumberOfFrames(self):
+        if self._time_step <= 0.0:
+            return 1
+
+        return int(math.floor((self._end_time - self._start_time) / self._time_step + 1.0e-9)) + 1
+
+    def getFrameTime(self, frame):
+        return min(self._start_time + frame * self._time_step, self._end_time)
+
+    def getCurrentTime(self):
+        if self._frame is None:
+            return self.getTimekeeper().getTime()
+
+        return self.getFrameTime(self._frame)
+
+    def getStatistics(self):
+        '''
+        Get a dict with the numbers of frames 'shown' and 'dropped', of cache
+        'hits' and 'misses' for the frames shown, and of frames 'prefetched'.
+        '''
+        return dict(self._statistics)
+
+    def resetStatistics(self):
+        self._statistics = {'shown': 0, 'dropped': 0, 'hits': 0, 'misses': 0, 'prefetched': 0}
+
+    def play(self, loop=False):
+        '''
+        Play from the current frame, or from the start if at the end.
+        '''
+        self._timer.stop()
+        self._loop = loop
+        frame = self._frame if self._frame is not None else self._frameAtTime(self.getTimekeeper().getTime())
+        if frame >= self.getNumberOfFrames() - 1:
+            frame = 0
+        self._playing = True
+        self._play_start_frame = frame
+        self._play_start_clock = clock()
+        self._frame = None
+        self._timer.start(max(int(1000.0 / self._frame_rate), 1))
+        self._tick()
+
+    def stop(self):
+        '''
+        Stop playing, leaving the timekeeper at the time shown and the widget
+        rendering the scene again.
+        '''
+        self._timer.stop()
+        self._playing = False
+        if self._frame is not None:
+            self.getTimekeeper().setTime(self.getFrameTime(self._frame))
+        self._zinc_widget.clearFrameOverride()
+
+    def isPlaying(self):
+        return self._playing
+
+    def seek(self, time):
+        '''
+        Go to the frame nearest the time.  While playing it is shown from the
+        cache if it has been rendered and playing continues from it, otherwise
+        the timekeeper is set to its time and the widget renders the scene, so
+        it can still be interacted with.
+        '''
+        frame = self._frameAtTime(time)
+        if self._playing:
+            self._play_start_frame = frame
+            self._play_start_clock = clock()
+            self._showFrame(frame)
+            return
+
+        self._frame = frame
+        self._zinc_widget.clearFrameOverride()
+        self.getTimekeeper().setTime(self.getFrameTime(frame))
+        self.timeChanged.emit(self.getFrameTime(frame))
+
+    def _frameAtTime(self, time):
+        if self._time_step <= 0.0:
+            return 0
+
+        frame = int(round((time - self._start_time) / self._time_step))
+        return min(max(frame, 0), self.getNumberOfFrames() - 1)
+
+    def _getRenderer(self):
+        '''
+        Get the offscreen renderer, creating it at the size of the widget.
+        '''
+        width, height = self._zinc_widget.getViewportSize()
+        if self._renderer is None or self._renderer.getImageSize() != (width, height):
+            self._renderer = ZincOffscreenRenderer(self._zinc_widget.getContext(), width, height,
+                                                   share_widget=self._zinc_widget)
+
+        return self._renderer
+
+    def _getKey(self, frame):
+        return (self.getFrameTime(frame), self._zinc_widget.getCameraRevision(), self._zinc_widget.getViewportSize())
+
+    def _renderFrame(self, frame, key):
+        '''
+        Render the frame with the camera of the widget and add it to the cache.
+        '''
+        start = clock()
+        renderer = self._getRenderer()
+        renderer.setProjectionMode(self._zinc_widget.getProjectionMode())
+        renderer.setViewParameters(*self._zinc_widget.getViewParameters())
+        scenefilter = self._zinc_widget.getScenefilter()
+        if scenefilter is not None:
+            renderer.getSceneviewer().setScenefilter(scenefilter)
+        self.getTimekeeper().setTime(self.getFrameTime(frame))
+        image = renderer.renderImage()
+        self._render_seconds = clock() - start
+
+        if self._cache_size > 0:
+            if len(self._cache) >= self._cache_size:
+                self._cache.popitem(last=False)
+            self._cache[key] = image
+
+        return image
+
+    def _getFrame(self, frame):
+        key = self._getKey(frame)
+        image = self._cache.pop(key, None)
+        if image is None:
+            self._statistics['misses'] += 1
+            return self._renderFrame(frame, key)
+
+        self._statistics['hits'] += 1
+        self._cache[key] = image
+        return image
+
+    def _showFrame(self, frame):
+        self._zinc_widget.setFrameOverride(self._getFrame(frame))
+        self._frame = frame
+        self._statistics['shown'] += 1
+        self.timeChanged.emit(self.getFrameTime(frame))
+
+    def _getDueFrame(self):
+        return self._play_start_frame + int((clock() - self._play_start_clock) * self._frame_rate)
+
+    def _tick(self):
+        if not self._playing:
+            return
+
+        frame = self._getDueFrame()
+        frames = self.getNumberOfFrames()
+        if frame >= frames:
+            if self._loop:
+                self._play_start_frame = 0
+                self._play_start_clock = clock()
+                frame = 0
+            else:
+                frame = frames - 1
+        if frame != self._frame:
+            if self._frame is not None and frame > self._frame + 1:
+                self._statistics['dropped'] += frame - self._frame - 1
+            self._showFrame(frame)
+        if frame == frames - 1 and not self._loop:
+            self.stop()
+            self.finished.emit()
+            return
+
+        if not self._prefetch_scheduled:
+            self._prefetch_scheduled = True
+            QtCore.QTimer.singleShot(0, self._prefetchFrames)
+
+    def _prefetchFrames(self):
+        '''
+        Render the frames following the one shown that are not cached, while
+        there is time to render them before the next frame is due.
+        '''
+        self._prefetch_scheduled = False
+        if not self._playing or self._frame is None:
+            return
+
+        frames = self.getNumberOfFrames()
+        due = self._play_start_clock + (self._frame + 1 - self._play_start_frame) / self._frame_rate
+        for offset in range(1, self._prefetch + 1):
+            frame = self._frame + offset
+            if frame >= frames:
+                if not self._loop:
+                    break
+                frame %= frames
+            if clock() + self._render_seconds > due:
+                break
+            key = self._getKey(frame)
+            if key not in self._cache:
+                self._renderFrame(frame, key)
+                self._statistics['prefetched'] += 1
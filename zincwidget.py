@@ -1,507 +1,386 @@
 # This python module is intended to facilitate users creating their own applications that use OpenCMISS-Zinc
 # See the examples at https://svn.physiomeproject.org/svn/cmiss/zinc/bindings/trunk/python/ for further
 # information.
+#
+# Importing this module only loads the constants and helpers that do not depend on
+# Qt or Zinc, NumPy is imported by the helpers that use it.  The Qt and Zinc bindings
+# are imported the first time ZincWidget, or another name that needs them, is used.
 
-try:
-    from PySide import QtCore, QtOpenGL
-except ImportError:
-    from PyQt4 import QtCore, QtOpenGL
-
-# from opencmiss.zinc.glyph import Glyph
-from opencmiss.zinc.sceneviewer import Sceneviewer, Sceneviewerevent
-from opencmiss.zinc.sceneviewerinput import Sceneviewerinput
-from opencmiss.zinc.scenecoordinatesystem import \
-        SCENECOORDINATESYSTEM_LOCAL, \
-        SCENECOORDINATESYSTEM_WINDOW_PIXEL_TOP_LEFT,\
-        SCENECOORDINATESYSTEM_WORLD
-from opencmiss.zinc.field import Field
-from opencmiss.zinc.glyph import Glyph
-from opencmiss.zinc.status import OK
-
-# mapping from qt to zinc start
-# Create a button map of Qt mouse buttons to Zinc input buttons
-button_map = {QtCore.Qt.LeftButton: Sceneviewerinput.BUTTON_TYPE_LEFT,
-              QtCore.Qt.MidButton: Sceneviewerinput.BUTTON_TYPE_MIDDLE,
-              QtCore.Qt.RightButton: Sceneviewerinput.BUTTON_TYPE_RIGHT}
-
-# Create a modifier map of Qt modifier keys to Zinc modifier keys
-def modifier_map(qt_modifiers):
+import bisect
+import collections
+import sys
+import time
+import types
+
+# Names provided by the Qt and Zinc dependent _zincwidget module.
+_LAZY_NAMES = ('ZincWidget', 'SceneResources', 'button_map', 'modifier_map', 'create_sceneviewer')
+
+
+def __getattr__(name):
     '''
-    Return a Zinc SceneViewerInput modifiers object that is created from
-    the Qt modifier flags passed in.
+    Import the Qt and Zinc dependent names of this module when first used.
     '''
-    modifiers = Sceneviewerinput.MODIFIER_FLAG_NONE
-    if qt_modifiers & QtCore.Qt.SHIFT:
-        modifiers = modifiers | Sceneviewerinput.MODIFIER_FLAG_SHIFT
+    if name in _LAZY_NAMES:
+        import _zincwidget
+        value = getattr(_zincwidget, name)
+        globals()[name] = value
+        return value
+
+    raise AttributeError("module '" + __name__ + "' has no attribute '" + name + "'")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_NAMES))
 
-    return modifiers
-# mapping from qt to zinc end
 
 SELECTION_RUBBERBAND_NAME = 'selection_rubberband'
 
-# projectionMode start
-class ProjectionMode(object):
+# The highest resolution clock available.
+clock = getattr(time, 'perf_counter', time.time)
 
-    PARALLEL = 0
-    PERSPECTIVE = 1
-# projectionMode end
 
+def transform_points(matrix, points, clip=False):
+    '''
+    Apply a 4x4 homogeneous transformation, given as 16 values in row-major order,
+    to an (N, 3) array of points.  The result is an (N, 3) array of the transformed
+    points after the perspective divide.  If clip is True the matrix is taken
+    to be a projection and points behind the eye, or with a depth outside the
+    near and far planes at -1 and 1, are returned as NaN rather than mirrored.
+    '''
+    import numpy
 
-# selectionMode start
-class SelectionMode(object):
+    matrix = numpy.asarray(matrix, dtype=numpy.float64).reshape(4, 4)
+    points = numpy.asarray(points, dtype=numpy.float64).reshape(-1, 3)
+    homogeneous = numpy.dot(points, matrix[:, :3].T) + matrix[:, 3]
+    if not clip:
+        return homogeneous[:, :3] / homogeneous[:, 3:4]
 
-    NONE = -1
-    EXCLUSIVE = 0
-    ADDITIVE = 1
-# selectionMode end
+    w = homogeneous[:, 3:4]
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        transformed = homogeneous[:, :3] / w
+    clipped = (w[:, 0] <= 0.0) | ~(numpy.abs(transformed[:, 2]) <= 1.0)
+    transformed[clipped] = numpy.nan
+    return transformed
 
 
-class ZincWidget(QtOpenGL.QGLWidget):
-    
-    try:
-        # PySide
-        graphicsInitialized = QtCore.Signal()
-    except AttributError:
-        # PyQt
-        graphicsInitialized = QtCore.pyqtSignal()
-    
-
-    # Create a signal to notify when the sceneviewer is ready.
-    graphicsInitialized = QtCore.Signal()
-
-    # init start
-    def __init__(self, parent=None, shared=None):
+def window_to_widget_coordinates(window_coordinates):
+    '''
+    Convert an (N, 3) array of window pixel coordinates (top left origin), in
+    which y is negative down the window, to the widget coordinates of Qt events
+    in which y is positive down the widget.  A new array is returned.
+    '''
+    import numpy
+
+    widget_coordinates = numpy.array(window_coordinates, dtype=numpy.float64).reshape(-1, 3)
+    widget_coordinates[:, 1] = -widget_coordinates[:, 1]
+    return widget_coordinates
+
+
+def write_selection_arrays(file_name, arrays, compressed=False):
+    '''
+    Write a dict of identifier arrays keyed by nodeset or mesh name, as returned
+    by ZincWidget.getSelectionArrays(), to a NumPy .npz file.  Uncompressed
+    files can be read back memory mapped by read_selection_arrays().
+    '''
+    import numpy
+
+    arrays = dict((name, numpy.ascontiguousarray(identifiers, dtype=numpy.int32)) for name, identifiers in arrays.items())
+    if compressed:
+        numpy.savez_compressed(file_name, **arrays)
+    else:
+        numpy.savez(file_name, **arrays)
+
+
+def read_selection_arrays(file_name, mmap=True):
+    '''
+    Read a dict of identifier arrays keyed by nodeset or mesh name written by
+    write_selection_arrays().  If mmap is True the arrays of an uncompressed
+    file are memory mapped read only rather than read into memory.
+    '''
+    import struct
+    import zipfile
+
+    import numpy
+    from numpy.lib import format as npy_format
+
+    arrays = {}
+    with open(file_name, 'rb') as f:
+        archive = zipfile.ZipFile(f)
+        for info in archive.infolist():
+            name = info.filename[:-4] if info.filename.endswith('.npy') else info.filename
+            if mmap and info.compress_type == zipfile.ZIP_STORED:
+                # Find the array data of the stored member from its local file header.
+                f.seek(info.header_offset + 26)
+                name_length, extra_length = struct.unpack('<HH', f.read(4))
+                f.seek(info.header_offset + 30 + name_length + extra_length)
+                version = npy_format.read_magic(f)
+                if version == (1, 0):
+                    shape, fortran_order, dtype = npy_format.read_array_header_1_0(f)
+                else:
+                    shape, fortran_order, dtype = npy_format.read_array_header_2_0(f)
+                if all(shape):
+                    arrays[name] = numpy.memmap(f, dtype=dtype, mode='r', shape=shape, offset=f.tell(),
+                                                order='F' if fortran_order else 'C')
+                else:
+                    arrays[name] = numpy.zeros(shape, dtype=dtype)
+            else:
+                member = archive.open(info)
+                arrays[name] = npy_format.read_array(member)
+                member.close()
+        archive.close()
+
+    return arrays
+
+
+class SelectionChanges(object):
+    '''
+    The nodes and elements added to and removed from the selection by a change
+    to it.  The identifiers are held as arrays keyed by the name of the nodeset
+    or mesh they belong to, for example 'nodes', 'datapoints' or 'mesh3d', which
+    for nodesets and meshes in subregions is prefixed with the path of their
+    region below the root region, for example 'heart/left/nodes'.
+
+    Additions and removals must be recorded in the order they were made to the
+    selection, and only for items whose membership actually changed, so the net
+    change can be found from the first and last membership of each item.
+    '''
+
+    def __init__(self):
+        # Lists of [added, identifiers] in the order recorded, keyed by name.
+        self._operations = collections.defaultdict(list)
+        self._net = None
+
+    def _record(self, name, added, identifiers):
+        if len(identifiers):
+            operations = self._operations[name]
+            if operations and operations[-1][0] == added:
+                operations[-1][1].extend(identifiers)
+            else:
+                operations.append([added, list(identifiers)])
+            self._net = None
+
+    def add(self, name, identifiers):
         '''
-        Call the super class init functions, set the  Zinc context and the scene viewer handle to None.
-        Initialise other attributes that deal with selection and the rotation of the plane.
+        Record the identifiers as added to the named nodeset or mesh.
         '''
-        QtOpenGL.QGLWidget.__init__(self, parent, shared)
-        # Create a Zinc context from which all other objects can be derived either directly or indirectly.
-        self._context = None
-        self._sceneviewer = None
-
-        # Selection attributes
-        self._nodeSelectMode = True
-        self._dataSelectMode = True
-        self._elemSelectMode = True
-        self._selection_mode = SelectionMode.NONE
-        self._selectionGroup = None
-        self._selection_box = None
-        self._ignore_mouse_events = False
-        # init end
-
-    def setContext(self, context):
+        self._record(name, True, identifiers)
+
+    def remove(self, name, identifiers):
         '''
-        Sets the context for this ZincWidget.  This should be set before the initializeGL()
-        method is called otherwise the scene viewer cannot be created.
+        Record the identifiers as removed from the named nodeset or mesh.
         '''
-        self._context = context
+        self._record(name, False, identifiers)
 
-    def getContext(self):
-        if not self._context is None:
-            return self._context
-        else:
-            raise RuntimeError("Zinc context has not been set.")
-
-    def getSceneviewer(self):
+    def take(self):
         '''
-        Get the scene viewer for this ZincWidget.
+        Return a SelectionChanges holding the changes recorded so far, and
+        forget them here.
         '''
-        return self._sceneviewer
-    
-    def setSelectionModeAdditive(self):
-        self._selectionAlwaysAdditive = True
+        changes = SelectionChanges()
+        changes._operations, self._operations = self._operations, changes._operations
+        changes._net, self._net = self._net, None
+        return changes
 
-    def setSelectModeNode(self):
-        self._nodeSelectMode = True
-        self._dataSelectMode = False
-        self._elemSelectMode = False
+    def extend(self, changes):
+        '''
+        Record all the changes held by another SelectionChanges, as if they
+        followed the changes recorded here.
+        '''
+        for name, operations in changes._operations.items():
+            for added, identifiers in operations:
+                self._record(name, added, identifiers)
 
-    def setSelectModeData(self):
+    def _getNetChanges(self):
         '''
-        Set the selection mode to select *only* datapoints.
+        Fold the changes in the order they were recorded.  An item removed
+        after being added, or added after being removed, has its membership
+        restored so is dropped from both.
         '''
-        self._nodeSelectMode = False
-        self._dataSelectMode = True
-        self._elemSelectMode = False
-
-    def setSelectModeElement(self):
-        self._nodeSelectMode = False
-        self._dataSelectMode = False
-        self._elemSelectMode = True
-
-    def setSelectModeAll(self):
-        self._nodeSelectMode = True
-        self._dataSelectMode = True
-        self._elemSelectMode = True
-
-    # initializeGL start
-    def initializeGL(self):
+        if self._net is None:
+            import numpy
+
+            added = {}
+            removed = {}
+            for name, operations in self._operations.items():
+                name_added = numpy.zeros(0, dtype=numpy.int32)
+                name_removed = numpy.zeros(0, dtype=numpy.int32)
+                for is_added, identifiers in operations:
+                    identifiers = numpy.unique(numpy.array(identifiers, dtype=numpy.int32))
+                    if is_added:
+                        restored = numpy.intersect1d(identifiers, name_removed, assume_unique=True)
+                        name_removed = numpy.setdiff1d(name_removed, restored, assume_unique=True)
+                        name_added = numpy.union1d(name_added, numpy.setdiff1d(identifiers, restored, assume_unique=True))
+                    else:
+                        restored = numpy.intersect1d(identifiers, name_added, assume_unique=True)
+                        name_added = numpy.setdiff1d(name_added, restored, assume_unique=True)
+                        name_removed = numpy.union1d(name_removed, numpy.setdiff1d(identifiers, restored, assume_unique=True))
+                if name_added.size:
+                    added[name] = name_added
+                if name_removed.size:
+                    removed[name] = name_removed
+            self._net = (added, removed)
+
+        return self._net
+
+    def getAdded(self):
         '''
-        Initialise the Zinc scene for drawing the axis glyph at a point.  
+        Get a dict of sorted arrays of the identifiers added, keyed by nodeset or
+        mesh name.
         '''
-        if self._sceneviewer is None:
-            # Get the scene viewer module.
-            scene_viewer_module = self._context.getSceneviewermodule()
-
-            # From the scene viewer module we can create a scene viewer, we set up the
-            # scene viewer to have the same OpenGL properties as the QGLWidget.
-            self._sceneviewer = scene_viewer_module.createSceneviewer(Sceneviewer.BUFFERING_MODE_DOUBLE, Sceneviewer.STEREO_MODE_DEFAULT)
-            self._sceneviewer.setProjectionMode(Sceneviewer.PROJECTION_MODE_PERSPECTIVE)
-
-            # Create a filter for visibility flags which will allow us to see our graphic.
-            filter_module = self._context.getScenefiltermodule()
-            # By default graphics are created with their visibility flags set to on (or true).
-            graphics_filter = filter_module.createScenefilterVisibilityFlags()
-
-            # Set the graphics filter for the scene viewer otherwise nothing will be visible.
-            self._sceneviewer.setScenefilter(graphics_filter)
-            region = self._context.getDefaultRegion()
-            scene = region.getScene()
-            fieldmodule = region.getFieldmodule()
-
-            self._sceneviewer.setScene(scene)
-
-            self._selectionGroup = fieldmodule.createFieldGroup()
-    #         scene.setSelectionField(self._selectionGroup)
-
-            self._scenepicker = scene.createScenepicker()
-            self._scenepicker.setScenefilter(graphics_filter)
-
-            # If the standard glyphs haven't been defined then the
-            # selection box will not be visible
-            self._selection_box = scene.createGraphicsPoints()
-            self._selection_box.setName(SELECTION_RUBBERBAND_NAME)
-            self._selection_box.setScenecoordinatesystem(SCENECOORDINATESYSTEM_WINDOW_PIXEL_TOP_LEFT)
-            attributes = self._selection_box.getGraphicspointattributes()
-            attributes.setGlyphShapeType(Glyph.SHAPE_TYPE_CUBE_WIREFRAME)
-            attributes.setBaseSize([10, 10, 0.9999])
-            attributes.setGlyphOffset([1, -1, 0])
-            self._selectionBox_setBaseSize = attributes.setBaseSize
-            self._selectionBox_setGlyphOffset = attributes.setGlyphOffset
-
-            self._selection_box.setVisibilityFlag(False)
-
-            # Set up unproject pipeline
-            self._window_coords_from = fieldmodule.createFieldConstant([0, 0, 0])
-            self._global_coords_from = fieldmodule.createFieldConstant([0, 0, 0])
-            unproject = fieldmodule.createFieldSceneviewerProjection(self._sceneviewer, SCENECOORDINATESYSTEM_WINDOW_PIXEL_TOP_LEFT, SCENECOORDINATESYSTEM_WORLD)
-            project = fieldmodule.createFieldSceneviewerProjection(self._sceneviewer, SCENECOORDINATESYSTEM_WORLD, SCENECOORDINATESYSTEM_WINDOW_PIXEL_TOP_LEFT)
-
-    #         unproject_t = fieldmodule.createFieldTranspose(4, unproject)
-            self._global_coords_to = fieldmodule.createFieldProjection(self._window_coords_from, unproject)
-            self._window_coords_to = fieldmodule.createFieldProjection(self._global_coords_from, project)
-
-
-            self._sceneviewer.viewAll()
-
-    #  Not really applicable to us yet.
-    #         self._selection_notifier = scene.createSelectionnotifier()
-    #         self._selection_notifier.setCallback(self._zincSelectionEvent)
-
-            self._sceneviewernotifier = self._sceneviewer.createSceneviewernotifier()
-            self._sceneviewernotifier.setCallback(self._zincSceneviewerEvent)
-
-            self.graphicsInitialized.emit()
-            # initializeGL end
-
-    def setProjectionMode(self, mode):
-        if mode == ProjectionMode.PARALLEL:
-            self._sceneviewer.setProjectionMode(Sceneviewer.PROJECTION_MODE_PARALLEL)
-        elif mode == ProjectionMode.PERSPECTIVE:
-            self._sceneviewer.setProjectionMode(Sceneviewer.PROJECTION_MODE_PERSPECTIVE)
-
-    def getProjectionMode(self):
-        if self._sceneviewer.getProjectionMode() == Sceneviewer.PROJECTION_MODE_PARALLEL:
-            return ProjectionMode.PARALLEL
-        elif self._sceneviewer.getProjectionMode() == Sceneviewer.PROJECTION_MODE_PERSPECTIVE:
-            return ProjectionMode.PERSPECTIVE
-
-    def getViewParameters(self):
-        result, eye, lookat, up = self._sceneviewer.getLookatParameters()
-        if result == OK:
-            angle = self._sceneviewer.getViewAngle()
-            return (eye, lookat, up, angle)
-
-        return None
-
-    def setViewParameters(self, eye, lookat, up, angle):
-        self._sceneviewer.beginChange()
-        self._sceneviewer.setLookatParametersNonSkew(eye, lookat, up)
-        self._sceneviewer.setViewAngle(angle)
-        self._sceneviewer.endChange()
-
-    def setScenefilter(self, scenefilter):
-        self._sceneviewer.setScenefilter(scenefilter)
-
-    def getScenefilter(self):
-        result, scenefilter = self._sceneviewer.getScenefilter()
-        if result == OK:
-            return scenefilter
-
-        return None
-
-    def getScenepicker(self):
-        return self._scenepicker
-
-    def setPickingRectangle(self, coordinate_system, left, bottom, right, top):
-        self._scenepicker.setSceneviewerRectangle(self._sceneviewer, coordinate_system, left, bottom, right, top);
+        return self._getNetChanges()[0]
 
-    def setSelectionfilter(self, scenefilter):
-        self._scenepicker.setScenefilter(scenefilter)
+    def getRemoved(self):
+        '''
+        Get a dict of sorted arrays of the identifiers removed, keyed by nodeset
+        or mesh name.
+        '''
+        return self._getNetChanges()[1]
 
-    def getSelectionfilter(self):
-        result, scenefilter = self._scenepicker.getScenefilter()
-        if result == OK:
-            return scenefilter
+    def isEmpty(self):
+        added, removed = self._getNetChanges()
+        return not added and not removed
 
-        return None
 
-    def project(self, x, y, z):
-        in_coords = [x, y, z]
-        fieldmodule = self._global_coords_from.getFieldmodule()
-        fieldcache = fieldmodule.createFieldcache()
-        self._global_coords_from.assignReal(fieldcache, in_coords)
-        result, out_coords = self._window_coords_to.evaluateReal(fieldcache, 3)
-        if result == OK:
-            return out_coords  # [out_coords[0] / out_coords[3], out_coords[1] / out_coords[3], out_coords[2] / out_coords[3]]
+# Upper edges, in seconds, of the bins of the timing histograms kept by the PerformanceMonitor.
+TIMING_HISTOGRAM_BIN_EDGES = (0.001, 0.002, 0.004, 0.008, 0.016, 0.033, 0.066, 0.133, 0.266, float('inf'))
 
-        return None
 
-    def unproject(self, x, y, z):
-        in_coords = [x, y, z]
-        fieldmodule = self._window_coords_from.getFieldmodule()
-        fieldcache = fieldmodule.createFieldcache()
-        self._window_coords_from.assignReal(fieldcache, in_coords)
-        result, out_coords = self._global_coords_to.evaluateReal(fieldcache, 3)
-        if result == OK:
-            return out_coords  # [out_coords[0] / out_coords[3], out_coords[1] / out_coords[3], out_coords[2] / out_coords[3]]
+class _TimedSection(object):
 
-        return None
+    __slots__ = ('_monitor', '_name', '_start')
 
-    def getViewportSize(self):
-        result, width, height = self._sceneviewer.getViewportSize()
-        if result == OK:
-            return (width, height)
+    def __init__(self, monitor, name):
+        self._monitor = monitor
+        self._name = name
+        self._start = None
 
-        return None
+    def __enter__(self):
+        self._start = clock()
+        return self
 
-    def setTumbleRate(self, rate):
-        self._sceneviewer.setTumbleRate(rate)
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._monitor.record(self._name, clock() - self._start)
+        return False
 
-    def _getNearestGraphic(self, x, y, domain_type):
-        self._scenepicker.setSceneviewerRectangle(self._sceneviewer, SCENECOORDINATESYSTEM_LOCAL, x - 0.5, y - 0.5, x + 0.5, y + 0.5)
-        nearest_graphics = self._scenepicker.getNearestGraphics()
-        if nearest_graphics.isValid() and nearest_graphics.getFieldDomainType() == domain_type:
-            return nearest_graphics
 
-        return None
+class _NullSection(object):
 
-    def getNeareshGraphics(self):
-        return self._scenepicker.getNearestGraphics()
+    __slots__ = ()
 
-    def getNearestGraphicsNode(self, x, y):
-        return self._getNearestGraphic(x, y, Field.DOMAIN_TYPE_NODES)
+    def __enter__(self):
+        return self
 
-    def getNearestGraphicsPoint(self, x, y):
-        '''
-        Assuming given x and y is in the sending widgets coordinates 
-        which is a parent of this widget.  For example the values given 
-        directly from the event in the parent widget.
-        '''
-        return self._getNearestGraphic(x, y, Field.DOMAIN_TYPE_POINT)
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
 
-    def getNearestNode(self, x, y):
-        self._scenepicker.setSceneviewerRectangle(self._sceneviewer, SCENECOORDINATESYSTEM_LOCAL, x - 0.5, y - 0.5, x + 0.5, y + 0.5)
-        node = self._scenepicker.getNearestNode()
+# Shared section used when performance monitoring is disabled.
+_NULL_SECTION = _NullSection()
 
-        return node
 
-    def addPickedNodesToFieldGroup(self, selection_group):
-        self._scenepicker.addPickedNodesToFieldGroup(selection_group)
+class PerformanceMonitor(object):
+    '''
+    Record the time taken by named sections of code.  A timing histogram is kept
+    for every section over its whole lifetime and percentiles are reported over
+    a rolling window of the most recent samples.
+    '''
 
-    def setIgnoreMouseEvents(self, value):
-        self._ignore_mouse_events = value
+    def __init__(self, window_size=1000, callback=None):
+        self._window_size = window_size
+        self._callback = callback
+        self._samples = {}
+        self._histograms = {}
+        self._counts = {}
+        self._totals = {}
 
-    def viewAll(self):
+    def setCallback(self, callback):
         '''
-        Helper method to set the current scene viewer to view everything
-        visible in the current scene.
+        Set a callable that is called with the section name and duration, in
+        seconds, every time a timing is recorded.  Set None to remove it.
         '''
-        self._sceneviewer.viewAll()
+        self._callback = callback
 
-    # paintGL start
-    def paintGL(self):
+    def section(self, name):
         '''
-        Render the scene for this scene viewer.  The QGLWidget has already set up the
-        correct OpenGL buffer for us so all we need do is render into it.  The scene viewer
-        will clear the background so any OpenGL drawing of your own needs to go after this
-        API call.
+        Return a context manager that records the time spent inside it against
+        the named section.
         '''
-        self._sceneviewer.renderScene()
-        # paintGL end
-
-    def _zincSceneviewerEvent(self, event):
+        return _TimedSection(self, name)
+
+    def record(self, name, duration):
+        samples = self._samples.get(name)
+        if samples is None:
+            samples = self._samples[name] = collections.deque(maxlen=self._window_size)
+            self._histograms[name] = [0] * len(TIMING_HISTOGRAM_BIN_EDGES)
+            self._counts[name] = 0
+            self._totals[name] = 0.0
+        samples.append(duration)
+        self._histograms[name][bisect.bisect_left(TIMING_HISTOGRAM_BIN_EDGES, duration)] += 1
+        self._counts[name] += 1
+        self._totals[name] += duration
+        if self._callback is not None:
+            self._callback(name, duration)
+
+    def getStatistics(self):
         '''
-        Process a scene viewer event.  The updateGL() method is called for a
-        repaint required event all other events are ignored.
+        Get a dict of statistics for each section recorded.  Times are in seconds,
+        the percentiles are calculated over the rolling window of samples.
         '''
-        if event.getChangeFlags() & Sceneviewerevent.CHANGE_FLAG_REPAINT_REQUIRED:
-            QtCore.QTimer.singleShot(0, self.updateGL)
+        import numpy
+
+        statistics = {}
+        for name, samples in self._samples.items():
+            values = numpy.fromiter(samples, dtype=numpy.float64, count=len(samples))
+            p50, p95, p99 = numpy.percentile(values, [50, 95, 99])
+            statistics[name] = {
+                'count': self._counts[name],
+                'total': self._totals[name],
+                'mean': float(values.mean()),
+                'max': float(values.max()),
+                'p50': float(p50),
+                'p95': float(p95),
+                'p99': float(p99),
+                'histogram': list(zip(TIMING_HISTOGRAM_BIN_EDGES, self._histograms[name])),
+            }
+
+        return statistics
+
+    def reset(self):
+        self._samples.clear()
+        self._histograms.clear()
+        self._counts.clear()
+        self._totals.clear()
 
-#  Not applicable at the current point in time.
-#     def _zincSelectionEvent(self, event):
-#         print(event.getChangeFlags())
-#         print('go the selection change')
 
-    # resizeGL start
-    def resizeGL(self, width, height):
-        '''
-        Respond to widget resize events.
-        '''
-        self._sceneviewer.setViewportSize(width, height)
-        # resizeGL end
+# projectionMode start
+class ProjectionMode(object):
 
-    def mousePressEvent(self, event):
-        '''
-        Inform the scene viewer of a mouse press event.
-        '''
-        event.accept()
-        self._handle_mouse_events = False  # Track when the zinc should be handling mouse events
-        if not self._ignore_mouse_events and (event.modifiers() & QtCore.Qt.SHIFT) and (self._nodeSelectMode or self._elemSelectMode) and button_map[event.button()] == Sceneviewerinput.BUTTON_TYPE_LEFT:
-            self._selection_position_start = (event.x(), event.y())
-            self._selection_mode = SelectionMode.EXCULSIVE
-            if event.modifiers() & QtCore.Qt.ALT:
-                self._selection_mode = SelectionMode.ADDITIVE
-        elif not self._ignore_mouse_events and not event.modifiers() or (event.modifiers() & QtCore.Qt.SHIFT and button_map[event.button()] == Sceneviewerinput.BUTTON_TYPE_RIGHT):
-            scene_input = self._sceneviewer.createSceneviewerinput()
-            scene_input.setPosition(event.x(), event.y())
-            scene_input.setEventType(Sceneviewerinput.EVENT_TYPE_BUTTON_PRESS)
-            scene_input.setButtonType(button_map[event.button()])
-            scene_input.setModifierFlags(modifier_map(event.modifiers()))
-
-            self._sceneviewer.processSceneviewerinput(scene_input)
-
-            self._handle_mouse_events = True
-        else:
-            event.ignore()
-
-    def mouseReleaseEvent(self, event):
-        '''
-        Inform the scene viewer of a mouse release event.
-        '''
-        event.accept()
-        if not self._ignore_mouse_events and self._selection_mode != SelectionMode.NONE:
-            x = event.x()
-            y = event.y()
-            # Construct a small frustum to look for nodes in.
-            root_region = self._context.getDefaultRegion()
-            root_region.beginHierarchicalChange()
-            self._selection_box.setVisibilityFlag(False)
-
-            if (x != self._selection_position_start[0] and y != self._selection_position_start[1]):
-                left = min(x, self._selection_position_start[0])
-                right = max(x, self._selection_position_start[0])
-                bottom = min(y, self._selection_position_start[1])
-                top = max(y, self._selection_position_start[1])
-                self._scenepicker.setSceneviewerRectangle(self._sceneviewer, SCENECOORDINATESYSTEM_LOCAL, left, bottom, right, top);
-                if self._selection_mode == SelectionMode.EXCULSIVE:
-                    self._selectionGroup.clear()
-                if self._nodeSelectMode or self._dataSelectMode:
-                    self._scenepicker.addPickedNodesToFieldGroup(self._selectionGroup)
-                if self._elemSelectMode:
-                    self._scenepicker.addPickedElementsToFieldGroup(self._selectionGroup)
-            else:
+    PARALLEL = 0
+    PERSPECTIVE = 1
+# projectionMode end
 
-                self._scenepicker.setSceneviewerRectangle(self._sceneviewer, SCENECOORDINATESYSTEM_LOCAL, x - 0.5, y - 0.5, x + 0.5, y + 0.5)
-                if self._nodeSelectMode and self._elemSelectMode and self._selection_mode == SelectionMode.EXCULSIVE and not self._scenepicker.getNearestGraphics().isValid():
-                    self._selectionGroup.clear()
-
-                if self._nodeSelectMode and (self._scenepicker.getNearestGraphics().getFieldDomainType() == Field.DOMAIN_TYPE_NODES):
-                    node = self._scenepicker.getNearestNode()
-                    nodeset = node.getNodeset()
-
-                    nodegroup = self._selectionGroup.getFieldNodeGroup(nodeset)
-                    if not nodegroup.isValid():
-                        nodegroup = self._selectionGroup.createFieldNodeGroup(nodeset)
-
-                    group = nodegroup.getNodesetGroup()
-                    if self._selection_mode == SelectionMode.EXCULSIVE:
-                        remove_current = group.getSize() == 1 and group.containsNode(node)
-                        self._selectionGroup.clear()
-                        if not remove_current:
-                            group.addNode(node)
-                    elif self._selection_mode == SelectionMode.ADDITIVE:
-                        if group.containsNode(node):
-                            group.removeNode(node)
-                        else:
-                            group.addNode(node)
-
-                if self._elemSelectMode and (self._scenepicker.getNearestGraphics().getFieldDomainType() in [Field.DOMAIN_TYPE_MESH1D, Field.DOMAIN_TYPE_MESH2D, Field.DOMAIN_TYPE_MESH3D, Field.DOMAIN_TYPE_MESH_HIGHEST_DIMENSION]):
-                    elem = self._scenepicker.getNearestElement()
-                    mesh = elem.getMesh()
-
-                    elementgroup = self._selectionGroup.getFieldElementGroup(mesh)
-                    if not elementgroup.isValid():
-                        elementgroup = self._selectionGroup.createFieldElementGroup(mesh)
-
-                    group = elementgroup.getMeshGroup()
-                    if self._selection_mode == SelectionMode.EXCULSIVE:
-                        remove_current = group.getSize() == 1 and group.containsElement(elem)
-                        self._selectionGroup.clear()
-                        if not remove_current:
-                            group.addElement(elem)
-                    elif self._selection_mode == SelectionMode.ADDITIVE:
-                        if group.containsElement(elem):
-                            group.removeElement(elem)
-                        else:
-                            group.addElement(elem)
-
-
-            root_region.endHierarchicalChange()
-            self._selection_mode = SelectionMode.NONE
-        elif not self._ignore_mouse_events and self._handle_mouse_events:
-            scene_input = self._sceneviewer.createSceneviewerinput()
-            scene_input.setPosition(event.x(), event.y())
-            scene_input.setEventType(Sceneviewerinput.EVENT_TYPE_BUTTON_RELEASE)
-            scene_input.setButtonType(button_map[event.button()])
-
-            self._sceneviewer.processSceneviewerinput(scene_input)
-        else:
-            event.ignore()
-
-    def mouseMoveEvent(self, event):
-        '''
-        Inform the scene viewer of a mouse move event and update the OpenGL scene to reflect this
-        change to the viewport.
-        '''
 
-        event.accept()
-        if not self._ignore_mouse_events and self._selection_mode != SelectionMode.NONE:
-            x = event.x()
-            y = event.y()
-            xdiff = float(x - self._selection_position_start[0])
-            ydiff = float(y - self._selection_position_start[1])
-            if abs(xdiff) < 0.0001:
-                xdiff = 1
-            if abs(ydiff) < 0.0001:
-                ydiff = 1
-            xoff = float(self._selection_position_start[0]) / xdiff + 0.5
-            yoff = float(self._selection_position_start[1]) / ydiff + 0.5
-            scene = self._selection_box.getScene()
-            scene.beginChange()
-            self._selectionBox_setBaseSize([xdiff, ydiff, 0.999])
-            self._selectionBox_setGlyphOffset([xoff, -yoff, 0])
-            self._selection_box.setVisibilityFlag(True)
-            scene.endChange()
-        elif not self._ignore_mouse_events and self._handle_mouse_events:
-            scene_input = self._sceneviewer.createSceneviewerinput()
-            scene_input.setPosition(event.x(), event.y())
-            scene_input.setEventType(Sceneviewerinput.EVENT_TYPE_MOTION_NOTIFY)
-            if event.type() == QtCore.QEvent.Leave:
-                scene_input.setPosition(-1, -1)
-
-            self._sceneviewer.processSceneviewerinput(scene_input)
-        else:
-            event.ignore()
+# selectionMode start
+class SelectionMode(object):
+
+    NONE = -1
+    EXCLUSIVE = 0
+    ADDITIVE = 1
+# selectionMode end
+
+
+# Module level __getattr__ is only used from Python 3.7, on earlier versions the
+# lazy names are looked up through the class of the module instead, which can be
+# changed from Python 3.5.  Older versions import them when this module loads.
+if sys.version_info < (3, 7):
+    class _LazyModule(types.ModuleType):
+
+        def __getattr__(self, name):
+            return globals()['__getattr__'](name)
 
+        def __dir__(self):
+            return globals()['__dir__']()
+
+    try:
+        sys.modules[__name__].__class__ = _LazyModule
+    except TypeError:
+        from _zincwidget import ZincWidget, SceneResources, button_map, modifier_map, create_sceneviewer